@@ -119,7 +119,8 @@ def create_snapservice_client(server, vc, username, password, session,
     """
     # Acquire token from sso.
     sso_url = 'https://' + vc + '/sts/STSService'
-    authenticator = sso.SsoAuthenticator(sso_url)
+    # Clients created for the same user share one token until it expires.
+    token_cache = sso.get_token_cache(sso_url)
 
     context = None
     if skip_verification:
@@ -128,10 +129,10 @@ def create_snapservice_client(server, vc, username, password, session,
 
     # The token lifetime is 30 minutes.
     print("\n\nAcquire SAML token from PSC.\n")
-    saml_token = authenticator.get_bearer_saml_assertion(username,
-                                                         password,
-                                                         token_duration=30 * 60,
-                                                         delegatable=True,
-                                                         ssl_context=context)
+    saml_token = token_cache.get_bearer_saml_assertion(username,
+                                                       password,
+                                                       token_duration=30 * 60,
+                                                       delegatable=True,
+                                                       ssl_context=context)
 
     return SnapserviceClient(session=session, server=server, bearer_token=saml_token)
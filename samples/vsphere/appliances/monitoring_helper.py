@@ -0,0 +1,192 @@
+"""
+* *******************************************************
+* Copyright (c) VMware, Inc. 2024. All Rights Reserved.
+* SPDX-License-Identifier: MIT
+* *******************************************************
+*
+* DISCLAIMER. THIS PROGRAM IS PROVIDED TO YOU "AS IS" WITHOUT
+* WARRANTIES OR CONDITIONS OF ANY KIND, WHETHER ORAL OR WRITTEN,
+* EXPRESS OR IMPLIED. THE AUTHOR SPECIFICALLY DISCLAIMS ANY IMPLIED
+* WARRANTIES OR CONDITIONS OF MERCHANTABILITY, SATISFACTORY QUALITY,
+* NON-INFRINGEMENT AND FITNESS FOR A PARTICULAR PURPOSE.
+"""
+
+__author__ = 'VMware, Inc.'
+__vcenter_version__ = '6.7+'
+
+import calendar
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from samples.vsphere.common.cache_util import private_dir, user_cache_dir
+
+CATALOG_CACHE_DIR = user_cache_dir('appliance-monitoring-catalog')
+# Default directory of the TimeSeriesStore of monitoring_query.py.
+MONITORING_STORE_DIR = user_cache_dir('appliance-monitoring')
+
+# Seconds between the values of each Monitoring.IntervalType.
+INTERVAL_SECONDS = {
+    'MINUTES5': 300,
+    'MINUTES30': 1800,
+    'HOURS2': 7200,
+    'HOURS6': 21600,
+    'DAY1': 86400,
+}
+
+
+def to_timestamp(value):
+    """Seconds since the epoch of a naive UTC datetime"""
+    return calendar.timegm(value.utctimetuple())
+
+
+def from_timestamp(value):
+    return datetime.utcfromtimestamp(value)
+
+
+def series_counter(name, interval, function):
+    """Counter name of a monitored item in a TimeSeriesStore"""
+    return '{}/{}/{}'.format(name, interval, function)
+
+
+def item_points(item, interval):
+    """
+    (timestamp, value) pairs of a Monitoring.MonitoredItemData.  Values are
+    returned as strings, one per interval from start_time; empty ones are
+    skipped.
+    """
+    step = INTERVAL_SECONDS[interval]
+    start = to_timestamp(item.start_time)
+    points = []
+    for i, value in enumerate(item.data or []):
+        if value not in (None, ''):
+            points.append((start + i * step, float(value)))
+    return points
+
+
+def store_monitoring_data(store, monitoring, names, resource,
+                          interval='MINUTES5', function='AVG', end=None,
+                          window=timedelta(days=1)):
+    """
+    Query the monitored items names of one appliance (resource) and append
+    the values newer than what store (a TimeSeriesStore) holds.  Only the
+    time after the oldest watermark of these items is queried; without any
+    stored data the last window is.  Values of the interval that contains
+    end are not complete yet and are left for a later call.  Returns the
+    number of values stored.
+    """
+    end = end or datetime.utcnow()
+    step = INTERVAL_SECONDS[interval]
+    complete = to_timestamp(end) - step
+    watermarks = [store.watermark(series_counter(name, interval, function),
+                                  resource) for name in names]
+    if None in watermarks:
+        start = end - window
+    else:
+        start = from_timestamp(min(watermarks) + step)
+    if to_timestamp(start) > complete:
+        return 0
+    request = monitoring.MonitoredItemDataRequest(names=list(names),
+                                                  interval=interval,
+                                                  function=function,
+                                                  start_time=start,
+                                                  end_time=end)
+    stored = 0
+    for item in monitoring.query(request):
+        points = [(ts, val) for ts, val in item_points(item, interval)
+                  if ts <= complete]
+        stored += store.append(series_counter(item.name, interval, function),
+                               resource, points)
+    return stored
+
+
+class MonitoringClient(object):
+    """
+    Incremental collection of the monitoring data of one appliance into a
+    TimeSeriesStore.
+
+    The counter catalog (Monitoring.list) is cached in catalog_dir for
+    catalog_ttl seconds; the directory is private to the current user and
+    an unreadable catalog file is listed again.  fetch() queries only the
+    time after the watermark of every counter and interval: names are
+    sorted by watermark and split into batches of batch_size, so each query
+    covers the window its names need, and up to max_workers batches are
+    queried concurrently.
+    """
+
+    def __init__(self, monitoring, store, resource,
+                 catalog_dir=CATALOG_CACHE_DIR, catalog_ttl=86400,
+                 batch_size=20, max_workers=4):
+        self.monitoring = monitoring
+        self.store = store
+        self.resource = resource
+        self.catalog_path = os.path.join(catalog_dir,
+                                         '{}.json'.format(resource))
+        self.catalog_ttl = catalog_ttl
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self._catalog = None
+
+    def catalog(self, refresh=False):
+        """
+        Returns the Monitoring.MonitoredItem of every counter as dicts.
+        """
+        if self._catalog is not None and not refresh:
+            return self._catalog
+        path = self.catalog_path
+        private_dir(os.path.dirname(path))
+        if (not refresh and os.path.exists(path) and
+                time.time() - os.path.getmtime(path) < self.catalog_ttl):
+            try:
+                with open(path) as f:
+                    catalog = json.load(f)
+                # Every entry needs the fields counters() reads.
+                if not isinstance(catalog, list):
+                    raise TypeError('not a list of counters')
+                for item in catalog:
+                    item['id'], item['category']
+            except (ValueError, KeyError, TypeError) as e:
+                logging.warning('Ignoring unreadable counter catalog %s: %s',
+                                path, e)
+            else:
+                self._catalog = catalog
+                return self._catalog
+        self._catalog = [json.loads(item.to_json())
+                         for item in self.monitoring.list()]
+        with open(path + '.tmp', 'w') as f:
+            json.dump(self._catalog, f)
+        os.rename(path + '.tmp', path)
+        return self._catalog
+
+    def counters(self, categories=None):
+        """
+        Returns the ids of the counters in categories (of all counters if
+        categories is None).
+        """
+        return [item['id'] for item in self.catalog()
+                if categories is None or item['category'] in categories]
+
+    def fetch(self, names, interval='MINUTES5', function='AVG', end=None,
+              window=timedelta(days=1)):
+        """
+        Stores the new values of the counters names, see
+        store_monitoring_data.  Returns the number of values stored.
+        """
+        end = end or datetime.utcnow()
+
+        def watermark(name):
+            value = self.store.watermark(
+                series_counter(name, interval, function), self.resource)
+            return -1 if value is None else value
+
+        names = sorted(names, key=watermark)
+        batches = [names[i:i + self.batch_size]
+                   for i in range(0, len(names), self.batch_size)]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return sum(executor.map(
+                lambda batch: store_monitoring_data(
+                    self.store, self.monitoring, batch, self.resource,
+                    interval, function, end, window), batches))
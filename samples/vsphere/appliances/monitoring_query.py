@@ -15,26 +15,40 @@
 __author__ = 'VMware, Inc.'
 __vcenter_version__ = '6.7+'
 
-from vmware.vapi.vsphere.client import create_vsphere_client
 from datetime import datetime, timedelta
 
+from vmware.vapi.vsphere.client import create_vsphere_client
+
+from samples.vsphere.appliances.monitoring_helper import (
+    INTERVAL_SECONDS, MONITORING_STORE_DIR, MonitoringClient, from_timestamp,
+    series_counter, to_timestamp)
+from samples.vsphere.common.cache_util import private_dir
 from samples.vsphere.common import (sample_cli, sample_util)
 from samples.vsphere.common.ssl_helper import get_unverified_session
+from samples.vsphere.common.timeseries_store import TimeSeriesStore
 
 """
 Description: Demonstrates monitoring api workflow
-1. List all memory and cpu counters
-2. Query and print daily averages
+1. List all memory and cpu counters, from a cached counter catalog
+2. Query the daily averages newer than the ones stored locally, in
+   parallel batches, and store them
+3. Print the stored daily averages
 """
 
 MEMORY_CATEGORY = "com.vmware.applmgmt.mon.cat.memory"
 CPU_CATEGORY = "com.vmware.applmgmt.mon.cat.cpu"
 CATEGORIES = (MEMORY_CATEGORY, CPU_CATEGORY)
 METRIC_TITLE = "Metric"
-DAY = timedelta(days=1)
+INTERVAL = "DAY1"
+FUNCTION = "AVG"
 DATE_FORMAT = "%Y-%m-%d"
 
 parser = sample_cli.build_arg_parser()
+parser.add_argument('--store',
+                    default=MONITORING_STORE_DIR,
+                    help='Directory of the local store of monitoring data')
+parser.add_argument('--days', type=int, default=2,
+                    help='Number of days to query when nothing is stored')
 args = sample_util.process_cli_args(parser.parse_args())
 session = get_unverified_session() if args.skipverification else None
 client = create_vsphere_client(server=args.server,
@@ -44,31 +58,27 @@ client = create_vsphere_client(server=args.server,
 
 # Get the Monitoring interface
 monitoring = client.appliance.Monitoring
+monitoring_client = MonitoringClient(monitoring,
+                                     TimeSeriesStore(private_dir(args.store)),
+                                     args.server)
 
-# List the available counters
-counters = monitoring.list()
-
-# Get the names of counters that relate to CPU and Memory categories
-conterIds = []
-for counter in counters:
-    if counter.category in CATEGORIES:
-        conterIds.append(counter.id)
+# Get the names of counters that relate to CPU and Memory categories, the
+# counter list is only requested when the cached catalog is out of date
+conterIds = monitoring_client.counters(CATEGORIES)
 
 # Compute interval for last few days
-end = datetime.now()
-start = end - timedelta(days=2)
+end = datetime.utcnow()
+start = end - timedelta(days=args.days)
 
-# Query timeseries data
-query = monitoring.MonitoredItemDataRequest(names=conterIds,
-                            interval="DAY1",
-                            function="AVG",
-                            start_time=start,
-                            end_time=end)
-data = monitoring.query(query)
+# Query timeseries data newer than what is stored
+stored = monitoring_client.fetch(conterIds, interval=INTERVAL,
+                                 function=FUNCTION, end=end,
+                                 window=end - start)
 
 
 print("Example: Query Monitoring for Timeseries Data:")
 print("-------------------\n")
+print("{} new values stored\n".format(stored))
 
 # Create title and row format strings
 # We need one labeled column for every day between start and end
@@ -77,17 +87,18 @@ print("-------------------\n")
 title = METRIC_TITLE + (" " * (25 - len(METRIC_TITLE)))
 columnFormat = "{0:25}"
 
-idx = 0
-timestamp = start
+step = INTERVAL_SECONDS[INTERVAL]
+first = to_timestamp(start) - to_timestamp(start) % step
+days = list(range(first, to_timestamp(end), step))
 # Create columns for each day
-while timestamp <= end:
+for idx, day in enumerate(days):
     # 24 characters per column. In the title use 10 for date and 14 padding.
-    title += timestamp.strftime(DATE_FORMAT) + " " * 14
-    columnFormat += "{{1[{}]:24}}".format(idx)
-    # increment
-    idx = idx + 1
-    timestamp = timestamp + DAY
+    title += from_timestamp(day).strftime(DATE_FORMAT) + " " * 14
+    columnFormat += "{{1[{}]!s:24}}".format(idx)
 
 print(title)
-for item in data:
-    print(columnFormat.format(item.name, item.data))
+for name in conterIds:
+    values = dict(monitoring_client.store.query(
+        series_counter(name, INTERVAL, FUNCTION), args.server,
+        first, to_timestamp(end)))
+    print(columnFormat.format(name, [values.get(day, '') for day in days]))
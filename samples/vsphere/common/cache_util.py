@@ -0,0 +1,51 @@
+"""
+* *******************************************************
+* Copyright (c) VMware, Inc. 2024. All Rights Reserved.
+* SPDX-License-Identifier: MIT
+* *******************************************************
+*
+* DISCLAIMER. THIS PROGRAM IS PROVIDED TO YOU "AS IS" WITHOUT
+* WARRANTIES OR CONDITIONS OF ANY KIND, WHETHER ORAL OR WRITTEN,
+* EXPRESS OR IMPLIED. THE AUTHOR SPECIFICALLY DISCLAIMS ANY IMPLIED
+* WARRANTIES OR CONDITIONS OF MERCHANTABILITY, SATISFACTORY QUALITY,
+* NON-INFRINGEMENT AND FITNESS FOR A PARTICULAR PURPOSE.
+"""
+
+__author__ = 'VMware, Inc.'
+
+import os
+
+CACHE_APP_NAME = 'vsphere-automation-sdk-python'
+
+
+def user_cache_dir(name):
+    """
+    Returns the path of the cache directory name of the current user, under
+    $XDG_CACHE_HOME (~/.cache) or %LOCALAPPDATA% on Windows.  The directory
+    is not created, see private_dir.
+    """
+    if os.name == 'nt' and os.environ.get('LOCALAPPDATA'):
+        base = os.environ['LOCALAPPDATA']
+    else:
+        base = (os.environ.get('XDG_CACHE_HOME') or
+                os.path.join(os.path.expanduser('~'), '.cache'))
+    return os.path.join(base, CACHE_APP_NAME, name)
+
+
+def private_dir(path):
+    """
+    Creates the directory path, accessible only by the current user, if it
+    does not exist and returns path.  Cached files are trusted when they are
+    read back, so an existing directory owned by another user raises
+    OSError, and group or other permissions on one of our own are removed.
+    """
+    if not os.path.isdir(path):
+        os.makedirs(path, 0o700)
+    if hasattr(os, 'getuid'):
+        st = os.stat(path)
+        if st.st_uid != os.getuid():
+            raise OSError('Cache directory {} is not owned by the current '
+                          'user'.format(path))
+        if st.st_mode & 0o077:
+            os.chmod(path, 0o700)
+    return path
@@ -17,18 +17,85 @@ __author__ = 'Broadcom, Inc.'
 __copyright__ = 'Copyright 2013, 2024 Broadcom, Inc. All rights reserved.'
 
 import os
+import time
 from deprecated import deprecated
+from suds.cache import ObjectCache
 from suds.client import Client
 
+from samples.vsphere.common.cache_util import private_dir, user_cache_dir
+
+# Parsed WSDL objects are pickled here, so later runs skip parsing the WSDL
+# and its schemas.  Loading a pickle runs code, so the directory is private
+# to the current user.
+WSDL_CACHE_DIR = user_cache_dir('lookupservice-wsdl')
+
+
+class RegistrationSnapshot(object):
+    """
+    All service registrations of a lookup service, read with one List call
+    and indexed by (product, service type, endpoint type, protocol) and by
+    node id.
+    """
+
+    def __init__(self, registrations):
+        self.taken = time.time()
+        self.registrations = registrations
+        # (product, service, endpoint, protocol) -> [(registration, url)]
+        self.endpoints = {}
+        # node id -> [registration]
+        self.nodes = {}
+        for registration in registrations:
+            self.nodes.setdefault(registration.nodeId, []).append(registration)
+            service_type = registration.serviceType
+            seen = set()
+            for endpoint in registration.serviceEndpoints or []:
+                key = (service_type.product, service_type.type,
+                       endpoint.endpointType.type,
+                       endpoint.endpointType.protocol)
+                # Only the first matching endpoint of a registration is used.
+                if key in seen:
+                    continue
+                seen.add(key)
+                self.endpoints.setdefault(key, []).append(
+                    (registration, endpoint.url))
+
+    def age(self):
+        return time.time() - self.taken
+
+    def find(self, product, service, endpoint, protocol):
+        """
+        Returns a list of (registration, endpoint URL) of the registrations
+        that have a matching service and endpoint type.
+        """
+        return self.endpoints.get((product, service, endpoint, protocol), [])
+
+
 @deprecated(version='8.0U3', reason='Use well-known endpoint URLs instead of looking them up.')
 class LookupServiceHelper(object):
-    def __init__(self, wsdl_url, soap_url, skip_verification):
+    def __init__(self, wsdl_url, soap_url, skip_verification,
+                 wsdl_cache_dir=WSDL_CACHE_DIR, wsdl_cache_days=30,
+                 registration_ttl=300):
+        """
+        :type: :class:`str`
+        :param wsdl_cache_dir: Directory for the parsed WSDL, or None to parse
+            the WSDL on every connect.  It is created accessible only by the
+            current user; one owned by another user is refused.
+        :type: :class:`int`
+        :param wsdl_cache_days: Days after which the cached WSDL is parsed again
+        :type: :class:`int`
+        :param registration_ttl: Seconds for which the find methods answer
+            from the same registration snapshot
+        """
         self.wsdl_url = wsdl_url
         self.soap_url = soap_url
         self.skip_verification = skip_verification
+        self.wsdl_cache_dir = wsdl_cache_dir
+        self.wsdl_cache_days = wsdl_cache_days
+        self.registration_ttl = registration_ttl
         self.client = None
         self.managedObjectReference = None
         self.serviceRegistration = None
+        self.snapshot = None
 
     def connect(self):
         if self.client is None:
@@ -51,7 +118,16 @@ class LookupServiceHelper(object):
                     ssl._create_default_https_context = \
                         _create_unverified_https_context
 
-            self.client = Client(url=self.wsdl_url, location=self.soap_url)
+            if self.wsdl_cache_dir:
+                self.client = Client(url=self.wsdl_url, location=self.soap_url,
+                                     cache=ObjectCache(
+                                         location=private_dir(
+                                             self.wsdl_cache_dir),
+                                         days=self.wsdl_cache_days),
+                                     cachingpolicy=1)
+            else:
+                self.client = Client(url=self.wsdl_url, location=self.soap_url,
+                                     cache=None)
             assert self.client is not None
             self.client.set_options(service='LsService', port='LsPort')
 
@@ -64,6 +140,26 @@ class LookupServiceHelper(object):
             self.managedObjectReference)
 
         self.serviceRegistration = lookupServiceContent.serviceRegistration
+        self.snapshot = None
+
+    def get_registrations(self, refresh=False):
+        """
+        Returns the registration snapshot, listing all registrations with one
+        List call if there is none yet, it is older than registration_ttl or
+        refresh is set.
+
+        :rtype: :class:`RegistrationSnapshot`
+        """
+        assert self.client is not None
+        assert self.serviceRegistration is not None
+        if (refresh or self.snapshot is None or
+                self.snapshot.age() > self.registration_ttl):
+            # A filter without any criteria matches every registration.
+            lookupServiceRegistrationFilter = self.client.factory.create(
+                'ns0:LookupServiceRegistrationFilter')
+            self.snapshot = RegistrationSnapshot(self.client.service.List(
+                self.serviceRegistration, lookupServiceRegistrationFilter))
+        return self.snapshot
 
     def find_sso_urls(self):
         """
@@ -188,26 +284,14 @@ class LookupServiceHelper(object):
         Finds the endpoint URLs of a service running on management nodes.
         Returns a dictionary where the key is the management node id.
         """
-        assert self.client is not None
-        assert self.serviceRegistration is not None
-
-        lookupServiceRegistrationFilter = self.__create_filter_spec(product,
-                                                                    service,
-                                                                    endpoint,
-                                                                    protocol)
-
-        result = self.client.service.List(self.serviceRegistration,
-                                          lookupServiceRegistrationFilter)
+        result = self.get_registrations().find(product, service, endpoint,
+                                               protocol)
         assert len(result) > 0
         # Support for MxN
         # return the results in a dictionary where key is NodeId and Value is Service URL
         results_dict = {}
-        for lookupServiceRegistrationInfo in result:
-            lookupServiceRegistrationEndpoint = \
-                lookupServiceRegistrationInfo.serviceEndpoints[0]
-            assert lookupServiceRegistrationEndpoint is not None
-            results_dict[
-                lookupServiceRegistrationInfo.nodeId] = lookupServiceRegistrationEndpoint.url
+        for lookupServiceRegistrationInfo, url in result:
+            results_dict[lookupServiceRegistrationInfo.nodeId] = url
         return results_dict
 
     def __find_platform_service_urls(self, product, service, endpoint,
@@ -216,44 +300,10 @@ class LookupServiceHelper(object):
         Finds the endpoint URLs of a service running on PSCs (Platform Service Controller).
         Returns a list of service URLs since there is no node id associated with the PSC.
         """
-        assert self.client is not None
-        assert self.serviceRegistration is not None
-
-        lookupServiceRegistrationFilter = self.__create_filter_spec(product,
-                                                                    service,
-                                                                    endpoint,
-                                                                    protocol)
-
-        result = self.client.service.List(self.serviceRegistration,
-                                          lookupServiceRegistrationFilter)
+        result = self.get_registrations().find(product, service, endpoint,
+                                               protocol)
         assert len(result) > 0
-
-        urls = []
-        for lookupServiceRegistrationInfo in result:
-            lookupServiceRegistrationEndpoint = \
-                lookupServiceRegistrationInfo.serviceEndpoints[0]
-            assert lookupServiceRegistrationEndpoint is not None
-            urls.append(lookupServiceRegistrationEndpoint.url)
-        return urls
-
-    def __create_filter_spec(self, product, service, endpoint, protocol):
-        assert self.client is not None
-
-        lookupServiceRegistrationServiceType = self.client.factory.create(
-            'ns0:LookupServiceRegistrationServiceType')
-        lookupServiceRegistrationServiceType.product = product
-        lookupServiceRegistrationServiceType.type = service
-
-        lookupServiceRegistrationEndpointType = self.client.factory.create(
-            'ns0:LookupServiceRegistrationEndpointType')
-        lookupServiceRegistrationEndpointType.type = endpoint
-        lookupServiceRegistrationEndpointType.protocol = protocol
-
-        lookupServiceRegistrationFilter = self.client.factory.create(
-            'ns0:LookupServiceRegistrationFilter')
-        lookupServiceRegistrationFilter.serviceType = lookupServiceRegistrationServiceType
-        lookupServiceRegistrationFilter.endpointType = lookupServiceRegistrationEndpointType
-        return lookupServiceRegistrationFilter
+        return [url for _, url in result]
 
     def find_mgmt_nodes(self):
         """
@@ -262,30 +312,14 @@ class LookupServiceHelper(object):
         :rtype: dictionary
         :return: management node instance name and node id (UUID) in a dictionary
         """
-        assert self.client is not None
-        assert self.serviceRegistration is not None
-
-        lookupServiceRegistrationServiceType = self.client.factory.create(
-            'ns0:LookupServiceRegistrationServiceType')
-        lookupServiceRegistrationServiceType.product = 'com.vmware.cis'
-        lookupServiceRegistrationServiceType.type = 'vcenterserver'
-
-        lookupServiceRegistrationEndpointType = self.client.factory.create(
-            'ns0:LookupServiceRegistrationEndpointType')
-        lookupServiceRegistrationEndpointType.type = 'com.vmware.vim'
-        lookupServiceRegistrationEndpointType.protocol = 'vmomi'
-
-        lookupServiceRegistrationFilter = self.client.factory.create(
-            'ns0:LookupServiceRegistrationFilter')
-        lookupServiceRegistrationFilter.serviceType = lookupServiceRegistrationServiceType
-        lookupServiceRegistrationFilter.endpointType = lookupServiceRegistrationEndpointType
-
-        result = self.client.service.List(self.serviceRegistration,
-                                          lookupServiceRegistrationFilter)
+        result = self.get_registrations().find('com.vmware.cis',
+                                               'vcenterserver',
+                                               'com.vmware.vim',
+                                               'vmomi')
         assert len(result) > 0
 
         results_dict = {}
-        for lookupServiceRegistrationInfo in result:
+        for lookupServiceRegistrationInfo, _ in result:
             for lookupServiceRegistrationAttribute in lookupServiceRegistrationInfo.serviceAttributes:
                 if lookupServiceRegistrationAttribute.key == 'com.vmware.vim.vcenter.instanceName':
                     results_dict[
@@ -57,11 +57,11 @@ class PlatformServiceController(object):
 
         print('Retrieving a SAML bearer token from STS url : {0}'.format(
             self.stsurl))
-        au = sso.SsoAuthenticator(self.stsurl)
+        token_cache = sso.get_token_cache(self.stsurl)
         context = None
         if self.skip_verification:
             context = get_unverified_context()
-        self.bearer_token = au.get_bearer_saml_assertion(
+        self.bearer_token = token_cache.get_bearer_saml_assertion(
             self.ssousername, self.ssopassword, delegatable=True,
             ssl_context=context)
         self.sec_ctx = create_saml_bearer_security_context(self.bearer_token)
@@ -26,7 +26,14 @@ else:
 import sys
 import time
 import base64
+import calendar
+import collections
 import hashlib
+import os
+import select
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from pyVmomi.Security import ThumbprintMismatchException
 from uuid import uuid4
@@ -180,7 +187,9 @@ class SsoAuthenticator(object):
     def __init__(self,
                  sts_url,
                  sts_cert=None,
-                 thumbprint=None
+                 thumbprint=None,
+                 max_idle_connections=4,
+                 max_connection_keys=8
                  ):
         '''
         Initializer for SsoAuthenticator.
@@ -196,10 +205,107 @@ class SsoAuthenticator(object):
         @param       thumbprint: The SHA-1 thumbprint of the certificate used
                                  by the Security Token Service.  It is same
                                  thumbprint you can pass to pyVmomi SoapAdapter.
+        @type  max_idle_connections: C{int}
+        @param max_idle_connections: Number of verified connections kept open
+                                 for reuse per STS host and client key pair.
+        @type   max_connection_keys: C{int}
+        @param  max_connection_keys: Number of client key pair and SSL
+                                 settings combinations connections are kept
+                                 for.  The idle connections of the least
+                                 recently used one are closed beyond that.
         '''
         self._sts_cert = sts_cert
         self._sts_url = sts_url
         self._sts_thumbprint = thumbprint
+        self._max_idle_connections = max_idle_connections
+        self._max_connection_keys = max_connection_keys
+        self._idle_connections = collections.OrderedDict()
+        self._connections_lock = threading.Lock()
+
+    def _connect(self, host, public_key, private_key, ssl_context):
+        '''
+        Creates a new connection to the STS.  The server certificate is
+        verified when the connection is first used.
+        '''
+        if hasattr(ssl, '_create_unverified_context'):
+            # Python 2.7.9 has stronger SSL certificate validation, so we need
+            # to pass in a context when dealing with self-signed certificates.
+            return SSOHTTPSConnection(host=host,
+                                      key_file=private_key,
+                                      cert_file=public_key,
+                                      server_cert=self._sts_cert,
+                                      thumbprint=self._sts_thumbprint,
+                                      context=ssl_context)
+        # Versions of Python before 2.7.9 don't support
+        # the context parameter, so don't pass it on.
+        return SSOHTTPSConnection(host=host,
+                                  key_file=private_key,
+                                  cert_file=public_key,
+                                  server_cert=self._sts_cert,
+                                  thumbprint=self._sts_thumbprint)
+
+    def _acquire_connection(self, key):
+        '''
+        Returns an idle connection for key whose socket is still open, or
+        None.  Connections the server has closed while idle are dropped.
+        '''
+        while True:
+            with self._connections_lock:
+                connections = self._idle_connections.get(key)
+                if not connections:
+                    return None
+                webservice = connections.pop()
+                if not connections:
+                    del self._idle_connections[key]
+            if not _is_stale(webservice.sock):
+                return webservice
+            webservice.close()
+
+    def _release_connection(self, key, webservice):
+        evicted = []
+        with self._connections_lock:
+            connections = self._idle_connections.setdefault(key, [])
+            self._idle_connections.move_to_end(key)
+            if len(connections) < self._max_idle_connections:
+                connections.append(webservice)
+                webservice = None
+            while len(self._idle_connections) > self._max_connection_keys:
+                evicted.extend(self._idle_connections.popitem(last=False)[1])
+        if webservice is not None:
+            evicted.append(webservice)
+        for connection in evicted:
+            connection.close()
+
+    def close(self):
+        '''
+        Closes all idle connections to the STS.
+        '''
+        with self._connections_lock:
+            idle = self._idle_connections
+            self._idle_connections = collections.OrderedDict()
+        for connections in idle.values():
+            for webservice in connections:
+                webservice.close()
+
+    def _post(self, webservice, host, path, encoded_message):
+        '''
+        Sends the request over webservice and reads the whole response, so the
+        connection can be used again.
+        '''
+        webservice.putrequest("POST", path, skip_host=True)  # pylint: disable=E1101
+        webservice.putheader("Host", host)
+        webservice.putheader("User-Agent", "VMware/pyVmomi")
+        webservice.putheader("Accept", "text/xml, multipart/related")
+        webservice.putheader("Content-type", "text/xml; charset=\"UTF-8\"")
+        webservice.putheader("Content-length", "%d" % len(encoded_message))
+        webservice.putheader("Connection", "keep-alive")
+        webservice.putheader("SOAPAction",
+            "http://docs.oasis-open.org/ws-sx/ws-trust/200512/RST/Issue")
+        webservice.endheaders()
+        webservice.send(encoded_message)
+
+        saml_response = webservice.getresponse()
+        return saml_response, saml_response.read()
 
     def perform_request(self,
                         soap_message,
@@ -210,6 +316,10 @@ class SsoAuthenticator(object):
         Performs a Holder-of-Key SAML token request using the service user's
         certificates or a bearer token request using the user credentials.
 
+        Verified connections are kept alive and reused for later requests
+        with the same key pair and SSL context settings.  The authenticator
+        may be shared between threads; each request uses its own connection.
+
         @type      soap_message: C{str}
         @param     soap_message: Authentication SOAP request.
         @type        public_key: C{str}
@@ -227,39 +337,41 @@ class SsoAuthenticator(object):
         parsed = urlparse(self._sts_url)
         host = parsed.netloc  # pylint: disable=E1101
         encoded_message = soap_message.encode(UTF_8)
-        if hasattr(ssl, '_create_unverified_context'):
-            # Python 2.7.9 has stronger SSL certificate validation, so we need
-            # to pass in a context when dealing with self-signed certificates.
-            webservice = SSOHTTPSConnection(host=host,
-                                            key_file=private_key,
-                                            cert_file=public_key,
-                                            server_cert=self._sts_cert,
-                                            thumbprint=self._sts_thumbprint,
-                                            context=ssl_context)
+        key = (host, public_key, private_key, _ssl_context_key(ssl_context))
+
+        webservice = self._acquire_connection(key)
+        reused = webservice is not None
+        if not reused:
+            webservice = self._connect(host, public_key, private_key,
+                                       ssl_context)
+        try:
+            saml_response, body = self._post(webservice, host, parsed.path,
+                                             encoded_message)
+        except (six.moves.http_client.HTTPException, socket.error):
+            webservice.close()
+            if not reused:
+                raise
+            # The server closed the kept-alive connection in the meantime;
+            # try once more on a new one.
+            webservice = self._connect(host, public_key, private_key,
+                                       ssl_context)
+            try:
+                saml_response, body = self._post(webservice, host,
+                                                 parsed.path, encoded_message)
+            except Exception:
+                webservice.close()
+                raise
+        except Exception:
+            webservice.close()
+            raise
+
+        if saml_response.will_close:
+            webservice.close()
         else:
-            # Versions of Python before 2.7.9 don't support
-            # the context parameter, so don't pass it on.
-            webservice = SSOHTTPSConnection(host=host,
-                                            key_file=private_key,
-                                            cert_file=public_key,
-                                            server_cert=self._sts_cert,
-                                            thumbprint=self._sts_thumbprint)
-
-        webservice.putrequest("POST", parsed.path, skip_host=True)  # pylint: disable=E1101
-        webservice.putheader("Host", host)
-        webservice.putheader("User-Agent", "VMware/pyVmomi")
-        webservice.putheader("Accept", "text/xml, multipart/related")
-        webservice.putheader("Content-type", "text/xml; charset=\"UTF-8\"")
-        webservice.putheader("Content-length", "%d" % len(encoded_message))
-        webservice.putheader("Connection", "keep-alive")
-        webservice.putheader("SOAPAction",
-            "http://docs.oasis-open.org/ws-sx/ws-trust/200512/RST/Issue")
-        webservice.endheaders()
-        webservice.send(encoded_message)
+            self._release_connection(key, webservice)
 
-        saml_response = webservice.getresponse()
         if saml_response.status != 200:
-            faultraw = saml_response.read()
+            faultraw = body
             # Hopefully it is utf-8 or us-ascii, not Apache error message in Shift-JIS.
             fault = faultraw.decode(UTF_8)
             # Best effort at figuring out a SOAP fault.
@@ -270,7 +382,7 @@ class SsoAuthenticator(object):
                     raise SoapException(fault, *parsed_fault)
             raise Exception("Got response %s: %s\n%s" %
                             (saml_response.status, saml_response.msg, fault))
-        return saml_response.read()
+        return body
 
     def get_bearer_saml_assertion(self,
                                   username,
@@ -652,6 +764,292 @@ class SsoAuthenticator(object):
             pretty_print=False).decode(UTF_8)
 
 
+class SamlTokenCache(object):
+    '''
+    A cache of SAML assertions issued through an SsoAuthenticator, keyed by
+    principal and token type.  Cached assertions are returned while they are
+    valid and renewed in the background ahead of their NotOnOrAfter time.
+    Only tokens returned from the cache since they were issued or last
+    renewed are renewed; the others are dropped from the cache together with
+    the credentials needed to renew them.
+    '''
+
+    def __init__(self,
+                 authenticator,
+                 min_validity=30,
+                 refresh_ahead=120,
+                 background=True):
+        '''
+        Initializer for SamlTokenCache.
+
+        @type     authenticator: L{SsoAuthenticator}
+        @param    authenticator: Authenticator used to request the tokens.
+        @type      min_validity: C{long}
+        @param     min_validity: A cached token is only returned if it is valid
+                                 for at least this many seconds.
+        @type     refresh_ahead: C{long}
+        @param    refresh_ahead: Seconds before expiry at which a token is
+                                 renewed in the background.  At most half of
+                                 the token lifetime is used.
+        @type        background: C{boolean}
+        @param       background: Whether tokens are renewed by a timer thread.
+                                 If False they are renewed on the first request
+                                 after they stop being valid.
+        '''
+        self._authenticator = authenticator
+        self._min_validity = min_validity
+        self._refresh_ahead = refresh_ahead
+        self._background = background
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._key_locks = {}
+        self._timers = {}
+
+    def get_bearer_saml_assertion(self,
+                                  username,
+                                  password,
+                                  public_key=None,
+                                  private_key=None,
+                                  request_duration=60,
+                                  token_duration=600,
+                                  delegatable=False,
+                                  renewable=False,
+                                  ssl_context=None):
+        '''
+        Cached version of L{SsoAuthenticator.get_bearer_saml_assertion}.  Tokens
+        are cached per username, password, token options and SSL context
+        settings; equally configured contexts share a token.
+        '''
+        key = ('bearer', username,
+               hashlib.sha256(password.encode(UTF_8)).hexdigest(),
+               public_key, private_key, token_duration, delegatable,
+               renewable, _ssl_context_key(ssl_context))
+
+        def issue(current_token):
+            return self._authenticator.get_bearer_saml_assertion(
+                username, password,
+                public_key=public_key,
+                private_key=private_key,
+                request_duration=request_duration,
+                token_duration=token_duration,
+                delegatable=delegatable,
+                renewable=renewable,
+                ssl_context=ssl_context)
+
+        return self._get(key, issue)
+
+    def get_hok_saml_assertion(self,
+                               public_key,
+                               private_key,
+                               request_duration=60,
+                               token_duration=600,
+                               act_as_token=None,
+                               delegatable=False,
+                               renewable=False,
+                               ssl_context=None):
+        '''
+        Cached version of L{SsoAuthenticator.get_hok_saml_assertion}.  Tokens
+        are cached per key pair, token options and SSL context settings.
+        Renewable tokens are renewed with
+        L{SsoAuthenticator.get_token_by_token}.
+        '''
+        act_as = (hashlib.sha256(act_as_token.encode(UTF_8)).hexdigest()
+                  if act_as_token else None)
+        key = ('hok', public_key, private_key, act_as, token_duration,
+               delegatable, renewable, _ssl_context_key(ssl_context))
+
+        def issue(current_token):
+            if current_token is not None and renewable:
+                try:
+                    return self._authenticator.get_token_by_token(
+                        current_token,
+                        private_key,
+                        request_duration=request_duration,
+                        token_duration=token_duration,
+                        renewable=renewable,
+                        ssl_context=ssl_context)
+                except Exception:
+                    # Fall back to a new token request below.
+                    pass
+            return self._authenticator.get_hok_saml_assertion(
+                public_key,
+                private_key,
+                request_duration=request_duration,
+                token_duration=token_duration,
+                act_as_token=act_as_token,
+                delegatable=delegatable,
+                renewable=renewable,
+                ssl_context=ssl_context)
+
+        return self._get(key, issue)
+
+    def clear(self):
+        '''
+        Drops all cached tokens and stops their background renewal.
+        '''
+        with self._lock:
+            for timer in self._timers.values():
+                timer.cancel()
+            self._timers = {}
+            self._entries = {}
+
+    def _valid_entry(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry['expires'] - time.time() > self._min_validity:
+                entry['used'] = True
+                return entry
+        return None
+
+    def _get(self, key, issue):
+        entry = self._valid_entry(key)
+        if entry:
+            return entry['token']
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        # Only one thread requests a token for a key, the others wait for it.
+        with key_lock:
+            entry = self._valid_entry(key)
+            if entry:
+                return entry['token']
+            return self._refresh(key, issue)
+
+    def _refresh(self, key, issue):
+        with self._lock:
+            entry = self._entries.get(key)
+        current_token = None
+        if entry and entry['expires'] > time.time():
+            current_token = entry['token']
+        token = issue(current_token)
+        expires = get_saml_token_expiry(token)
+        with self._lock:
+            self._entries[key] = {'token': token, 'expires': expires,
+                                  'issue': issue, 'used': False}
+            if key in self._timers:
+                self._timers.pop(key).cancel()
+            lifetime = expires - time.time()
+            if self._background and lifetime > 0:
+                delay = lifetime - min(self._refresh_ahead, lifetime / 2)
+                timer = threading.Timer(delay, self._renew, (key,))
+                timer.daemon = True
+                self._timers[key] = timer
+                timer.start()
+        return token
+
+    def _renew(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            key_lock = self._key_locks.get(key)
+            if entry is not None and not entry['used']:
+                # Not requested since it was issued, stop renewing it.
+                del self._entries[key]
+                self._timers.pop(key, None)
+                self._key_locks.pop(key, None)
+                return
+        if entry is None or key_lock is None:
+            return
+        with key_lock:
+            try:
+                self._refresh(key, entry['issue'])
+            except Exception as e:
+                # The next request renews the token once it is no longer valid.
+                print("SAML token renewal failed: %s" % e)
+
+
+_token_caches = {}
+_token_caches_lock = threading.Lock()
+
+
+def get_token_cache(sts_url, sts_cert=None, thumbprint=None):
+    '''
+    Returns the SamlTokenCache shared within the process for the given STS.
+
+    @type           sts_url: C{str}
+    @param          sts_url: URL for the Security Token Service.
+    @type          sts_cert: C{str}
+    @param         sts_cert: The file with public key of the Security Token
+                             Service.
+    @type        thumbprint: C{str}
+    @param       thumbprint: The SHA-1 thumbprint of the certificate used by
+                             the Security Token Service.
+    @rtype: L{SamlTokenCache}
+    @return: Token cache for the STS.
+    '''
+    key = (sts_url, sts_cert, thumbprint)
+    with _token_caches_lock:
+        if key not in _token_caches:
+            _token_caches[key] = SamlTokenCache(
+                SsoAuthenticator(sts_url, sts_cert, thumbprint))
+        return _token_caches[key]
+
+
+def get_saml_token_expiry(saml_token):
+    '''
+    Returns the NotOnOrAfter time of the conditions of a SAML assertion.
+
+    @type  saml_token: C{str}
+    @param saml_token: SAML assertion.
+
+    @rtype: C{float}
+    @return: Expiry time in seconds since the epoch.
+    '''
+    if not isinstance(saml_token, bytes):
+        saml_token = saml_token.encode(UTF_8)
+    conditions = _extract_element(etree.fromstring(saml_token),
+                                  'Conditions',
+                                  {'saml2': "urn:oasis:names:tc:SAML:2.0:assertion"})
+    value = conditions.get('NotOnOrAfter')
+    if value is None:
+        raise KeyError("NotOnOrAfter does not seem to be present in the XML.")
+    seconds, _, fraction = value.rstrip('Z').partition('.')
+    expiry = calendar.timegm(time.strptime(seconds, '%Y-%m-%dT%H:%M:%S'))
+    if fraction:
+        expiry += float('0.' + fraction)
+    return expiry
+
+
+def get_saml_assertions(authenticator, principals, max_concurrency=4,
+                        ssl_context=None):
+    '''
+    Acquires SAML assertions for many principals concurrently.  Connections
+    to the STS are reused through the authenticator's connection pool, so
+    keep max_concurrency at or below its max_idle_connections.
+
+    @type     authenticator: L{SsoAuthenticator} or L{SamlTokenCache}
+    @param    authenticator: Used to request the tokens.
+    @type        principals: C{dict}
+    @param       principals: Maps a principal name to the keyword arguments of
+                             get_bearer_saml_assertion (if they contain a
+                             username) or get_hok_saml_assertion.
+    @type   max_concurrency: C{int}
+    @param  max_concurrency: Maximum number of requests sent to the STS at
+                             the same time.
+    @type       ssl_context: C{ssl.SSLContext}
+    @param      ssl_context: SSL context used for principals that do not set
+                             their own.
+    @rtype: C{dict}
+    @return: Maps each principal name to its SAML assertion, or to the
+             exception raised while requesting it.
+    '''
+    def acquire(kwargs):
+        kwargs = dict(kwargs)
+        kwargs.setdefault('ssl_context', ssl_context)
+        if 'username' in kwargs:
+            return authenticator.get_bearer_saml_assertion(**kwargs)
+        return authenticator.get_hok_saml_assertion(**kwargs)
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        futures = dict((executor.submit(acquire, kwargs), name)
+                       for name, kwargs in principals.items())
+        for future in as_completed(futures):
+            try:
+                results[futures[future]] = future.result()
+            except Exception as e:
+                results[futures[future]] = e
+    return results
+
+
 class SecurityTokenRequest(object):
     '''
     SecurityTokenRequest class handles the serialization of request to the STS
@@ -667,7 +1065,8 @@ class SecurityTokenRequest(object):
                  request_duration=60,
                  token_duration=600,
                  gss_binary_token=None,
-                 hok_token=None):
+                 hok_token=None,
+                 signing_context=None):
         '''
         Initializer for the SecurityToken Request class.
 
@@ -693,6 +1092,9 @@ class SecurityTokenRequest(object):
         @param   token_duraiton: The duration for which the SAML token is issued
                                  for. The duration is specified in seconds and
                                  the default is 600s.
+        @type   signing_context: L{SigningContext}
+        @param  signing_context: Already loaded key pair to sign the request
+                                 with, instead of public_key and private_key.
         '''
         self._timestamp_id = _generate_id()
         self._signature_id = _generate_id()
@@ -714,9 +1116,7 @@ class SecurityTokenRequest(object):
         self._renewable = str(False).lower()
         self._delegatable = str(False).lower()
         self._use_key = ""
-        self._private_key = None
         self._binary_exchange = None
-        self._public_key = None
         if gss_binary_token:
             self._binary_exchange = BINARY_EXCHANGE_TEMPLATE % gss_binary_token
         # The following are populated later. Set to None here to keep in-line
@@ -734,14 +1134,11 @@ class SecurityTokenRequest(object):
         self._xml = None
         self._request_digest = None
 
-        # These will only be populated if requesting an HoK token.
-        if self._private_key_file:
-            with open(self._private_key_file) as fp:
-                self._private_key = fp.read()
-
-        if self._public_key_file:
-            with open(self._public_key_file) as fp:
-                self._public_key = fp.read()
+        # This will only be populated if requesting an HoK token.
+        self._signing_context = signing_context
+        if signing_context is None and self._private_key_file:
+            self._signing_context = get_signing_context(self._private_key_file,
+                                                        self._public_key_file)
 
     def construct_bearer_token_request(self, delegatable=False, renewable=False):
         '''
@@ -795,8 +1192,13 @@ class SecurityTokenRequest(object):
         @rtype: C{str}
         @return: HoK token SOAP request in Unicode.
         '''
+        if (self._signing_context is None or
+                self._signing_context.certificate is None):
+            raise ValueError('A HoK token request needs the certificate of '
+                             'the signing key, pass public_key or a '
+                             'SigningContext created with public_key')
         self._binary_security_token = base64.b64encode(
-            _extract_certificate(self._public_key)).decode(UTF_8)
+            self._signing_context.certificate).decode(UTF_8)
         self._use_key = USE_KEY_TEMPLATE % self.__dict__
         self._security_token = BINARY_SECURITY_TOKEN_TEMPLATE % self.__dict__
         self._key_type = "http://docs.oasis-open.org/ws-sx/ws-trust/200512/PublicKey"
@@ -804,11 +1206,15 @@ class SecurityTokenRequest(object):
         self._delegatable = str(delegatable).lower()
         self._act_as_token = act_as_token
         if act_as_token is None:
-            self._xml_text = _canonicalize(REQUEST_TEMPLATE % self.__dict__)
+            # Exclusive canonicalization moves the namespace declarations of
+            # the template to the elements using them; parse that form so the
+            # request is sent exactly as canonicalized.
+            self._xml = _parse(_canonicalize(REQUEST_TEMPLATE % self.__dict__))
         else:
-            self._xml_text = ACTAS_REQUEST_TEMPLATE % self.__dict__
+            # Keep the ActAs token exactly as it was issued.
+            self._xml = etree.fromstring(ACTAS_REQUEST_TEMPLATE % self.__dict__)
         self.sign_request()
-        return etree.tostring(self._xml, pretty_print=False).decode(UTF_8)
+        return self._xml_text
 
     def construct_hok_by_hok_request(self, renewable=False):
         """
@@ -827,37 +1233,109 @@ class SecurityTokenRequest(object):
         Calculates the signature to the header of the SOAP request which can be
         used by the STS to verify that the SOAP message originated from a
         trusted service.
+
+        The Body and Timestamp digests are taken from the parsed request tree
+        (self._xml, parsed from self._xml_text if not set yet), so the request
+        is not serialized and parsed again for each of them.
         '''
-        base_xml = etree.fromstring(self._xml_text)
-        request_tree = _extract_element(base_xml,
+        if self._xml is None:
+            self._xml = etree.fromstring(self._xml_text)
+        request_tree = _extract_element(self._xml,
                             'Body',
                             {'SOAP-ENV': "http://schemas.xmlsoap.org/soap/envelope/"})
-        request = _canonicalize(etree.tostring(request_tree))
-        request_tree = _extract_element(base_xml,
+        self._request_digest = _make_hash(_c14n(request_tree)).decode(UTF_8)  # pylint: disable=W0612
+        request_tree = _extract_element(self._xml,
                             'Timestamp',
                             {'ns3': "http://docs.oasis-open.org/wss/2004/01/oasis-200401-wss-wssecurity-utility-1.0.xsd"})
-        timestamp = _canonicalize(etree.tostring(request_tree))
-        self._request_digest = _make_hash(request.encode(UTF_8)).decode(UTF_8)  # pylint: disable=W0612
-        self._timestamp_digest = _make_hash(timestamp.encode(UTF_8)).decode(UTF_8)  # pylint: disable=W0612
+        self._timestamp_digest = _make_hash(_c14n(request_tree)).decode(UTF_8)  # pylint: disable=W0612
         self._algorithm = SHA256
-        self._signed_info = _canonicalize(SIGNED_INFO_TEMPLATE % self.__dict__)
-        self._signature_value = _sign(self._private_key, self._signed_info).decode(UTF_8)
-        self._signature_text = _canonicalize(SIGNATURE_TEMPLATE % self.__dict__)
+        signed_info = _parse(SIGNED_INFO_TEMPLATE % self.__dict__)
+        self._signed_info = _c14n(signed_info).decode(UTF_8)
+        self._signature_value = self._signing_context.sign(
+            self._signed_info).decode(UTF_8)
+        self._signature = _build_signature(SIGNATURE_TEMPLATE, self.__dict__,
+                                           signed_info)
         self.embed_signature()
 
     def embed_signature(self):
         '''
         Embeds the signature in to the header of the SOAP request.
         '''
-        self._xml = etree.fromstring(self._xml_text)
         security = _extract_element(self._xml,
                                    'Security',
                                    {'ns6': "http://docs.oasis-open.org/wss/2004/01/oasis-200401-wss-wssecurity-secext-1.0.xsd"})
-        self._signature = etree.fromstring(self._signature_text)
         security.append(self._signature)
         self._xml_text = etree.tostring(self._xml).decode(UTF_8)
 
 
+class SigningContext(object):
+    '''
+    Private key (and optionally the certificate) of a service user, read and
+    parsed once so it can sign any number of requests.  Pass it to
+    SecurityTokenRequest or add_saml_context instead of the key files.
+    '''
+
+    def __init__(self, private_key, public_key=None):
+        '''
+        Initializer for the SigningContext class.
+
+        @type  private_key: C{str}
+        @param private_key: File containing the private key, in PEM format.
+        @type   public_key: C{str}
+        @param  public_key: File containing the certificate, in PEM format.
+        '''
+        self.private_key_file = private_key
+        self.public_key_file = public_key
+        with open(private_key) as fp:
+            self._pkey = _load_private_key(_extract_certificate(fp.read()))
+        self.certificate = None
+        if public_key:
+            with open(public_key) as fp:
+                self.certificate = _extract_certificate(fp.read())
+
+    def sign(self, data, digest=SHA256):
+        '''
+        Sign the 'data' with the private key.
+
+        @type    data: C{str}
+        @param   data: The data that needs to be signed.
+        @type  digest: C{str}
+        @param digest: Name of the message digest, 'sha256' or 'sha512'.
+
+        @rtype: C{bytes}
+        @return: Base64 encoded signature.
+        '''
+        return _sign_with_key(self._pkey, data, digest)
+
+
+_signing_contexts = {}
+_signing_contexts_lock = threading.Lock()
+
+
+def get_signing_context(private_key, public_key=None):
+    '''
+    Return a SigningContext for the key files, shared within the process.  The
+    files are parsed again only when one of them is modified.
+
+    @type  private_key: C{str}
+    @param private_key: File containing the private key, in PEM format.
+    @type   public_key: C{str}
+    @param  public_key: File containing the certificate, in PEM format.
+
+    @rtype: L{SigningContext}
+    '''
+    key = (private_key, public_key)
+    version = tuple(os.stat(path).st_mtime for path in key if path)
+    with _signing_contexts_lock:
+        entry = _signing_contexts.get(key)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+    signing_context = SigningContext(private_key, public_key)
+    with _signing_contexts_lock:
+        _signing_contexts[key] = (version, signing_context)
+    return signing_context
+
+
 def add_saml_context(serialized_request, saml_token, private_key_file):
     '''
     A helper method provided to sign the outgoing LoginByToken requests with the
@@ -868,25 +1346,26 @@ def add_saml_context(serialized_request, saml_token, private_key_file):
     @type               saml_token: C{str}
     @param              saml_token: SAML assertion that will be added to the SOAP
                                     request.
-    @type         private_key_file: C{str}
+    @type         private_key_file: C{str} or L{SigningContext}
     @param        private_key_file: Private key of the service user that will be
-                                    used to sign the request, in PEM format.
+                                    used to sign the request, in PEM format, or
+                                    a SigningContext holding it.
     @rtype: C{str}
     @return: signed SOAP request in Unicode.
     '''
-    with open(private_key_file) as fp:
-        private_key = fp.read()
+    if isinstance(private_key_file, SigningContext):
+        signing_context = private_key_file
+    else:
+        signing_context = get_signing_context(private_key_file)
     xml = etree.fromstring(serialized_request)
     value_map = {}
     value_map['_request_id'] = _generate_id()
     request_body = _extract_element(xml,
                                   'Body',
                                   {'soapenv': "http://schemas.xmlsoap.org/soap/envelope/"})
-    request_body.nsmap["wsu"] = "http://docs.oasis-open.org/wss/2004/01/oasis-200401-wss-wssecurity-utility-1.0.xsd"
     request_body.set("{http://docs.oasis-open.org/wss/2004/01/oasis-200401-wss-wssecurity-utility-1.0.xsd}Id", value_map['_request_id'])
     value_map['_request_digest'] = _make_hash_sha512(
-                                    _canonicalize(etree.tostring(request_body))
-                                        .encode(UTF_8)).decode(UTF_8)
+                                    _c14n(request_body)).decode(UTF_8)
     security = _extract_element(xml,
                                'Security',
                                {'ns6': "http://docs.oasis-open.org/wss/2004/01/oasis-200401-wss-wssecurity-secext-1.0.xsd"})
@@ -896,23 +1375,84 @@ def add_saml_context(serialized_request, saml_token, private_key_file):
     value_map['_request_expires'] = time.strftime(TIME_FORMAT,
                                         time.gmtime(current + 600))
     value_map['_timestamp_id'] = _generate_id()
-    timestamp = _canonicalize(TIMESTAMP_TEMPLATE % value_map)
+    timestamp = _parse(TIMESTAMP_TEMPLATE % value_map)
     value_map['_timestamp_digest'] = _make_hash_sha512(
-        timestamp.encode(UTF_8)).decode(UTF_8)
+        _c14n(timestamp)).decode(UTF_8)
 
-    security.append(etree.fromstring(timestamp))
+    security.append(timestamp)
     value_map['_algorithm'] = SHA512
-    value_map['_signed_info'] = _canonicalize(SIGNED_INFO_TEMPLATE % value_map)
-    value_map['_signature_value'] = _sign(private_key,
-                                          value_map['_signed_info'],
-                                          SHA512).decode(UTF_8)
-    value_map['samlId'] = etree.fromstring(saml_token).get("ID")
-    signature = etree.fromstring(_canonicalize(REQUEST_SIGNATURE_TEMPLATE %
-                                               value_map))
-    security.append(signature)
+    signed_info = _parse(SIGNED_INFO_TEMPLATE % value_map)
+    value_map['_signed_info'] = _c14n(signed_info).decode(UTF_8)
+    value_map['_signature_value'] = signing_context.sign(
+        value_map['_signed_info'], SHA512).decode(UTF_8)
+    value_map['samlId'] = _get_saml_id(saml_token)
+    security.append(_build_signature(REQUEST_SIGNATURE_TEMPLATE, value_map,
+                                     signed_info))
     return etree.tostring(xml, pretty_print=False).decode(UTF_8)
 
 
+def _get_saml_id(saml_token):
+    '''
+    An internal helper to read the ID of a SAML assertion.  The ID is an
+    attribute of the root element, so only the start tag is looked at instead
+    of parsing the whole assertion.
+
+    @type  saml_token: C{str}
+    @param saml_token: SAML assertion.
+
+    @rtype: C{str}
+    @return: The assertion ID.
+    '''
+    match = re.match(r'\s*<[^>]*?\sID="([^"]*)"', saml_token)
+    if match:
+        return match.group(1)
+    return etree.fromstring(saml_token).get("ID")
+
+
+def _is_stale(sock):
+    '''
+    An internal helper to check whether an idle keep-alive socket is unusable.
+    The server sends nothing on an idle connection, so a readable socket means
+    it was closed (or is in an unknown state).
+
+    @type  sock: C{socket.socket}
+    @param sock: Socket of an idle connection.  May be None.
+
+    @rtype: boolean
+    @return: True if the socket should not be used.
+    '''
+    if sock is None:
+        return True
+    try:
+        readable, _, _ = select.select([sock], [], [], 0)
+    except (socket.error, ValueError):
+        return True
+    return bool(readable)
+
+
+def _ssl_context_key(ssl_context):
+    '''
+    An internal helper that returns a hashable summary of the settings of an
+    SSL context.  Callers usually create a new context for every request (see
+    ssl_helper.get_unverified_context), so contexts that verify the server
+    the same way are treated as equal.
+
+    @type  ssl_context: C{ssl.SSLContext}
+    @param ssl_context: SSL context.  May be None.
+
+    @rtype: C{tuple}
+    @return: Protocol, verification mode, hostname check, options and the
+             SHA-256 digests of the loaded CA certificates.
+    '''
+    if ssl_context is None:
+        return None
+    ca_certs = ssl_context.get_ca_certs(binary_form=True)
+    return (ssl_context.protocol, ssl_context.verify_mode,
+            ssl_context.check_hostname, int(ssl_context.options),
+            tuple(sorted(hashlib.sha256(cert).hexdigest()
+                         for cert in ca_certs)))
+
+
 def _generate_id():
     '''
     An internal helper method to generate UUIDs.
@@ -948,7 +1488,7 @@ def _load_private_key(der_key):
             return crypto.load_privatekey(crypto.FILETYPE_PEM,
                                           '-----BEGIN {}-----\n{}-----END {}-----\n'.format(
                                               key_type,
-                                              base64.encodestring(der_key).decode(UTF_8),
+                                              _encode_base64_lines(der_key).decode(UTF_8),
                                               key_type),
                                           b'')
         except (crypto.Error, ValueError):
@@ -957,6 +1497,11 @@ def _load_private_key(der_key):
     raise
 
 
+# base64.encodestring was removed in Python 3.9.
+_encode_base64_lines = getattr(base64, 'encodebytes', None) or \
+    getattr(base64, 'encodestring')
+
+
 def _sign(private_key, data, digest=SHA256):
     '''
     An internal helper method to sign the 'data' with the 'private_key'.
@@ -976,7 +1521,33 @@ def _sign(private_key, data, digest=SHA256):
     # Convert private key in arbitrary format into DER (DER is binary format
     # so we get rid of \n / \r\n differences, and line breaks in PEM).
     pkey = _load_private_key(_extract_certificate(private_key))
-    return base64.b64encode(crypto.sign(pkey, data, digest))
+    return _sign_with_key(pkey, data, digest)
+
+
+def _sign_with_key(pkey, data, digest=SHA256):
+    '''
+    An internal helper method to sign the 'data' with an already loaded key.
+
+    @type    pkey: crypto.PKey
+    @param   pkey: The private key.
+    @type    data: C{str}
+    @param   data: The data that needs to be signed.
+    @type  digest: C{str}
+    @param digest: Name of the message digest, 'sha256' or 'sha512'.
+
+    @rtype: C{bytes}
+    @return: Base64 encoded signature.
+    '''
+    if hasattr(crypto, 'sign'):
+        return base64.b64encode(crypto.sign(pkey, data, digest))
+    # crypto.sign was removed from pyOpenSSL; sign with the key it wraps.
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.asymmetric import padding
+    if not isinstance(data, bytes):
+        data = data.encode(UTF_8)
+    algorithm = hashes.SHA512() if digest == SHA512 else hashes.SHA256()
+    return base64.b64encode(pkey.to_cryptography_key().sign(
+        data, padding.PKCS1v15(), algorithm))
 
 
 def _canonicalize(xml_string):
@@ -997,6 +1568,69 @@ def _canonicalize(xml_string):
     return string.getvalue().decode(UTF_8)
 
 
+def _parse(xml_string):
+    '''
+    An internal helper to parse a request template, dropping the whitespace
+    between elements like L{_canonicalize} does.
+
+    @type  xml_string: C{str}
+    @param xml_string: The XML string to parse.
+
+    @rtype: etree element.
+    @return: The root element.
+    '''
+    return etree.fromstring(xml_string, parser=_BLANK_REMOVING_PARSER.parser)
+
+
+class _BlankRemovingParser(threading.local):
+    # lxml parsers must not be shared between threads.
+    def __init__(self):
+        self.parser = etree.XMLParser(remove_blank_text=True)
+
+
+_BLANK_REMOVING_PARSER = _BlankRemovingParser()
+
+
+def _c14n(element):
+    '''
+    An internal helper to canonicalize an element of a parsed document in
+    place per U{http://www.w3.org/2001/10/xml-exc-c14n#}, without serializing
+    and parsing it again.
+
+    @type  element: etree element
+    @param element: The element to canonicalize.
+
+    @rtype: C{bytes}
+    @return: Canonical form in UTF-8.
+    '''
+    string = BytesIO()
+    etree.ElementTree(element).write_c14n(string, exclusive=True,
+                                          with_comments=False)
+    return string.getvalue()
+
+
+def _build_signature(template, value_map, signed_info):
+    '''
+    An internal helper to build a ds:Signature element from template and put
+    the already parsed SignedInfo element in it.
+
+    @type      template: C{str}
+    @param     template: SIGNATURE_TEMPLATE or REQUEST_SIGNATURE_TEMPLATE.
+    @type     value_map: C{dict}
+    @param    value_map: Values for the template other than _signed_info.
+    @type   signed_info: etree element
+    @param  signed_info: The SignedInfo element that was signed.
+
+    @rtype: etree element.
+    @return: The Signature element.
+    '''
+    values = dict(value_map)
+    values['_signed_info'] = ''
+    signature = _parse(template % values)
+    signature.insert(0, signed_info)
+    return signature
+
+
 def _extract_element(xml, element_name, namespace):
     '''
     An internal method provided to extract an element from the given XML.
@@ -0,0 +1,331 @@
+"""
+* *******************************************************
+* Copyright (c) VMware, Inc. 2024. All Rights Reserved.
+* SPDX-License-Identifier: MIT
+* *******************************************************
+*
+* DISCLAIMER. THIS PROGRAM IS PROVIDED TO YOU "AS IS" WITHOUT
+* WARRANTIES OR CONDITIONS OF ANY KIND, WHETHER ORAL OR WRITTEN,
+* EXPRESS OR IMPLIED. THE AUTHOR SPECIFICALLY DISCLAIMS ANY IMPLIED
+* WARRANTIES OR CONDITIONS OF MERCHANTABILITY, SATISFACTORY QUALITY,
+* NON-INFRINGEMENT AND FITNESS FOR A PARTICULAR PURPOSE.
+"""
+
+__author__ = 'VMware, Inc.'
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+import zlib
+from array import array
+
+# Chunk file: magic, point count, first timestamp, then the zlib compressed
+# timestamp deltas (int64) followed by the values (float64), little endian.
+CHUNK_MAGIC = b'TSC1'
+CHUNK_HEADER = struct.Struct('<4sIq')
+CHUNK_SUFFIX = '.chunk'
+META_FILE = 'series.json'
+
+ROLLUP_FUNCTIONS = {
+    'avg': lambda values: sum(values) / len(values),
+    'min': min,
+    'max': max,
+    'sum': sum,
+    'last': lambda values: values[-1],
+}
+
+
+def _encode_chunk(points):
+    timestamps = array('q', [ts for ts, _ in points])
+    first = timestamps[0]
+    deltas = array('q', [0])
+    deltas.extend(timestamps[i] - timestamps[i - 1]
+                  for i in range(1, len(timestamps)))
+    values = array('d', [val for _, val in points])
+    if sys.byteorder == 'big':
+        deltas.byteswap()
+        values.byteswap()
+    return (CHUNK_HEADER.pack(CHUNK_MAGIC, len(points), first) +
+            zlib.compress(deltas.tobytes() + values.tobytes()))
+
+
+def _read_chunk(path):
+    with open(path, 'rb') as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, count, first = CHUNK_HEADER.unpack_from(mm)
+            if magic != CHUNK_MAGIC:
+                raise ValueError('{} is not a chunk file'.format(path))
+            view = memoryview(mm)
+            try:
+                payload = zlib.decompress(view[CHUNK_HEADER.size:])
+            finally:
+                view.release()
+        finally:
+            mm.close()
+    deltas = array('q')
+    deltas.frombytes(payload[:8 * count])
+    values = array('d')
+    values.frombytes(payload[8 * count:])
+    if sys.byteorder == 'big':
+        deltas.byteswap()
+        values.byteswap()
+    points = []
+    ts = first
+    for delta, val in zip(deltas, values):
+        ts += delta
+        points.append((ts, val))
+    return points
+
+
+def _chunk_count(path):
+    with open(path, 'rb') as f:
+        magic, count, _ = CHUNK_HEADER.unpack(f.read(CHUNK_HEADER.size))
+    if magic != CHUNK_MAGIC:
+        raise ValueError('{} is not a chunk file'.format(path))
+    return count
+
+
+def _chunk_name(points):
+    return '{:012d}-{:012d}{}'.format(points[0][0], points[-1][0],
+                                      CHUNK_SUFFIX)
+
+
+def _chunk_range(name):
+    first, last = name[:-len(CHUNK_SUFFIX)].split('-')
+    return int(first), int(last)
+
+
+def downsample(points, step, function='avg'):
+    """
+    Aggregate (timestamp, value) points sorted by time into buckets of step
+    seconds.  Returns (bucket start, value) pairs.
+    """
+    aggregate = ROLLUP_FUNCTIONS[function]
+    result = []
+    bucket = None
+    values = []
+    for ts, val in points:
+        start = ts - ts % step
+        if start != bucket and values:
+            result.append((bucket, aggregate(values)))
+            values = []
+        bucket = start
+        values.append(val)
+    if values:
+        result.append((bucket, aggregate(values)))
+    return result
+
+
+class TimeSeriesStore(object):
+    """
+    Append-only local store of (timestamp, value) series, one per counter
+    and resource.
+
+    Each series is a directory of compressed chunk files named after the
+    first and last timestamp they hold.  The watermark of a series is the
+    newest stored timestamp; append() drops points at or before it, so
+    overlapping fetch windows are stored once, and callers only need to fetch
+    points newer than the watermark.  Chunks are read through mmap, and only
+    those overlapping a queried range are opened.
+
+    A store directory must be written by one process at a time.
+    """
+
+    def __init__(self, directory, chunk_points=4096):
+        self.directory = directory
+        self.chunk_points = chunk_points
+        self._lock = threading.Lock()
+        # series directory -> (counter, resource)
+        self._series = {}
+        # series directory -> sorted [(first, last, chunk file name)]
+        self._chunks = {}
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        for name in os.listdir(directory):
+            meta = os.path.join(directory, name, META_FILE)
+            if os.path.exists(meta):
+                with open(meta) as f:
+                    info = json.load(f)
+                self._series[name] = (info['counter'], info['resource'])
+                self._load_chunks(name)
+
+    @staticmethod
+    def _series_dir(counter, resource):
+        return hashlib.sha1(u'{}\n{}'.format(counter, resource).encode(
+            'utf-8')).hexdigest()[:20]
+
+    def _load_chunks(self, series_dir):
+        path = os.path.join(self.directory, series_dir)
+        chunks = []
+        for name in os.listdir(path):
+            if name.endswith(CHUNK_SUFFIX):
+                first, last = _chunk_range(name)
+                chunks.append((first, last, name))
+        # Appended chunks never overlap.  A chunk inside the range of
+        # another one is left over from an interrupted compact().
+        chunks.sort(key=lambda chunk: (chunk[0], -chunk[1]))
+        kept = []
+        for first, last, name in chunks:
+            if kept and last <= kept[-1][1]:
+                os.remove(os.path.join(path, name))
+            else:
+                kept.append((first, last, name))
+        self._chunks[series_dir] = kept
+
+    def _write_chunk(self, series_dir, points):
+        path = os.path.join(self.directory, series_dir)
+        name = _chunk_name(points)
+        tmp = os.path.join(path, name + '.tmp')
+        with open(tmp, 'wb') as f:
+            f.write(_encode_chunk(points))
+        os.rename(tmp, os.path.join(path, name))
+        return points[0][0], points[-1][0], name
+
+    def _write(self, series_dir, points):
+        self._chunks[series_dir].append(self._write_chunk(series_dir, points))
+        self._chunks[series_dir].sort()
+
+    def series(self):
+        """
+        Returns the (counter, resource) of every stored series.
+        """
+        with self._lock:
+            return sorted(self._series.values())
+
+    def watermark(self, counter, resource):
+        """
+        Returns the newest stored timestamp of a series, or None.
+        """
+        with self._lock:
+            chunks = self._chunks.get(self._series_dir(counter, resource))
+            return chunks[-1][1] if chunks else None
+
+    def min_watermark(self, counter=None):
+        """
+        Returns the oldest watermark of the series of counter (of all series
+        if counter is None), or None if there is no such series.
+        """
+        with self._lock:
+            watermarks = [self._chunks[series_dir][-1][1]
+                          for series_dir, (series_counter, _) in
+                          self._series.items()
+                          if self._chunks[series_dir] and
+                          (counter is None or series_counter == counter)]
+        return min(watermarks) if watermarks else None
+
+    def append(self, counter, resource, points):
+        """
+        Stores the (timestamp, value) points newer than the watermark of the
+        series and returns how many were stored.
+        """
+        series_dir = self._series_dir(counter, resource)
+        with self._lock:
+            if series_dir not in self._series:
+                path = os.path.join(self.directory, series_dir)
+                if not os.path.isdir(path):
+                    os.makedirs(path)
+                with open(os.path.join(path, META_FILE), 'w') as f:
+                    json.dump({'counter': counter, 'resource': resource}, f)
+                self._series[series_dir] = (counter, resource)
+                self._chunks[series_dir] = []
+            chunks = self._chunks[series_dir]
+            watermark = chunks[-1][1] if chunks else None
+            new = {}
+            for ts, val in points:
+                if watermark is None or ts > watermark:
+                    new[int(ts)] = float(val)
+            points = sorted(new.items())
+            for i in range(0, len(points), self.chunk_points):
+                self._write(series_dir, points[i:i + self.chunk_points])
+        return len(points)
+
+    def query(self, counter, resource, start=None, end=None):
+        """
+        Returns the stored (timestamp, value) points of a series with start
+        <= timestamp < end.
+        """
+        with self._lock:
+            series_dir = self._series_dir(counter, resource)
+            chunks = [name for first, last, name in
+                      self._chunks.get(series_dir, [])
+                      if (start is None or last >= start) and
+                      (end is None or first < end)]
+        points = []
+        for name in chunks:
+            for ts, val in _read_chunk(
+                    os.path.join(self.directory, series_dir, name)):
+                if (start is None or ts >= start) and (end is None or ts < end):
+                    points.append((ts, val))
+        return points
+
+    def rollup(self, counter, resource, step, function='avg', start=None,
+               end=None):
+        """
+        Returns the points of a series in [start, end) downsampled to one
+        value per step seconds.
+        """
+        return downsample(self.query(counter, resource, start, end), step,
+                          function)
+
+    def store_rollup(self, counter, resource, step, function='avg'):
+        """
+        Stores the complete step second buckets of a series that are newer
+        than the last stored bucket as series '<counter>@<function>:<step>',
+        so long ranges can be read at a lower resolution.  Returns the name
+        of the rollup counter.
+        """
+        rollup_counter = '{}@{}:{}'.format(counter, function, step)
+        done = self.watermark(rollup_counter, resource)
+        latest = self.watermark(counter, resource)
+        if latest is None:
+            return rollup_counter
+        # The bucket holding the newest point may still get more points.
+        complete = latest - latest % step
+        start = None if done is None else done + step
+        self.append(rollup_counter, resource,
+                    self.rollup(counter, resource, step, function, start,
+                                complete))
+        return rollup_counter
+
+    def compact(self):
+        """
+        Merges runs of consecutive chunks of every series that hold fewer
+        than chunk_points points together into one chunk per run.
+
+        A merged chunk covers exactly the time range of the chunks it
+        replaces, which are removed only after it is written.  If compact()
+        is interrupted, the chunks left over lie inside a merged one and
+        are removed when the store is opened again.
+        """
+        with self._lock:
+            for series_dir in list(self._chunks):
+                path = os.path.join(self.directory, series_dir)
+                runs = []
+                run = []
+                count = 0
+                for chunk in self._chunks[series_dir]:
+                    run.append(chunk)
+                    count += _chunk_count(os.path.join(path, chunk[2]))
+                    if count >= self.chunk_points:
+                        runs.append(run)
+                        run = []
+                        count = 0
+                if run:
+                    runs.append(run)
+                chunks = []
+                for run in runs:
+                    if len(run) == 1:
+                        chunks.extend(run)
+                        continue
+                    points = []
+                    for _, _, name in run:
+                        points.extend(_read_chunk(os.path.join(path, name)))
+                    chunks.append(self._write_chunk(series_dir, points))
+                    for _, _, name in run:
+                        os.remove(os.path.join(path, name))
+                self._chunks[series_dir] = chunks
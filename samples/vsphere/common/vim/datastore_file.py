@@ -14,6 +14,9 @@
 __author__ = 'VMware, Inc.'
 __copyright__ = 'Copyright 2016 VMware, Inc. All rights reserved.'
 
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
 import pyVim.task
 import requests
 from pyVmomi import vim
@@ -93,6 +96,36 @@ class FileArray(list):
         self._check_unique()
         return self[0].mkdir(path, parent)
 
+    def search(self, path=None):
+        self._check_unique()
+        return self[0].search(path)
+
+    def sync(self, local_dir, path=None, delete=False, max_workers=4):
+        self._check_unique()
+        return self[0].sync(local_dir, path, delete, max_workers)
+
+
+class SyncReport(object):
+    """
+    Outcome of File.sync: what was planned against what was transferred.
+    """
+    def __init__(self):
+        self.planned_files = []
+        self.planned_bytes = 0
+        self.uploaded = []
+        self.transferred_bytes = 0
+        self.created_folders = []
+        self.deleted = []
+        self.failed = {}
+
+    def __repr__(self):
+        return ('planned {} file(s) / {} bytes, uploaded {} file(s) / {} '
+                'bytes, created {} folder(s), deleted {}, failed {}'.format(
+                    len(self.planned_files), self.planned_bytes,
+                    len(self.uploaded), self.transferred_bytes,
+                    len(self.created_folders), len(self.deleted),
+                    len(self.failed)))
+
 
 class File(object):
     """
@@ -245,7 +278,7 @@ class File(object):
         elif src_url is not None:
             f = requests.get(src_url, stream=True)
         elif src_path is not None:
-            f = open(src_file, 'wb')
+            f = open(src_path, 'rb')
         elif content is None:
             raise Exception('No input provided for put')
 
@@ -330,8 +363,9 @@ class File(object):
         if debug:
             print("delete2: datastore_path is '{}'".format(datastore_path))
 
-            # TODO 'FileType' is not public?
-            # file_manager.Delete(self._datacenter_mo, datastore_path, 'File')
+        task = file_manager.DeleteDatastoreFile_Task(datastore_path,
+                                                     datacenter_mo)
+        pyVim.task.WaitForTask(task)
 
     def mkdir(self, path=None, parent=False):
         datacenter_mo = self._datacenter_mo
@@ -341,3 +375,135 @@ class File(object):
             print("mkdir: datastore_path is '{}'".format(datastore_path))
 
         file_manager.MakeDirectory(datastore_path, self._datacenter_mo, parent)
+
+    def search(self, path=None):
+        """
+        Recursively list everything below path.  Returns a dict keyed by the
+        '/' separated path relative to path whose values are the browser
+        FileInfo objects (with fileSize and modification filled in).
+        """
+        root = self.get_datastore_path(path)
+        browser = self._datastore_mo.browser
+        search_spec = vim.host.DatastoreBrowser.SearchSpec(
+            query=[vim.host.DatastoreBrowser.FolderQuery(),
+                   vim.host.DatastoreBrowser.Query()],
+            details=vim.host.DatastoreBrowser.FileInfo.Details(
+                fileType=True, fileSize=True, modification=True),
+            sortFoldersFirst=True)
+        if debug:
+            print("search: root='{}' search_spec='{}'".
+                  format(root, search_spec))
+        task = browser.SearchSubFolders(root, search_spec)
+        pyVim.task.WaitForTask(task)
+
+        entries = {}
+        for result in task.info.result:
+            folder = result.folderPath[len(root):].strip().strip('/')
+            for f in result.file or []:
+                rel_path = '/'.join([p for p in [folder, f.path] if p])
+                entries[rel_path] = f
+        return entries
+
+    def sync(self, local_dir, path=None, delete=False, max_workers=4):
+        """
+        Make the datastore folder at path match local_dir.  Files that are
+        missing remotely, differ in size or are newer locally are uploaded in
+        parallel; with delete=True remote entries that no longer exist
+        locally are removed.  Returns a SyncReport.
+        """
+        report = SyncReport()
+        local = _scan_local_dir(local_dir)
+        try:
+            remote = self.search(path)
+        except vim.fault.FileNotFound:
+            remote = {}
+            self.mkdir(path, parent=True)
+            report.created_folders.append('')
+
+        for rel_path in sorted(local):
+            if local[rel_path] is None and rel_path not in remote:
+                self.mkdir(self._join(path, rel_path), parent=True)
+                report.created_folders.append(rel_path)
+
+        for rel_path in sorted(local):
+            st = local[rel_path]
+            if st is None:
+                continue
+            info = remote.get(rel_path)
+            if isinstance(info, vim.host.DatastoreBrowser.FolderInfo):
+                report.failed[rel_path] = Exception(
+                    "'{}' is a folder on the datastore".format(rel_path))
+                continue
+            if (info is None or info.fileSize != st.st_size or
+                    info.modification is None or
+                    st.st_mtime > info.modification.timestamp()):
+                report.planned_files.append(rel_path)
+                report.planned_bytes += st.st_size
+
+        if debug:
+            print("sync: {}".format(report))
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {}
+            for rel_path in report.planned_files:
+                src_path = os.path.join(local_dir, *rel_path.split('/'))
+                future = executor.submit(self.put,
+                                         path=self._join(path, rel_path),
+                                         src_path=src_path)
+                futures[future] = rel_path
+            for future in as_completed(futures):
+                rel_path = futures[future]
+                try:
+                    future.result()
+                except Exception as e:
+                    report.failed[rel_path] = e
+                else:
+                    report.uploaded.append(rel_path)
+                    report.transferred_bytes += local[rel_path].st_size
+
+        if delete:
+            # Sorted order visits a folder before its contents, so anything
+            # below an already deleted folder is skipped
+            deleted_folders = []
+            for rel_path in sorted(remote):
+                if rel_path in local:
+                    continue
+                if any(rel_path.startswith(d + '/') for d in deleted_folders):
+                    continue
+                try:
+                    if isinstance(remote[rel_path],
+                                  vim.host.DatastoreBrowser.FolderInfo):
+                        self.delete2(self._join(path, rel_path))
+                        deleted_folders.append(rel_path)
+                    else:
+                        self.delete(self._join(path, rel_path))
+                except Exception as e:
+                    report.failed[rel_path] = e
+                else:
+                    report.deleted.append(rel_path)
+
+        return report
+
+    @staticmethod
+    def _join(path, rel_path):
+        return '/'.join([p for p in [path, rel_path] if p])
+
+
+def _scan_local_dir(local_dir):
+    """
+    Walk local_dir with os.scandir.  Returns a dict keyed by the '/'
+    separated relative path; folders map to None and files to their stat.
+    """
+    entries = {}
+    pending = ['']
+    while pending:
+        rel_dir = pending.pop()
+        with os.scandir(os.path.join(local_dir, *rel_dir.split('/'))) as it:
+            for entry in it:
+                rel_path = '/'.join([p for p in [rel_dir, entry.name] if p])
+                if entry.is_dir():
+                    entries[rel_path] = None
+                    pending.append(rel_path)
+                elif entry.is_file():
+                    entries[rel_path] = entry.stat()
+    return entries
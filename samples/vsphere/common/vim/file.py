@@ -125,3 +125,23 @@ def delete_file(client, service_instance,
     if dsfile.exists(datastore_path):
         print("Deleting {} file '{}'.".format(description, datastore_path))
         dsfile.delete(path)
+
+
+def sync_directory(context, description, datacenter_name, local_dir,
+                   datastore_path, delete=False):
+    """Upload new or changed files from local_dir to a datastore folder"""
+    (datastore_name, path) = parse_datastore_path(datastore_path)
+    datastore_mo = get_datastore_mo(context.client,
+                                    context.service_instance._stub,
+                                    datacenter_name,
+                                    datastore_name)
+    if not datastore_mo:
+        raise Exception("Could not find datastore '{}'".format(datastore_name))
+
+    dsfile = datastore_file.File(datastore_mo)
+    print("Syncing {} directory '{}' to '{}'".format(description, local_dir,
+                                                     datastore_path))
+    report = dsfile.sync(local_dir, path, delete=delete)
+    print("Synced {} directory '{}': {}".format(description, datastore_path,
+                                                report))
+    return report
@@ -149,6 +149,140 @@ def wait_for_tasks(content, tasks):
             task_filter.Destroy()
 
 
+def wait_for_tasks_info(content, tasks, callback=None):
+    """
+    Given the tasks, waits for all of them through a single property collector
+    filter and returns their final TaskInfo in the same order as tasks.
+    Unlike wait_for_tasks a failed task does not end the wait; check
+    TaskInfo.state and TaskInfo.error instead.  If given, callback is called
+    with each final TaskInfo as soon as its task completes.
+    """
+    pending = set(str(task) for task in tasks)
+    infos = {}
+    if not pending:
+        return []
+
+    objSpecs = [
+        vmodl.query.PropertyCollector.ObjectSpec(obj=task) for task in tasks
+    ]
+    propSpec = vmodl.query.PropertyCollector.PropertySpec(
+        type=vim.Task, pathSet=['info'], all=False)
+    filterSpec = vmodl.query.PropertyCollector.FilterSpec()
+    filterSpec.objectSet = objSpecs
+    filterSpec.propSet = [propSpec]
+    task_filter = content.propertyCollector.CreateFilter(filterSpec, True)
+
+    try:
+        version = None
+        while pending:
+            update = content.propertyCollector.WaitForUpdates(version)
+            for filterSet in update.filterSet:
+                for objSet in filterSet.objectSet:
+                    key = str(objSet.obj)
+                    for change in objSet.changeSet:
+                        if change.name != 'info' or key not in pending:
+                            continue
+                        info = change.val
+                        if info.state in (vim.TaskInfo.State.success,
+                                          vim.TaskInfo.State.error):
+                            pending.remove(key)
+                            infos[key] = info
+                            if callback:
+                                callback(info)
+            version = update.version
+    finally:
+        if task_filter:
+            task_filter.Destroy()
+
+    return [infos[str(task)] for task in tasks]
+
+
+class TaskWatcher(object):
+    """
+    Waits on tasks that are submitted over time through one dedicated
+    property collector.  Tasks can be added while others are still running;
+    wait() returns the TaskInfo of the tasks that completed since the last
+    call.
+    """
+
+    def __init__(self, content):
+        self._collector = content.propertyCollector.CreatePropertyCollector()
+        self._filters = {}
+        self._version = None
+
+    def add(self, task):
+        objSpec = vmodl.query.PropertyCollector.ObjectSpec(obj=task)
+        propSpec = vmodl.query.PropertyCollector.PropertySpec(
+            type=vim.Task, pathSet=['info'], all=False)
+        filterSpec = vmodl.query.PropertyCollector.FilterSpec(
+            objectSet=[objSpec], propSet=[propSpec])
+        self._filters[str(task)] = self._collector.CreateFilter(filterSpec,
+                                                                True)
+
+    @property
+    def pending(self):
+        return len(self._filters)
+
+    def wait(self, max_wait_seconds=None):
+        """
+        Block until at least one task completes or max_wait_seconds passes,
+        and return the final TaskInfo of every task that completed.
+        """
+        done = []
+        options = vmodl.query.PropertyCollector.WaitOptions(
+            maxWaitSeconds=max_wait_seconds)
+        while self._filters and not done:
+            update = self._collector.WaitForUpdatesEx(self._version, options)
+            if update is None:
+                break
+            for filterSet in update.filterSet:
+                for objSet in filterSet.objectSet:
+                    key = str(objSet.obj)
+                    for change in objSet.changeSet:
+                        if change.name != 'info' or key not in self._filters:
+                            continue
+                        if change.val.state in (vim.TaskInfo.State.success,
+                                                vim.TaskInfo.State.error):
+                            self._filters.pop(key).Destroy()
+                            done.append(change.val)
+            self._version = update.version
+        return done
+
+    def close(self):
+        self._filters = {}
+        self._collector.Destroy()
+
+
+def get_properties(content, mo_type, objs, path_set):
+    """
+    Retrieve path_set of every managed object in objs with a single property
+    collector call.  Returns a dict of object to a dict of property values.
+    Objects that do not exist (any more) are left out of the result.
+    """
+    objs = list(objs)
+    while objs:
+        filterSpec = vmodl.query.PropertyCollector.FilterSpec(
+            objectSet=[vmodl.query.PropertyCollector.ObjectSpec(obj=obj)
+                       for obj in objs],
+            propSet=[vmodl.query.PropertyCollector.PropertySpec(
+                type=mo_type, pathSet=path_set)])
+        try:
+            contents = content.propertyCollector.RetrieveContents(
+                [filterSpec])
+        except vmodl.fault.ManagedObjectNotFound as e:
+            # One missing object faults the whole call; ask again without it.
+            if e.obj not in objs:
+                raise
+            objs.remove(e.obj)
+            continue
+        result = {}
+        for objContent in contents:
+            result[objContent.obj] = dict((prop.name, prop.val)
+                                          for prop in objContent.propSet)
+        return result
+    return {}
+
+
 def get_cluster_name_by_id(content, name):
     cluster_obj = get_obj(content, [vim.ClusterComputeResource], name)
     if cluster_obj is not None:
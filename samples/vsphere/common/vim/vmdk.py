@@ -15,19 +15,22 @@ __author__ = 'VMware, Inc.'
 
 import pyVim.task
 from pyVmomi import vim
+from samples.vsphere.common.vim.helpers.vim_utils import wait_for_tasks_info
 from samples.vsphere.common.vim.inventory import get_datastore_mo
 
 from samples.vsphere.common.vim import datastore_file
 
 
+def _vmdk_spec():
+    return vim.VirtualDiskManager.SeSparseVirtualDiskSpec(
+        diskType='seSparse', adapterType='lsiLogic',
+        capacityKb=1024 * 1024 * 4)
+
+
 def create_vmdk(service_instance, datacenter_mo, datastore_path):
     """Create vmdk in specific datacenter"""
     vdm = service_instance.content.virtualDiskManager
-    task = vdm.CreateVirtualDisk(
-        datastore_path, datacenter_mo,
-        vim.VirtualDiskManager.SeSparseVirtualDiskSpec(
-            diskType='seSparse', adapterType='lsiLogic',
-            capacityKb=1024 * 1024 * 4))
+    task = vdm.CreateVirtualDisk(datastore_path, datacenter_mo, _vmdk_spec())
     pyVim.task.WaitForTask(task)
     print("Created VMDK '{}' in Datacenter '{}'".
           format(datastore_path, datacenter_mo.name))
@@ -41,6 +44,46 @@ def delete_vmdk(service_instance, datacenter_mo, datastore_path):
     pyVim.task.WaitForTask(task)
 
 
+def create_vmdks(service_instance, specs):
+    """
+    Create many vmdks at once.  specs is a list of (datacenter_mo,
+    datastore_path) pairs; all CreateVirtualDisk tasks are submitted before
+    waiting on them together.  Returns the final TaskInfo of every task, in
+    the order of specs.
+    """
+    vdm = service_instance.content.virtualDiskManager
+    tasks = [vdm.CreateVirtualDisk(datastore_path, datacenter_mo, _vmdk_spec())
+             for (datacenter_mo, datastore_path) in specs]
+    infos = wait_for_tasks_info(service_instance.content, tasks)
+
+    for (datacenter_mo, datastore_path), info in zip(specs, infos):
+        if info.state == vim.TaskInfo.State.success:
+            print("Created VMDK '{}' in Datacenter '{}'".
+                  format(datastore_path, datacenter_mo.name))
+        else:
+            print("Failed to create VMDK '{}' in Datacenter '{}': {}".
+                  format(datastore_path, datacenter_mo.name, info.error.msg))
+    return infos
+
+
+def delete_vmdks(service_instance, specs):
+    """
+    Delete many vmdks at once.  specs is a list of (datacenter_mo,
+    datastore_path) pairs.  Returns the final TaskInfo of every task, in the
+    order of specs.
+    """
+    vdm = service_instance.content.virtualDiskManager
+    tasks = [vdm.DeleteVirtualDisk(datastore_path, datacenter_mo)
+             for (datacenter_mo, datastore_path) in specs]
+    infos = wait_for_tasks_info(service_instance.content, tasks)
+
+    for (datacenter_mo, datastore_path), info in zip(specs, infos):
+        if info.state != vim.TaskInfo.State.success:
+            print("Failed to delete VMDK '{}' in Datacenter '{}': {}".
+                  format(datastore_path, datacenter_mo.name, info.error.msg))
+    return infos
+
+
 def detect_vmdk(client, soap_stub, datacenter_name, datastore_name,
                 datastore_path):
     """Find vmdk in specific datastore"""
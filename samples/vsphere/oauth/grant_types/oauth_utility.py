@@ -19,7 +19,10 @@ from com.vmware.vcenter.identity_client import Providers
 from com.vmware.vcenter.tokenservice_client import TokenExchange
 from vmware.vapi.security.oauth import create_oauth_security_context
 import base64
+import hashlib
 from lxml import etree
+import threading
+import time
 import uuid
 
 # Constants
@@ -30,6 +33,8 @@ REFRESH_TOKEN = "refresh_token"
 PASSWORD = "password"
 OAUTH2_CONFIG_TYPE = "oauth2"
 OIDC_CONFIG_TYPE = "oidc"
+# Lifetime assumed for tokens returned without expires_in, in seconds
+DEFAULT_TOKEN_LIFETIME = 300
 
 
 def get_identity_provider(server, session):
@@ -59,6 +64,13 @@ def get_saml_assertion(server, session, access_token, id_token=None):
     Sample can be found at
     https://github.com/vmware/vsphere-automation-sdk-python/blob/master/samples/vsphere/oauth/exchange_access_id_token_for_saml.py
     """
+    return _exchange_token(server, session, access_token, id_token)[0]
+
+
+def _exchange_token(server, session, access_token, id_token=None):
+    """
+    Return the saml assertion and its expires_in (None if not returned)
+    """
     stub_config = StubConfigurationFactory.new_std_configuration(
         get_requests_connector(
             session=session,
@@ -84,7 +96,7 @@ def get_saml_assertion(server, session, access_token, id_token=None):
                             bytes(saml_token, 'utf-8')
                         ))
                     ).decode('utf-8')
-    return samlAssertion
+    return samlAssertion, response.expires_in
 
 
 def get_endpoints(identity_provider):
@@ -111,6 +123,23 @@ def get_endpoints(identity_provider):
     return [auth_endpoint, token_endpoint, auth_query_params]
 
 
+_endpoints = {}
+_endpoints_lock = threading.Lock()
+
+
+def get_cached_endpoints(server, session):
+    """
+    Return get_endpoints of the default identity provider of server.  The
+    providers are listed once per server and process.
+    """
+    with _endpoints_lock:
+        if server not in _endpoints:
+            _endpoints[server] = get_endpoints(
+                get_identity_provider(server, session))
+        auth_endpoint, token_endpoint, auth_query_params = _endpoints[server]
+    return [auth_endpoint, token_endpoint, dict(auth_query_params)]
+
+
 def get_basic_auth_string(id, secret):
     """
     Return authorization string
@@ -120,24 +149,148 @@ def get_basic_auth_string(id, secret):
     return auth_string
 
 
+class OAuthTokenManager(object):
+    """
+    Access token of one OAuth client, and the SAML assertion it is exchanged
+    for, cached until shortly before they expire.
+
+    The first token is requested with grant_type and grant_params.  Once the
+    token has less than refresh_ahead seconds (at most half its lifetime)
+    left it is renewed with the
+    refresh_token grant if a refresh token was issued, or with the original
+    grant otherwise.  If the refresh token is rejected the original grant is
+    used again, unless it is an authorization code or a refresh token that
+    cannot be repeated.  Renewals are serialized, so threads that need a
+    token at the same time share one request to the identity provider.
+    """
+
+    def __init__(self, server, session, client_id, client_secret,
+                 grant_type=CLIENT_CREDENTIALS, grant_params=None,
+                 refresh_token=None, refresh_ahead=60, min_validity=10):
+        self.server = server
+        self.session = session
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.grant_type = grant_type
+        self.grant_params = grant_params or {}
+        self.refresh_ahead = refresh_ahead
+        self.min_validity = min_validity
+        self.access_token = None
+        self.refresh_token = refresh_token
+        self.issued = 0
+        self.expires = 0
+        self._saml_assertion = None
+        self._saml_access_token = None
+        self._saml_id_token = None
+        self._saml_expires = 0
+        self._lock = threading.Lock()
+
+    def _request_token(self):
+        if self.refresh_token and (self.access_token or
+                                   self.grant_type == REFRESH_TOKEN):
+            try:
+                return self._post_token({
+                    "grant_type": REFRESH_TOKEN,
+                    "refresh_token": self.refresh_token
+                })
+            except Exception:
+                # Expired or revoked refresh token
+                if self.grant_type in (REFRESH_TOKEN, AUTHORIZATION_CODE):
+                    raise
+                self.refresh_token = None
+        self._post_token(dict(self.grant_params, grant_type=self.grant_type))
+
+    def _post_token(self, data):
+        _, token_endpoint, _ = get_cached_endpoints(self.server, self.session)
+        headers = {
+            "Content-Type": "application/x-www-form-urlencoded",
+            "Authorization": get_basic_auth_string(self.client_id,
+                                                   self.client_secret),
+            "Accept": "application/json"
+        }
+        requested = time.time()
+        response = self.session.post(token_endpoint, headers=headers,
+                                     data=data).json()
+        if 'access_token' not in response:
+            raise Exception('Token request failed: {}'.format(
+                response.get('error_description', response.get('error'))))
+        self.access_token = response['access_token']
+        self.refresh_token = response.get('refresh_token', self.refresh_token)
+        self.issued = requested
+        self.expires = requested + int(response.get('expires_in',
+                                                    DEFAULT_TOKEN_LIFETIME))
+
+    def get_access_token(self):
+        """
+        Return an access token valid for at least min_validity seconds.
+        """
+        with self._lock:
+            remaining = self.expires - time.time()
+            refresh_ahead = min(self.refresh_ahead,
+                                (self.expires - self.issued) / 2.0)
+            if self.access_token is not None and remaining > refresh_ahead:
+                return self.access_token
+            try:
+                self._request_token()
+            except Exception:
+                # Keep using the current token while it is still valid.
+                if self.access_token is None or \
+                        remaining <= self.min_validity:
+                    raise
+            return self.access_token
+
+    def get_saml_assertion(self, id_token=None):
+        """
+        Return the SAML assertion get_saml_assertion exchanges the access
+        token and id_token for.  The exchange is repeated only for a new
+        access token or id_token, or when the assertion is about to expire.
+        """
+        access_token = self.get_access_token()
+        with self._lock:
+            if self._saml_access_token != access_token or \
+                    self._saml_id_token != id_token or \
+                    self._saml_expires - time.time() <= self.min_validity:
+                self._saml_assertion, expires_in = _exchange_token(
+                    self.server, self.session, access_token, id_token)
+                self._saml_access_token = access_token
+                self._saml_id_token = id_token
+                self._saml_expires = self.expires
+                if expires_in:
+                    self._saml_expires = min(self.expires,
+                                             time.time() + expires_in)
+            return self._saml_assertion
+
+
+_token_managers = {}
+_token_managers_lock = threading.Lock()
+
+
+def get_token_manager(server, session, client_id, client_secret,
+                      grant_type=CLIENT_CREDENTIALS, grant_params=None,
+                      refresh_token=None):
+    """
+    Return the OAuthTokenManager shared within the process for the server,
+    client and grant.  Secrets are only kept in the key as a digest.
+    """
+    secrets = repr((client_secret, sorted((grant_params or {}).items()),
+                    refresh_token))
+    key = (server, client_id, grant_type,
+           hashlib.sha256(secrets.encode()).hexdigest())
+    with _token_managers_lock:
+        if key not in _token_managers:
+            _token_managers[key] = OAuthTokenManager(
+                server, session, client_id, client_secret,
+                grant_type=grant_type, grant_params=grant_params,
+                refresh_token=refresh_token)
+        return _token_managers[key]
+
+
 def login_using_client_credentials(server, session, client_id, client_secret):
     """
     Get access token when grant_type is client_credentials
     """
-    identity_provider = get_identity_provider(server, session)
-    [discovery_endpoint, token_endpoint, auth_query_params] = \
-        get_endpoints(identity_provider)
-    headers = {
-        'Content-Type': 'application/x-www-form-urlencoded',
-        'Authorization': get_basic_auth_string(client_id, client_secret),
-        'Accept': 'application/json'
-    }
-    data = {
-        'grant_type': CLIENT_CREDENTIALS
-    }
-    response = session.post(token_endpoint, headers=headers, data=data).json()
-    access_token = response['access_token']
-    return get_saml_assertion(server, session, access_token)
+    return get_token_manager(server, session, client_id,
+                             client_secret).get_saml_assertion()
 
 
 def login_using_authorization_code(
@@ -150,9 +303,8 @@ def login_using_authorization_code(
     """
     Get access token when grant_type is authorization_code
     """
-    identity_provider = get_identity_provider(server, session)
     [auth_endpoint, token_endpoint, auth_query_params] = \
-        get_endpoints(identity_provider)
+        get_cached_endpoints(server, session)
     state = uuid.uuid1()
 
     auth_endpoint += "?client_id=" + client_id + "&redirect_uri=" + \
@@ -164,24 +316,19 @@ def login_using_authorization_code(
 
     [code, state] = callback(auth_endpoint)
 
-    headers = {
-        "Content-Type": "application/x-www-form-urlencoded",
-        "Authorization": get_basic_auth_string(client_id, client_secret),
-        "Accept": "application/json"
-    }
-
-    data = {
-        "grant_type": AUTHORIZATION_CODE,
-        "client_id": client_id,
-        "client_secret": client_secret,
-        "redirect_uri": redirect_uri,
-        "code": code,
-        "state": state
-    }
-
-    response = session.post(token_endpoint, headers=headers, data=data).json()
-    access_token = response['access_token']
-    return get_saml_assertion(server, session, access_token)
+    # The code can only be used once; later tokens come from the refresh
+    # token issued with the first one.
+    token_manager = OAuthTokenManager(server, session, client_id,
+                                      client_secret,
+                                      grant_type=AUTHORIZATION_CODE,
+                                      grant_params={
+                                          "client_id": client_id,
+                                          "client_secret": client_secret,
+                                          "redirect_uri": redirect_uri,
+                                          "code": code,
+                                          "state": state
+                                      })
+    return token_manager.get_saml_assertion()
 
 
 def login_using_refresh_token(
@@ -193,41 +340,18 @@ def login_using_refresh_token(
     """
     Get access token when grant_type is refresh_token
     """
-    identity_provider = get_identity_provider(server, session)
-    [auth_endpoint, token_endpoint, auth_query_params] = \
-        get_endpoints(identity_provider)
-    headers = {
-        "Content-Type": "application/x-www-form-urlencoded",
-        "Authorization": get_basic_auth_string(client_id, client_secret),
-        "Accept": "application/json"
-    }
-    data = {
-        "grant_type": REFRESH_TOKEN,
-        "refresh_token": refresh_token
-    }
-    response = session.post(token_endpoint, headers=headers, data=data).json()
-    access_token = response['access_token']
-    return get_saml_assertion(server, session, access_token)
+    return get_token_manager(server, session, client_id, client_secret,
+                             grant_type=REFRESH_TOKEN,
+                             refresh_token=refresh_token).get_saml_assertion()
 
 
 def login_using_password(server, session, username, password):
     """
     Get access token when grant_type is password
     """
-    identity_provider = get_identity_provider(server, session)
-    [auth_endpoint, token_endpoint, auth_query_params] = \
-        get_endpoints(identity_provider)
-    headers = {
-        "Content-Type": "application/x-www-form-urlencoded",
-        "Authorization": get_basic_auth_string(username, password),
-        "Accept": "application/json"
-    }
-    data = {
-        "grant_type": PASSWORD,
-        "username": username,
-        "password": password
-    }
-    response = session.post(token_endpoint, headers=headers, data=data).json()
-    print(response)
-    access_token = response['access_token']
-    return get_saml_assertion(server, session, access_token)
+    return get_token_manager(server, session, username, password,
+                             grant_type=PASSWORD,
+                             grant_params={
+                                 "username": username,
+                                 "password": password
+                             }).get_saml_assertion()
@@ -85,6 +85,7 @@ class ExternalPscSsoWorkflow(object):
         assert self.password is not None
 
         self.mgmtinstancename = self.args.mgmtinstancename
+        self.mgmtnodeid = None
         self.skip_verification = self.args.skipverification
 
     def run(self):
@@ -101,6 +102,12 @@ class ExternalPscSsoWorkflow(object):
                                                   skip_verification=self.skip_verification)
         lookupservicehelper.connect()
 
+        # The management nodes, SSO and vAPI URLs below are all looked up in
+        # this one listing of the service registrations.
+        registrations = lookupservicehelper.get_registrations()
+        print('Found {0} service registrations on {1} nodes'.format(
+            len(registrations.registrations), len(registrations.nodes)))
+
         if self.mgmtinstancename is None:
             self.mgmtinstancename, self.mgmtnodeid = lookupservicehelper.get_default_mgmt_node()
         elif self.mgmtnodeid is None:
@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+
+"""
+* *******************************************************
+* Copyright (c) VMware, Inc. 2024. All Rights Reserved.
+* SPDX-License-Identifier: MIT
+* *******************************************************
+*
+* DISCLAIMER. THIS PROGRAM IS PROVIDED TO YOU "AS IS" WITHOUT
+* WARRANTIES OR CONDITIONS OF ANY KIND, WHETHER ORAL OR WRITTEN,
+* EXPRESS OR IMPLIED. THE AUTHOR SPECIFICALLY DISCLAIMS ANY IMPLIED
+* WARRANTIES OR CONDITIONS OF MERCHANTABILITY, SATISFACTORY QUALITY,
+* NON-INFRINGEMENT AND FITNESS FOR A PARTICULAR PURPOSE.
+"""
+
+__author__ = 'VMware, Inc.'
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from OpenSSL import crypto
+
+from samples.vsphere.common import sso
+
+"""
+Micro-benchmark of the request signing in samples.vsphere.common.sso.
+
+Signs HoK token requests (construct_hok_request) and LoginByToken style
+requests (add_saml_context) with a throwaway key pair and prints how many
+requests per second are signed, both from the key files and from a
+SigningContext loaded up front.  No server is contacted.
+"""
+
+SAML_TOKEN = (
+    '<saml2:Assertion xmlns:saml2="urn:oasis:names:tc:SAML:2.0:assertion" '
+    'ID="_benchmark-token" IssueInstant="2024-01-01T00:00:00.000Z" '
+    'Version="2.0"><saml2:Issuer>benchmark</saml2:Issuer>'
+    '<saml2:Conditions NotBefore="2024-01-01T00:00:00.000Z" '
+    'NotOnOrAfter="2024-01-01T00:10:00.000Z"/></saml2:Assertion>')
+
+LOGIN_BY_TOKEN_REQUEST = (
+    '<soapenv:Envelope '
+    'xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/">'
+    '<soapenv:Header><wsse:Security xmlns:wsse="http://docs.oasis-open.org/'
+    'wss/2004/01/oasis-200401-wss-wssecurity-secext-1.0.xsd">' + SAML_TOKEN +
+    '</wsse:Security></soapenv:Header><soapenv:Body>'
+    '<LoginByToken xmlns="urn:vim25"><_this type="SessionManager">'
+    'SessionManager</_this></LoginByToken></soapenv:Body></soapenv:Envelope>')
+
+
+def write_key_pair(directory):
+    key = crypto.PKey()
+    key.generate_key(crypto.TYPE_RSA, 2048)
+    cert = crypto.X509()
+    cert.get_subject().CN = 'sso-signing-benchmark'
+    cert.set_serial_number(1)
+    cert.gmtime_adj_notBefore(0)
+    cert.gmtime_adj_notAfter(3600)
+    cert.set_issuer(cert.get_subject())
+    cert.set_pubkey(key)
+    cert.sign(key, 'sha256')
+
+    public_key = os.path.join(directory, 'benchmark.crt')
+    private_key = os.path.join(directory, 'benchmark.key')
+    with open(public_key, 'wb') as f:
+        f.write(crypto.dump_certificate(crypto.FILETYPE_PEM, cert))
+    with open(private_key, 'wb') as f:
+        f.write(crypto.dump_privatekey(crypto.FILETYPE_PEM, key))
+    return public_key, private_key
+
+
+def measure(name, iterations, func):
+    func()  # warm up
+    start = time.time()
+    for _ in range(iterations):
+        func()
+    elapsed = time.time() - start
+    print('{:<40} {:>8.1f} requests/s ({:.2f} ms each)'.format(
+        name, iterations / elapsed, 1000 * elapsed / iterations))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--iterations', type=int, default=500,
+                        help='Requests signed per measurement')
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    try:
+        public_key, private_key = write_key_pair(directory)
+
+        def hok_request():
+            request = sso.SecurityTokenRequest(public_key=public_key,
+                                               private_key=private_key)
+            request.construct_hok_request()
+
+        def login_by_token():
+            sso.add_saml_context(LOGIN_BY_TOKEN_REQUEST, SAML_TOKEN,
+                                 private_key)
+
+        signing_context = sso.SigningContext(private_key, public_key)
+
+        def hok_request_with_context():
+            request = sso.SecurityTokenRequest(signing_context=signing_context)
+            request.construct_hok_request()
+
+        def login_by_token_with_context():
+            sso.add_saml_context(LOGIN_BY_TOKEN_REQUEST, SAML_TOKEN,
+                                 signing_context)
+
+        measure('construct_hok_request', args.iterations, hok_request)
+        measure('add_saml_context', args.iterations, login_by_token)
+        measure('construct_hok_request (SigningContext)',
+                args.iterations, hok_request_with_context)
+        measure('add_saml_context (SigningContext)', args.iterations,
+                login_by_token_with_context)
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
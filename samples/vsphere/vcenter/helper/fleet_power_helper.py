@@ -0,0 +1,197 @@
+"""
+* *******************************************************
+* Copyright (c) VMware, Inc. 2024. All Rights Reserved.
+* SPDX-License-Identifier: MIT
+* *******************************************************
+*
+* DISCLAIMER. THIS PROGRAM IS PROVIDED TO YOU "AS IS" WITHOUT
+* WARRANTIES OR CONDITIONS OF ANY KIND, WHETHER ORAL OR WRITTEN,
+* EXPRESS OR IMPLIED. THE AUTHOR SPECIFICALLY DISCLAIMS ANY IMPLIED
+* WARRANTIES OR CONDITIONS OF MERCHANTABILITY, SATISFACTORY QUALITY,
+* NON-INFRINGEMENT AND FITNESS FOR A PARTICULAR PURPOSE.
+"""
+
+__author__ = 'VMware, Inc.'
+__vcenter_version__ = '6.5+'
+
+import time
+from collections import deque
+
+from com.vmware.vcenter_client import Folder, VM
+from pyVmomi import vim
+
+from samples.vsphere.common.vim.helpers.vim_utils import (TaskWatcher,
+                                                          get_properties)
+
+# operation -> (VirtualMachine task method, power state that makes it a no-op)
+POWER_OPERATIONS = {
+    'on': ('PowerOnVM_Task', vim.VirtualMachine.PowerState.poweredOn),
+    'off': ('PowerOffVM_Task', vim.VirtualMachine.PowerState.poweredOff),
+    'suspend': ('SuspendVM_Task', vim.VirtualMachine.PowerState.suspended),
+    'reset': ('ResetVM_Task', None),
+}
+
+
+def select_vms(client, names=None, tag_names=None, folder_names=None):
+    """
+    Return the set of VM identifiers that match any of the given VM names,
+    tag names or VM folder names.
+    """
+    vms = set()
+    if names:
+        vms.update(vm.vm for vm in client.vcenter.VM.list(
+            VM.FilterSpec(names=set(names))))
+    if folder_names:
+        folders = set(folder.folder for folder in client.vcenter.Folder.list(
+            Folder.FilterSpec(names=set(folder_names),
+                              type=Folder.Type.VIRTUAL_MACHINE)))
+        if folders:
+            vms.update(vm.vm for vm in client.vcenter.VM.list(
+                VM.FilterSpec(folders=folders)))
+    if tag_names:
+        for tag_id in client.tagging.Tag.list():
+            if client.tagging.Tag.get(tag_id).name not in tag_names:
+                continue
+            for obj in client.tagging.TagAssociation.list_attached_objects(
+                    tag_id):
+                if obj.type == 'VirtualMachine':
+                    vms.add(obj.id)
+    return vms
+
+
+class PowerResult(object):
+    """
+    Outcome of one VM in power_vms.
+    """
+
+    def __init__(self, vm, name=None, host=None, cluster=None):
+        self.vm = vm
+        self.name = name
+        self.host = host
+        self.cluster = cluster
+        self.state = 'queued'
+        self.error = None
+        self.elapsed = None
+
+    def __repr__(self):
+        return '{} ({}) {} error={}'.format(self.name, self.vm, self.state,
+                                            self.error)
+
+
+def power_vms(service_instance, vms, operation, max_per_host=4,
+              max_per_cluster=32):
+    """
+    Apply operation ('on', 'off', 'suspend' or 'reset') to every VM
+    identifier in vms and return a dict of VM identifier to PowerResult.
+
+    Host and cluster of every VM are read with two property collector calls.
+    Tasks are submitted concurrently while at most max_per_host run on any
+    host and max_per_cluster on any cluster, and all of them are waited on
+    through one TaskWatcher; a new task is submitted as soon as one completes.
+    VMs already in the target power state are skipped.
+    """
+    if max_per_host < 1 or max_per_cluster < 1:
+        raise ValueError('max_per_host and max_per_cluster must be at least 1')
+    method, target_state = POWER_OPERATIONS[operation]
+    content = service_instance.RetrieveContent()
+    stub = service_instance._stub
+
+    vm_mos = [vim.VirtualMachine(vm, stub) for vm in vms]
+    vm_props = get_properties(content, vim.VirtualMachine, vm_mos,
+                              ['name', 'runtime.host', 'runtime.powerState'])
+    hosts = set(props.get('runtime.host') for props in vm_props.values())
+    hosts.discard(None)
+    host_props = get_properties(content, vim.HostSystem, list(hosts),
+                                ['parent'])
+
+    results = {}
+    queues = {}
+    for mo in vm_mos:
+        props = vm_props.get(mo, {})
+        host = props.get('runtime.host')
+        parent = host_props.get(host, {}).get('parent')
+        cluster = parent if isinstance(parent,
+                                       vim.ClusterComputeResource) else None
+        result = PowerResult(mo._GetMoId(), props.get('name'), host, cluster)
+        results[result.vm] = result
+        if not props:
+            result.state = 'error'
+            result.error = Exception('VM not found')
+        elif target_state and props.get('runtime.powerState') == target_state:
+            result.state = 'skipped'
+        else:
+            queues.setdefault(host, deque()).append(mo)
+
+    total = sum(len(queue) for queue in queues.values())
+    print('power_vms: {} {} VM(s), {} skipped'.format(
+        operation, total, len(results) - total))
+
+    per_host = dict((host, 0) for host in queues)
+    per_cluster = {}
+    tasks = {}
+    submitted = {}
+    completed = 0
+    watcher = TaskWatcher(content)
+    try:
+        while queues or watcher.pending:
+            progressed = False
+            for host in list(queues):
+                queue = queues[host]
+                while queue and per_host[host] < max_per_host:
+                    mo = queue[0]
+                    result = results[mo._GetMoId()]
+                    if (result.cluster is not None and
+                            per_cluster.get(result.cluster, 0) >=
+                            max_per_cluster):
+                        break
+                    queue.popleft()
+                    progressed = True
+                    submitted[result.vm] = time.time()
+                    try:
+                        task = getattr(mo, method)()
+                        watcher.add(task)
+                    except Exception as e:
+                        result.state = 'error'
+                        result.error = e
+                        result.elapsed = 0
+                        del submitted[result.vm]
+                        completed += 1
+                        continue
+                    result.state = 'running'
+                    tasks[str(task)] = result
+                    per_host[host] += 1
+                    if result.cluster is not None:
+                        per_cluster[result.cluster] = \
+                            per_cluster.get(result.cluster, 0) + 1
+                if not queue:
+                    del queues[host]
+
+            if not watcher.pending:
+                if progressed:
+                    continue
+                # Nothing runs and nothing could be submitted, so no
+                # completion will ever free a slot.
+                for queue in queues.values():
+                    for mo in queue:
+                        result = results[mo._GetMoId()]
+                        result.state = 'error'
+                        result.error = Exception('Could not be submitted')
+                break
+            for info in watcher.wait():
+                result = tasks.pop(str(info.task))
+                per_host[result.host] -= 1
+                if result.cluster is not None:
+                    per_cluster[result.cluster] -= 1
+                result.elapsed = time.time() - submitted.pop(result.vm)
+                if info.state == vim.TaskInfo.State.success:
+                    result.state = 'success'
+                else:
+                    result.state = 'error'
+                    result.error = info.error
+                completed += 1
+                print('power_vms: [{}/{}] {} {} in {:.1f}s'.format(
+                    completed, total, result.name, result.state,
+                    result.elapsed))
+    finally:
+        watcher.close()
+    return results
@@ -0,0 +1,293 @@
+"""
+* *******************************************************
+* Copyright (c) VMware, Inc. 2024. All Rights Reserved.
+* SPDX-License-Identifier: MIT
+* *******************************************************
+*
+* DISCLAIMER. THIS PROGRAM IS PROVIDED TO YOU "AS IS" WITHOUT
+* WARRANTIES OR CONDITIONS OF ANY KIND, WHETHER ORAL OR WRITTEN,
+* EXPRESS OR IMPLIED. THE AUTHOR SPECIFICALLY DISCLAIMS ANY IMPLIED
+* WARRANTIES OR CONDITIONS OF MERCHANTABILITY, SATISFACTORY QUALITY,
+* NON-INFRINGEMENT AND FITNESS FOR A PARTICULAR PURPOSE.
+"""
+
+__author__ = 'VMware, Inc.'
+__vcenter_version__ = '7.0 U2+'
+
+import io
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from com.vmware.vcenter.vm.guest.filesystem_client import Transfers
+from com.vmware.vcenter.vm.guest_client import Processes
+
+from samples.vsphere.vcenter.helper.guest_transfer_helper import \
+    GuestFileTransfer
+
+
+class GuestProcess(object):
+    """
+    One script run inside one guest, following the steps of the GuestOps
+    sample: temporary directory, stdout/stderr files, script upload, process
+    start, and finally output download and cleanup.
+    """
+
+    def __init__(self, client, vm, creds, transfer):
+        self.client = client
+        self.vm = vm
+        self.creds = creds
+        self.transfer = transfer
+        self.temp_dir = None
+        self.stdout_path = None
+        self.stderr_path = None
+        self.script_path = None
+        self.pid = None
+
+    def start(self, script):
+        """Create the temporary files, upload script and start it."""
+        filesystem = self.client.vcenter.vm.guest.filesystem
+        self.temp_dir = filesystem.Directories.create_temporary(
+            self.vm, self.creds, '', '', parent_path=None)
+        self.stdout_path = filesystem.Files.create_temporary(
+            self.vm, self.creds, '', '.stdout', parent_path=self.temp_dir)
+        self.stderr_path = filesystem.Files.create_temporary(
+            self.vm, self.creds, '', '.stderr', parent_path=self.temp_dir)
+        self.script_path = filesystem.Files.create_temporary(
+            self.vm, self.creds, '', '.sh', parent_path=self.temp_dir)
+
+        if isinstance(script, str):
+            script = script.encode()
+        posix = Transfers.PosixFileAttributesCreateSpec(permissions='0755')
+        attributes = Transfers.FileCreationAttributes(len(script),
+                                                      overwrite=True,
+                                                      posix=posix)
+        url = filesystem.Transfers.create(
+            self.vm, self.creds,
+            Transfers.CreateSpec(path=self.script_path,
+                                 attributes=attributes))
+        self.transfer.upload(url, script)
+
+        spec = Processes.CreateSpec(
+            path=self.script_path,
+            arguments=' > ' + self.stdout_path + ' 2> ' + self.stderr_path,
+            working_directory=self.temp_dir)
+        self.pid = self.client.vcenter.vm.guest.Processes.create(
+            self.vm, self.creds, spec)
+        return self.pid
+
+    def get(self):
+        """Return the Processes.Info of the started process."""
+        return self.client.vcenter.vm.guest.Processes.get(
+            self.vm, self.creds, self.pid)
+
+    def read(self, path, dst):
+        """Download a guest file into the binary file object dst."""
+        url = self.client.vcenter.vm.guest.filesystem.Transfers.create(
+            self.vm, self.creds, Transfers.CreateSpec(path=path))
+        return self.transfer.download(url, dst)
+
+    def read_bytes(self, path):
+        url = self.client.vcenter.vm.guest.filesystem.Transfers.create(
+            self.vm, self.creds, Transfers.CreateSpec(path=path))
+        return self.transfer.download_bytes(url)
+
+    def tail(self, min_interval=0.5, max_interval=10.0):
+        """
+        Generator of (path, bytes) chunks from stdout and stderr while the
+        process runs; see tail_output.
+        """
+        return tail_output(self.client, self.vm, self.creds, self.pid,
+                           [self.stdout_path, self.stderr_path],
+                           self.transfer, min_interval=min_interval,
+                           max_interval=max_interval)
+
+    def terminate(self):
+        """Kill the process if it is still running."""
+        self.client.vcenter.vm.guest.Processes.delete(
+            self.vm, self.creds, self.pid)
+
+    def cleanup(self):
+        """Delete the temporary directory and everything in it."""
+        if self.temp_dir:
+            self.client.vcenter.vm.guest.filesystem.Directories.delete(
+                self.vm, self.creds, self.temp_dir, recursive=True)
+            self.temp_dir = None
+
+
+class GuestProcessResult(object):
+    """
+    Row of the result table returned by run_script_on_vms.  started is the
+    time the guest process was started, None until then; the timeout and
+    elapsed are measured from it, so the time a VM waits for a free worker
+    does not count.
+    """
+
+    def __init__(self, vm):
+        self.vm = vm
+        self.pid = None
+        self.exit_code = None
+        self.stdout = None
+        self.stderr = None
+        self.error = None
+        self.started = None
+        self.elapsed = None
+
+    def __repr__(self):
+        return '{} pid={} exit_code={} elapsed={} error={}'.format(
+            self.vm, self.pid, self.exit_code,
+            None if self.elapsed is None else round(self.elapsed, 1),
+            self.error)
+
+
+def run_script_on_vms(client, vms, creds, script, max_workers=16,
+                      poll_interval=1.0, timeout=None, transfer=None):
+    """
+    Run script on every vm in vms and return a dict of vm to
+    GuestProcessResult.
+
+    Preparing and starting the processes, and collecting their output once
+    they exit, runs on a pool of at most max_workers threads, so the VMs move
+    through the steps as a pipeline.  The processes of all VMs are polled in
+    a single loop every poll_interval seconds.  creds is either one
+    Credentials object for all VMs or a dict of vm to Credentials.
+    """
+    if transfer is None:
+        transfer = GuestFileTransfer()
+    results = {}
+    processes = {}
+    running = {}
+    pending_starts = {}
+    pending_collects = {}
+
+    def start(process, result):
+        pid = process.start(script)
+        result.started = time.time()
+        return pid
+
+    def collect(process, result, terminate):
+        try:
+            if terminate:
+                process.terminate()
+            result.stdout = process.read_bytes(process.stdout_path)
+            result.stderr = process.read_bytes(process.stderr_path)
+        finally:
+            process.cleanup()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for vm in vms:
+            vm_creds = creds[vm] if isinstance(creds, dict) else creds
+            processes[vm] = GuestProcess(client, vm, vm_creds, transfer)
+            results[vm] = GuestProcessResult(vm)
+            pending_starts[vm] = executor.submit(start, processes[vm],
+                                                 results[vm])
+
+        while pending_starts or running or pending_collects:
+            for vm, future in list(pending_starts.items()):
+                if not future.done():
+                    continue
+                del pending_starts[vm]
+                try:
+                    results[vm].pid = future.result()
+                except Exception as e:
+                    results[vm].error = e
+                    executor.submit(_cleanup_quietly, processes[vm])
+                else:
+                    running[vm] = processes[vm]
+
+            for vm, process in list(running.items()):
+                result = results[vm]
+                try:
+                    info = process.get()
+                except Exception as e:
+                    result.error = e
+                    finished = True
+                else:
+                    finished = info.exit_code is not None
+                    result.exit_code = info.exit_code
+                timed_out = (not finished and timeout is not None and
+                             time.time() - result.started > timeout)
+                if timed_out:
+                    result.error = Exception(
+                        'Timed out after {} seconds'.format(timeout))
+                if finished or timed_out:
+                    del running[vm]
+                    pending_collects[vm] = executor.submit(collect, process,
+                                                           result, timed_out)
+
+            for vm, future in list(pending_collects.items()):
+                if not future.done():
+                    continue
+                del pending_collects[vm]
+                results[vm].elapsed = time.time() - results[vm].started
+                try:
+                    future.result()
+                except Exception as e:
+                    results[vm].error = results[vm].error or e
+
+            if pending_starts or running or pending_collects:
+                logging.debug('%d starting, %d running, %d collecting',
+                              len(pending_starts), len(running),
+                              len(pending_collects))
+                time.sleep(poll_interval)
+
+    return results
+
+
+def _cleanup_quietly(process):
+    try:
+        process.cleanup()
+    except Exception as e:
+        logging.debug('Cleanup on %s failed: %s', process.vm, e)
+
+
+def tail_output(client, vm, creds, pid, paths, transfer, min_interval=0.5,
+                max_interval=10.0):
+    """
+    Follow the guest files in paths while process pid runs, yielding
+    (path, bytes) for every new chunk of output.
+
+    Each round checks the file sizes with Files.get and, for files that grew,
+    creates a transfer and downloads only the bytes past the last offset
+    seen.  The wait between rounds halves while output keeps arriving and
+    doubles while it does not, staying between min_interval and
+    max_interval.  If the host ignores range requests every round downloads
+    the whole files, so from then on the files are only read every
+    max_interval.  After the process exits the files are read one last time
+    and the generator ends; the Processes.Info of the process is its return
+    value.
+    """
+    filesystem = client.vcenter.vm.guest.filesystem
+    offsets = dict((path, 0) for path in paths)
+    interval = min_interval
+    while True:
+        # Check the process before reading so that output written just
+        # before it exited is still picked up by this round.
+        info = client.vcenter.vm.guest.Processes.get(vm, creds, pid)
+        received = 0
+        for path in paths:
+            size = filesystem.Files.get(vm, creds, path).size
+            if size <= offsets[path]:
+                continue
+            url = filesystem.Transfers.create(
+                vm, creds, Transfers.CreateSpec(path=path))
+            buf = io.BytesIO()
+            transfer.download(url, buf, offset=offsets[path])
+            if offsets[path] and not transfer.supports_range(url):
+                min_interval = max_interval
+            chunk = buf.getvalue()
+            if chunk:
+                offsets[path] += len(chunk)
+                received += len(chunk)
+                yield path, chunk
+
+        if info.exit_code is not None:
+            return info
+
+        if received:
+            interval = max(min_interval, interval / 2)
+        else:
+            interval = max(min_interval, min(max_interval, interval * 2))
+        logging.debug('Received %d bytes from %s pid %s, next poll in %.1fs',
+                      received, vm, pid, interval)
+        time.sleep(interval)
@@ -0,0 +1,216 @@
+"""
+* *******************************************************
+* Copyright (c) VMware, Inc. 2024. All Rights Reserved.
+* SPDX-License-Identifier: MIT
+* *******************************************************
+*
+* DISCLAIMER. THIS PROGRAM IS PROVIDED TO YOU "AS IS" WITHOUT
+* WARRANTIES OR CONDITIONS OF ANY KIND, WHETHER ORAL OR WRITTEN,
+* EXPRESS OR IMPLIED. THE AUTHOR SPECIFICALLY DISCLAIMS ANY IMPLIED
+* WARRANTIES OR CONDITIONS OF MERCHANTABILITY, SATISFACTORY QUALITY,
+* NON-INFRINGEMENT AND FITNESS FOR A PARTICULAR PURPOSE.
+"""
+
+__author__ = 'VMware, Inc.'
+__vcenter_version__ = '7.0 U2+'
+
+import http.client as httpclient
+import io
+import logging
+import os
+import ssl
+import threading
+from urllib.parse import urlparse
+
+CHUNK_SIZE = 64 * 1024
+
+
+class GuestFileTransfer(object):
+    """
+    Moves files to and from a guest through the URLs returned by
+    vcenter.vm.guest.filesystem.Transfers.create.
+
+    Connections are kept alive and reused per ESXi host, and data is streamed
+    between file objects and the socket in chunks, so binary files of any
+    size can be transferred without holding them in memory.  One instance
+    may be shared between threads; each transfer uses its own connection.
+    """
+
+    def __init__(self, ssl_context=None, chunk_size=CHUNK_SIZE):
+        if ssl_context is None:
+            # Skip server cert verification.
+            # This is not recommended in production code.
+            ssl_context = ssl._create_unverified_context()
+        self._ssl_context = ssl_context
+        self._chunk_size = chunk_size
+        self._idle = {}
+        # Hosts that answered a range request with the whole file.
+        self._no_range = set()
+        self._lock = threading.Lock()
+
+    def upload(self, url, src, size=None):
+        """
+        PUT the contents of src to url.  src is a binary file object, bytes
+        or str.  size is taken from the file when not given.
+        """
+        if isinstance(src, str):
+            src = src.encode()
+        if isinstance(src, (bytes, bytearray)):
+            src = io.BytesIO(src)
+        if size is None:
+            size = _remaining_size(src)
+        start = src.tell() if src.seekable() else None
+
+        def send(conn, path):
+            if start is not None:
+                src.seek(start)
+            conn.request('PUT', path, src, {'Content-Length': str(size)})
+            res = conn.getresponse()
+            res.read()
+            return res
+
+        res = self._perform(url, send, retry=start is not None)
+        if res.status != 200:
+            raise Exception('PUT request failed with errorcode : {} {}'.
+                            format(res.status, res.reason))
+        return size
+
+    def download(self, url, dst, expected_len=None, offset=0):
+        """
+        GET url and write the body to the binary file object dst chunk by
+        chunk.  Returns the number of bytes written.  With offset only the
+        bytes past offset are written; a range is requested, and if the host
+        ignores it the leading bytes are read and dropped.  A host that
+        ignored a range once is not sent ranges again, see supports_range.
+        """
+        netloc = urlparse(url).netloc
+        # Bytes written to dst so far.  A retry would write them again, so
+        # the request is only retried if the connection failed before that.
+        progress = [0]
+
+        def receive(conn, path):
+            headers = {}
+            ranged = offset and self.supports_range(url)
+            if ranged:
+                headers['Range'] = 'bytes={}-'.format(offset)
+            conn.request('GET', path, headers=headers)
+            res = conn.getresponse()
+            if res.status not in (200, 206):
+                res.read()
+                return res, 0
+            skip = offset if res.status == 200 else 0
+            if ranged and res.status == 200:
+                logging.warning('%s ignores range requests, whole files are '
+                                'downloaded to read their end', netloc)
+                with self._lock:
+                    self._no_range.add(netloc)
+            while skip:
+                chunk = res.read(min(skip, self._chunk_size))
+                if not chunk:
+                    break
+                skip -= len(chunk)
+            written = 0
+            while True:
+                chunk = res.read(self._chunk_size)
+                if not chunk:
+                    break
+                dst.write(chunk)
+                written += len(chunk)
+                progress[0] = written
+            return res, written
+
+        res, written = self._perform(url, receive,
+                                     retry=lambda: progress[0] == 0)
+        if res.status not in (200, 206):
+            raise Exception('GET request failed with errorcode : {} {}'.
+                            format(res.status, res.reason))
+        if expected_len is not None and written != expected_len:
+            raise Exception('Downloaded {} bytes, expected {}'.
+                            format(written, expected_len))
+        return written
+
+    def supports_range(self, url):
+        """
+        False once the host of url answered a range request with the whole
+        file.
+        """
+        with self._lock:
+            return urlparse(url).netloc not in self._no_range
+
+    def download_bytes(self, url, expected_len=None):
+        """Convenience wrapper around download for small files."""
+        buf = io.BytesIO()
+        self.download(url, buf, expected_len=expected_len)
+        return buf.getvalue()
+
+    def close(self):
+        """Close every idle connection."""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for conns in idle.values():
+            for conn in conns:
+                conn.close()
+
+    def _perform(self, url, request, retry):
+        """
+        Run request(conn, path) on a pooled connection.  retry, a bool or a
+        callable checked after the failure, tells whether the request may be
+        run again on a fresh connection when a reused one was found closed.
+        """
+        urloptions = urlparse(url)
+        path = urloptions.path
+        if urloptions.query:
+            path += '?' + urloptions.query
+
+        conn, reused = self._acquire(urloptions.netloc)
+        try:
+            result = request(conn, path)
+        except (httpclient.RemoteDisconnected, ConnectionResetError,
+                BrokenPipeError):
+            conn.close()
+            # A kept-alive connection may have been closed by the host
+            # while idle; try once more on a fresh one.
+            if not (reused and (retry() if callable(retry) else retry)):
+                raise
+            conn = self._connect(urloptions.netloc)
+            try:
+                result = request(conn, path)
+            except Exception:
+                conn.close()
+                raise
+        except Exception:
+            conn.close()
+            raise
+
+        res = result[0] if isinstance(result, tuple) else result
+        if res.will_close:
+            conn.close()
+        else:
+            self._release(urloptions.netloc, conn)
+        return result
+
+    def _connect(self, netloc):
+        return httpclient.HTTPSConnection(netloc,
+                                          context=self._ssl_context,
+                                          blocksize=self._chunk_size)
+
+    def _acquire(self, netloc):
+        with self._lock:
+            conns = self._idle.get(netloc)
+            if conns:
+                return conns.pop(), True
+        return self._connect(netloc), False
+
+    def _release(self, netloc, conn):
+        with self._lock:
+            self._idle.setdefault(netloc, []).append(conn)
+
+
+def _remaining_size(fileobj):
+    try:
+        return os.fstat(fileobj.fileno()).st_size - fileobj.tell()
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        pos = fileobj.tell()
+        end = fileobj.seek(0, io.SEEK_END)
+        fileobj.seek(pos)
+        return end - pos
@@ -0,0 +1,204 @@
+"""
+* *******************************************************
+* Copyright (c) VMware, Inc. 2024. All Rights Reserved.
+* SPDX-License-Identifier: MIT
+* *******************************************************
+*
+* DISCLAIMER. THIS PROGRAM IS PROVIDED TO YOU "AS IS" WITHOUT
+* WARRANTIES OR CONDITIONS OF ANY KIND, WHETHER ORAL OR WRITTEN,
+* EXPRESS OR IMPLIED. THE AUTHOR SPECIFICALLY DISCLAIMS ANY IMPLIED
+* WARRANTIES OR CONDITIONS OF MERCHANTABILITY, SATISFACTORY QUALITY,
+* NON-INFRINGEMENT AND FITNESS FOR A PARTICULAR PURPOSE.
+"""
+
+__author__ = 'VMware, Inc.'
+__vcenter_version__ = '6.5+'
+
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from pyVmomi import vim, vmodl
+
+# (record key, service below client.vcenter.vm.hardware, summary id field)
+DEVICE_TYPES = [
+    ('disks', 'Disk', 'disk'),
+    ('nics', 'Ethernet', 'nic'),
+    ('cdroms', 'Cdrom', 'cdrom'),
+    ('serial_ports', 'Serial', 'port'),
+    ('parallel_ports', 'Parallel', 'port'),
+    ('floppies', 'Floppy', 'floppy'),
+    ('sata_adapters', 'adapter.Sata', 'adapter'),
+    ('scsi_adapters', 'adapter.Scsi', 'adapter'),
+]
+
+
+class RateLimiter(object):
+    """
+    Token bucket shared by threads: acquire() blocks until a call may go
+    out, so no more than rate calls are made per second overall.
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.capacity = float(burst or rate)
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity,
+                                   self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def get_change_versions(service_instance, vms=None):
+    """
+    Return a dict of VM identifier to config.changeVersion for every VM (or
+    only those in vms), fetched with a single property collector retrieval.
+    """
+    content = service_instance.RetrieveContent()
+    view = content.viewManager.CreateContainerView(
+        content.rootFolder, [vim.VirtualMachine], True)
+    try:
+        traversal = vmodl.query.PropertyCollector.TraversalSpec(
+            name='traverseView', path='view', skip=False,
+            type=vim.view.ContainerView)
+        filter_spec = vmodl.query.PropertyCollector.FilterSpec(
+            objectSet=[vmodl.query.PropertyCollector.ObjectSpec(
+                obj=view, skip=True, selectSet=[traversal])],
+            propSet=[vmodl.query.PropertyCollector.PropertySpec(
+                type=vim.VirtualMachine, pathSet=['config.changeVersion'])])
+        change_versions = {}
+        for obj in content.propertyCollector.RetrieveContents([filter_spec]):
+            vm = obj.obj._GetMoId()
+            if vms is not None and vm not in vms:
+                continue
+            change_versions[vm] = None
+            for prop in obj.propSet:
+                change_versions[vm] = prop.val
+        return change_versions
+    finally:
+        view.Destroy()
+
+
+def _normalize(value):
+    # Binding structures serialize to JSON; go through it so the record only
+    # holds plain dicts, lists, strings and numbers.
+    return json.loads(value.to_json())
+
+
+def get_vm_hardware(client, vm, limiter=None):
+    """
+    List every device of vm and get each of them.  Returns a dict of record
+    key (see DEVICE_TYPES) to a dict of device identifier to device info.
+    """
+    hardware = client.vcenter.vm.hardware
+    devices = {}
+    for key, service_path, id_field in DEVICE_TYPES:
+        service = hardware
+        for name in service_path.split('.'):
+            service = getattr(service, name)
+        if limiter:
+            limiter.acquire()
+        summaries = service.list(vm)
+        devices[key] = {}
+        for summary in summaries:
+            device = getattr(summary, id_field)
+            if limiter:
+                limiter.acquire()
+            devices[key][device] = _normalize(service.get(vm, device))
+    return devices
+
+
+class HardwareSnapshot(object):
+    """
+    Hardware of a set of VMs: records maps a VM identifier to
+    {'change_version': ..., 'devices': {...}, 'collected': <epoch seconds>}.
+    """
+
+    def __init__(self, records=None):
+        self.records = records or {}
+        self.errors = {}
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.records, f, indent=1, sort_keys=True)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls(json.load(f))
+
+    def diff(self, previous):
+        """
+        Compare with an older snapshot.  Returns (added, removed, changed)
+        sets of VM identifiers; changed VMs have different devices.
+        """
+        old = previous.records if previous else {}
+        added = set(self.records) - set(old)
+        removed = set(old) - set(self.records)
+        changed = set(vm for vm in set(self.records) & set(old)
+                      if self.records[vm]['devices'] != old[vm]['devices'])
+        return added, removed, changed
+
+
+def collect_hardware_snapshot(client, vms, service_instance=None,
+                              previous=None, max_workers=16,
+                              calls_per_second=50):
+    """
+    Collect a HardwareSnapshot of vms, fanning the list/get calls out over
+    max_workers threads while keeping the total call rate under
+    calls_per_second.
+
+    With service_instance the config.changeVersion of every VM is read in
+    one property collector call, and VMs whose change version matches their
+    record in previous are copied from it instead of being fetched again.
+    """
+    change_versions = {}
+    if service_instance is not None:
+        change_versions = get_change_versions(service_instance, set(vms))
+
+    snapshot = HardwareSnapshot()
+    to_fetch = []
+    for vm in vms:
+        change_version = change_versions.get(vm)
+        record = previous.records.get(vm) if previous else None
+        if (record and change_version is not None and
+                record['change_version'] == change_version):
+            snapshot.records[vm] = record
+        else:
+            to_fetch.append(vm)
+    print('Reusing {} unchanged VM record(s), fetching {}'.
+          format(len(snapshot.records), len(to_fetch)))
+
+    limiter = RateLimiter(calls_per_second)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = dict((executor.submit(get_vm_hardware, client, vm, limiter),
+                        vm) for vm in to_fetch)
+        for future in as_completed(futures):
+            vm = futures[future]
+            try:
+                devices = future.result()
+            except Exception as e:
+                # Keep the last known record so the VM does not show up as
+                # removed in a diff.
+                snapshot.errors[vm] = e
+                if previous and vm in previous.records:
+                    snapshot.records[vm] = previous.records[vm]
+                continue
+            snapshot.records[vm] = {
+                'change_version': change_versions.get(vm),
+                'devices': devices,
+                'collected': time.time(),
+            }
+    return snapshot
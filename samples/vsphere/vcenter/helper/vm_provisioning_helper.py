@@ -0,0 +1,132 @@
+"""
+* *******************************************************
+* Copyright (c) VMware, Inc. 2024. All Rights Reserved.
+* SPDX-License-Identifier: MIT
+* *******************************************************
+*
+* DISCLAIMER. THIS PROGRAM IS PROVIDED TO YOU "AS IS" WITHOUT
+* WARRANTIES OR CONDITIONS OF ANY KIND, WHETHER ORAL OR WRITTEN,
+* EXPRESS OR IMPLIED. THE AUTHOR SPECIFICALLY DISCLAIMS ANY IMPLIED
+* WARRANTIES OR CONDITIONS OF MERCHANTABILITY, SATISFACTORY QUALITY,
+* NON-INFRINGEMENT AND FITNESS FOR A PARTICULAR PURPOSE.
+"""
+
+__author__ = 'VMware, Inc.'
+__vcenter_version__ = '6.5+'
+
+import copy
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from samples.vsphere.vcenter.helper import network_helper
+from samples.vsphere.vcenter.helper import vm_placement_helper
+
+PLACEMENT_KEYS = ('datacenter_name', 'vm_folder_name', 'datastore_name')
+
+
+class InventoryCache(object):
+    """
+    Remembers the results of the placement and network lookups so that each
+    distinct datacenter/folder/datastore or portgroup is resolved only once.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self._placement_specs = {}
+        self._networks = {}
+        self._lock = threading.Lock()
+
+    def get_placement_spec(self, datacenter_name, vm_folder_name,
+                           datastore_name):
+        key = (datacenter_name, vm_folder_name, datastore_name)
+        with self._lock:
+            if key not in self._placement_specs:
+                self._placement_specs[key] = \
+                    vm_placement_helper.get_placement_spec_for_resource_pool(
+                        self.client, datacenter_name, vm_folder_name,
+                        datastore_name)
+            return self._placement_specs[key]
+
+    def get_network_backing(self, portgroup_name, datacenter_name,
+                            portgroup_type):
+        key = (portgroup_name, datacenter_name, portgroup_type)
+        with self._lock:
+            if key not in self._networks:
+                self._networks[key] = network_helper.get_network_backing(
+                    self.client, portgroup_name, datacenter_name,
+                    portgroup_type)
+            return self._networks[key]
+
+
+class ProvisionResult(object):
+    """
+    Outcome of one VM.create call made by create_vms.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.vm = None
+        self.latency = None
+        self.error = None
+
+    def __repr__(self):
+        return '{} vm={} latency={} error={}'.format(
+            self.name, self.vm,
+            None if self.latency is None else round(self.latency, 2),
+            self.error)
+
+
+def create_vms(client, template_spec, overrides, max_in_flight=8,
+               inventory=None):
+    """
+    Create one VM per entry of overrides from a copy of template_spec and
+    return a list of ProvisionResult in the same order.
+
+    Each override is a dict of VM.CreateSpec fields to replace, and must set
+    'name'.  It may also carry all of 'datacenter_name', 'vm_folder_name'
+    and 'datastore_name', in which case the placement is looked up through
+    inventory (an InventoryCache) so each distinct placement is resolved only
+    once.  A partial placement or a failed lookup is reported in the
+    ProvisionResult of that VM.  At most max_in_flight VM.create calls are
+    outstanding at a time.
+    """
+    if inventory is None:
+        inventory = InventoryCache(client)
+
+    def create(override):
+        override = dict(override)
+        placement = [override.pop(key, None) for key in PLACEMENT_KEYS]
+        result = ProvisionResult(override.get('name'))
+        try:
+            spec = copy.copy(template_spec)
+            if any(placement):
+                if not all(placement):
+                    raise ValueError('Placement needs all of {}'.format(
+                        ', '.join(PLACEMENT_KEYS)))
+                spec.placement = inventory.get_placement_spec(*placement)
+            for field, value in override.items():
+                setattr(spec, field, value)
+            start = time.time()
+            try:
+                result.vm = client.vcenter.VM.create(spec)
+            finally:
+                result.latency = time.time() - start
+        except Exception as e:
+            result.error = e
+        return result
+
+    results = [None] * len(overrides)
+    with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+        futures = dict((executor.submit(create, override), i)
+                       for i, override in enumerate(overrides))
+        for future in as_completed(futures):
+            result = future.result()
+            results[futures[future]] = result
+            if result.error:
+                print("create_vms: Failed to create VM '{}': {}".
+                      format(result.name, result.error))
+            else:
+                print("create_vms: Created VM '{}' ({}) in {:.1f}s".
+                      format(result.name, result.vm, result.latency))
+    return results
@@ -13,47 +13,84 @@
 
 __author__ = 'VMware, Inc.'
 
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
 import pyVim.task
 from com.vmware.vcenter_client import Host
-from pyVmomi import vim
-
-
-def detect_nfs_datastore_on_host(context, host_name):
-    """Find NFS datastore on host"""
-    names = set([host_name])
-    datastore_name = context.testbed.config['NFS_DATASTORE_NAME']
-
-    # Use vAPI find the Host managed identities
-    host_summaries = context.client.vcenter.Host.list(
-        Host.FilterSpec(names=names))
-
-    for host_summary in host_summaries:
-        # Convert the host identifier into a ManagedObject
-        host = host_summary.host
-        host_mo = vim.HostSystem(host, context.soap_stub)
-
-        for datastore_mo in host_mo.datastore:
-            if (datastore_mo.name == datastore_name and
-                datastore_mo.summary.type == 'NFS'):
+from pyVmomi import vim, vmodl
+
+
+def get_host_datastores(context, host_names):
+    """
+    Return a dict of host name to a list of (datastore managed object,
+    {'name', 'summary.type', 'info'}) for the datastores mounted on each
+    host, read for all hosts with a single property collector retrieval.
+    Hosts must have been detected into HOST_IDS first.
+    """
+    host_ids = context.testbed.entities.get('HOST_IDS', {})
+    unknown = [name for name in host_names if name not in host_ids]
+    if unknown:
+        raise Exception("Host(s) {} not detected, HOST_IDS must be set up "
+                        "before the datastores".format(', '.join(unknown)))
+    host_mos = [vim.HostSystem(host_ids[name], context.soap_stub)
+                for name in host_names]
+    traversal = vmodl.query.PropertyCollector.TraversalSpec(
+        name='hostToDatastore', path='datastore', skip=False,
+        type=vim.HostSystem)
+    filter_spec = vmodl.query.PropertyCollector.FilterSpec(
+        objectSet=[vmodl.query.PropertyCollector.ObjectSpec(
+            obj=host_mo, selectSet=[traversal])
+            for host_mo in host_mos],
+        propSet=[
+            vmodl.query.PropertyCollector.PropertySpec(
+                type=vim.HostSystem, pathSet=['datastore']),
+            vmodl.query.PropertyCollector.PropertySpec(
+                type=vim.Datastore, pathSet=['name', 'summary.type', 'info'])])
+
+    props = {}
+    collector = context.service_instance.RetrieveContent().propertyCollector
+    for obj in collector.RetrieveContents([filter_spec]):
+        props[obj.obj] = dict((prop.name, prop.val) for prop in obj.propSet)
+
+    host_datastores = {}
+    for host_name, host_mo in zip(host_names, host_mos):
+        host_datastores[host_name] = [
+            (datastore_mo, props.get(datastore_mo, {}))
+            for datastore_mo in props.get(host_mo, {}).get('datastore', [])]
+    return host_datastores
+
+
+def _detect_datastores(context, entity_key, datastore_type, volumes):
+    """volumes maps each host name to the datastore name expected on it"""
+    host_datastores = get_host_datastores(context, list(volumes))
+    found = True
+    for host_name, datastore_name in volumes.items():
+        host = context.testbed.entities.get('HOST_IDS', {}).get(host_name)
+        for datastore_mo, props in host_datastores[host_name]:
+            if (props.get('name') == datastore_name and
+                    props.get('summary.type') == datastore_type):
                 datastore = datastore_mo._moId
-                print("Detected NFS Volume '{}' as {} on Host '{}' ({})".
-                      format(datastore_name, datastore, host_name, host))
-                context.testbed.entities['HOST_NFS_DATASTORE_IDS'][host_name] \
-                    = datastore
-                return True
-
-    print("NFS Volume '{}' missing on Host '{}'".
-          format(datastore_name, host_name))
-    return False
+                print("Detected {} Volume '{}' as {} on Host '{}' ({})".
+                      format(datastore_type, datastore_name, datastore,
+                             host_name, host))
+                context.testbed.entities[entity_key][host_name] = datastore
+                break
+        else:
+            print("{} Volume '{}' missing on Host '{}'".
+                  format(datastore_type, datastore_name, host_name))
+            found = False
+    return found
 
 
 def detect_nfs_datastore(context):
     """Find NFS datastore used to run vcenter samples"""
     context.testbed.entities['HOST_NFS_DATASTORE_IDS'] = {}
+    datastore_name = context.testbed.config['NFS_DATASTORE_NAME']
     host1_name = context.testbed.config['ESX_HOST1']
     host2_name = context.testbed.config['ESX_HOST2']
-    return (detect_nfs_datastore_on_host(context, host1_name) and
-            detect_nfs_datastore_on_host(context, host2_name))
+    return _detect_datastores(context, 'HOST_NFS_DATASTORE_IDS', 'NFS',
+                              {host1_name: datastore_name,
+                               host2_name: datastore_name})
 
 
 def cleanup_nfs_datastore(context):
@@ -89,91 +126,103 @@ def cleanup_nfs_datastore(context):
 def setup_nfs_datastore(context):
     """Setup NFS datastore for running vcenter samples"""
     host1_name = context.testbed.config['ESX_HOST1']
-    nfs_datastore1 = setup_nfs_datastore_on_host(context, host1_name)
-
     host2_name = context.testbed.config['ESX_HOST2']
-    nfs_datastore2 = setup_nfs_datastore_on_host(context, host2_name)
-
-    context.testbed.entities['HOST_NFS_DATASTORE_IDS'] = {
-        host1_name: nfs_datastore1,
-        host2_name: nfs_datastore2
-    }
-
-
-def setup_nfs_datastore_on_host(context, host_name):
-    """Mount the NFS volume on one ESX hosts using the VIM API."""
+    context.testbed.entities['HOST_NFS_DATASTORE_IDS'] = \
+        mount_nfs_datastores(context, [host1_name, host2_name])
+
+
+def _run_on_hosts(func, host_args, max_workers):
+    """
+    Call func(host_name, *args) for every (host_name, args) item of host_args
+    concurrently.  Returns a dict of host name to result; if any call failed
+    the first error is raised after all of them finished.
+    """
+    results = {}
+    errors = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = dict((executor.submit(func, host_name, *args), host_name)
+                       for host_name, args in host_args)
+        for future in as_completed(futures):
+            host_name = futures[future]
+            try:
+                results[host_name] = future.result()
+            except Exception as e:
+                print("Datastore setup failed on Host '{}': {}".
+                      format(host_name, e))
+                errors.append(e)
+    if errors:
+        raise errors[0]
+    return results
+
+
+def mount_nfs_datastores(context, host_names, max_workers=16):
+    """
+    Mount the NFS volume on every host in host_names using the VIM API and
+    return a dict of host name to datastore identifier.
+
+    Existing mounts of all hosts are detected with one property retrieval;
+    the CreateNasDatastore and rename calls then run on all hosts in
+    parallel.
+    """
     nfs_host = context.testbed.config['NFS_HOST']
     remote_path = context.testbed.config['NFS_REMOTE_PATH']
     local_path = context.testbed.config['NFS_DATASTORE_NAME']
 
-    host = context.testbed.entities['HOST_IDS'][host_name]
-    host_mo = vim.HostSystem(host, context.soap_stub)
-
-    datastore_system = host_mo.configManager.datastoreSystem
-    try:
-        datastore_mo = datastore_system.CreateNasDatastore(
-            vim.host.NasVolume.Specification(remoteHost=nfs_host,
-                                             remotePath=remote_path,
-                                             localPath=local_path,
-                                             accessMode=vim.host.MountInfo.AccessMode.readWrite,
-                                             type=vim.host.FileSystemVolume.FileSystemType.NFS))
+    host_datastores = get_host_datastores(context, host_names)
+
+    def mount(host_name, existing):
+        host = context.testbed.entities['HOST_IDS'][host_name]
+        if existing is not None:
+            datastore_mo, info = existing
+            if info.name == local_path:
+                print("Found NFS Volume '{}' ({}) on Host '{}' ({})".
+                      format(local_path, datastore_mo._moId, host_name, host))
+            else:
+                print("Found NFS remote host '{}' and path '{}' on Host '{}' "
+                      "({}) as '{}'".format(nfs_host, remote_path, host_name,
+                                            host, info.name))
+                print("Renaming NFS Volume '{}' ({}) to '{}'".
+                      format(info.name, datastore_mo._moId, local_path))
+                task = datastore_mo.Rename(local_path)
+                pyVim.task.WaitForTask(task)
+            return datastore_mo._moId
 
+        host_mo = vim.HostSystem(host, context.soap_stub)
+        datastore_system = host_mo.configManager.datastoreSystem
+        try:
+            datastore_mo = datastore_system.CreateNasDatastore(
+                vim.host.NasVolume.Specification(
+                    remoteHost=nfs_host,
+                    remotePath=remote_path,
+                    localPath=local_path,
+                    accessMode=vim.host.MountInfo.AccessMode.readWrite,
+                    type=vim.host.FileSystemVolume.FileSystemType.NFS))
+        except vim.fault.AlreadyExists:
+            # Another volume already uses the name
+            print("NFS Volume '{}' already exists on Host '{}' ({})".
+                  format(local_path, host_name, host))
+            return None
         print("Added NFS Volume '{}' ({}) to Host '{}' ({})".
               format(local_path, datastore_mo._moId, host_name, host))
         return datastore_mo._moId
-    except vim.fault.AlreadyExists as e:
-        print("NFS Volume '{}' already exists on Host '{}' ({})".
-              format(local_path, host_name, host))
-        for datastore_mo in host_mo.datastore:
-            info = datastore_mo.info
-            if (isinstance(info, vim.host.NasDatastoreInfo) and
-                           info.nas.remoteHost == nfs_host and
-                           info.nas.remotePath == remote_path):
-                if info.name == local_path:
-                    print("Found NFS Volume '{}' ({}) on Host '{}' ({})".
-                          format(local_path, datastore_mo._moId,
-                                 host_name, host_mo._moId))
-                    return datastore_mo._moId
-                else:
-                    print("Found NFS remote host '{}' and path '{}' on Host '{}' ({}) as '{}'".
-                          format(nfs_host, remote_path, host_name,
-                                 host_mo._moId, info.name))
-
-                    print("Renaming NFS Volume '{}' ({}) to '{}'".
-                          format(info.name, datastore_mo._moId, local_path))
-                    task = datastore_mo.Rename(local_path)
-                    pyVim.task.WaitForTask(task)
-
-        # TODO Find the datastore identifier for the NFS volume and return it
-        return None
-
 
-def detect_vmfs_datastore(context, host_name, datastore_name):
-    """Find VMFS datastore given host and datastore names"""
-    names = set([host_name])
-
-    # Use vAPI find the Host managed identities
-    host_summaries = context.client.vcenter.Host.list(
-        Host.FilterSpec(names=names))
-
-    for host_summary in host_summaries:
-        # Convert the host identifier into a ManagedObject
-        host = host_summary.host
-        host_mo = vim.HostSystem(host, context.soap_stub)
+    host_args = []
+    for host_name in host_names:
+        existing = None
+        for datastore_mo, props in host_datastores[host_name]:
+            info = props.get('info')
+            if (isinstance(info, vim.host.NasDatastoreInfo) and
+                    info.nas.remoteHost == nfs_host and
+                    info.nas.remotePath == remote_path):
+                existing = (datastore_mo, info)
+                break
+        host_args.append((host_name, (existing,)))
+    return _run_on_hosts(mount, host_args, max_workers)
 
-        for datastore_mo in host_mo.datastore:
-            if (datastore_mo.name == datastore_name and
-                datastore_mo.summary.type == 'VMFS'):
-                datastore = datastore_mo._moId
-                print("Detected VMFS Volume '{}' as {} on Host '{}' ({})".
-                      format(datastore_name, datastore, host_name, host))
-                context.testbed.entities['HOST_VMFS_DATASTORE_IDS'][host_name] \
-                    = datastore
-                return True
 
-    print("VMFS Volume '{}' missing on Host '{}'".
-          format(datastore_name, host_name))
-    return False
+def setup_nfs_datastore_on_host(context, host_name):
+    """Mount the NFS volume on one ESX hosts using the VIM API."""
+    return mount_nfs_datastores(context, [host_name])[host_name]
 
 
 def detect_vmfs_datastores(context):
@@ -187,54 +236,111 @@ def detect_vmfs_datastores(context):
     host2_vmfs_volume = context.testbed.config['ESX_HOST2_VMFS_DATASTORE']
 
     # From each host, look for the VMFS Volume
-    return (detect_vmfs_datastore(context, host1_name, host1_vmfs_volume) and
-            detect_vmfs_datastore(context, host2_name, host2_vmfs_volume))
+    return _detect_datastores(context, 'HOST_VMFS_DATASTORE_IDS', 'VMFS',
+                              {host1_name: host1_vmfs_volume,
+                               host2_name: host2_vmfs_volume})
 
 
-def setup_vmfs_datastore(context, host_name, datastore_name):
-    """Find VMFS datastore given host and datastore names"""
-    context.testbed.entities['HOST_VMFS_DATASTORE_IDS'] = {}
+def create_vmfs_datastore(host_mo, datastore_name, disk_name):
+    """
+    Create a VMFS datastore on the disk of the host with canonical name (or
+    device path) disk_name, if that disk is available for VMFS.  Everything
+    on the disk is lost.
+    """
+    datastore_system = host_mo.configManager.datastoreSystem
+    disks = [disk for disk in datastore_system.QueryAvailableDisksForVmfs()
+             if disk_name in (disk.canonicalName, disk.devicePath)]
+    if not disks:
+        return None
+    options = datastore_system.QueryVmfsDatastoreCreateOptions(
+        disks[0].devicePath)
+    if not options:
+        return None
+    spec = options[0].spec
+    spec.vmfs.volumeName = datastore_name
+    return datastore_system.CreateVmfsDatastore(spec)
+
+
+def setup_vmfs_datastores_on_hosts(context, volumes, disks=None,
+                                   max_workers=16):
+    """
+    Make sure every host in volumes has a VMFS datastore named after it and
+    record the datastore identifiers in HOST_VMFS_DATASTORE_IDS.  volumes
+    maps each host name to the datastore name expected on it.
+
+    The datastores of all hosts are read with one property retrieval.  A
+    host without the datastore gets its first VMFS datastore renamed.  A
+    host without any VMFS datastore only gets a new one if disks maps it to
+    the canonical name of a free disk, which is then formatted.  The hosts
+    are handled in parallel.
+    """
+    disks = disks or {}
+    host_datastores = get_host_datastores(context, list(volumes))
+
+    def setup_vmfs(host_name, datastore_name):
+        host = context.testbed.entities['HOST_IDS'][host_name]
+        vmfs_datastores = [(props.get('name'), datastore_mo)
+                           for datastore_mo, props in
+                           host_datastores[host_name]
+                           if props.get('summary.type') == 'VMFS']
+        names = dict(vmfs_datastores)
+
+        # The VMFS volume exists.  No need to do anything
+        if datastore_name in names:
+            datastore = names[datastore_name]._moId
+            print("Detected VMFS Volume '{}' as {} on Host '{}' ({})".
+                  format(datastore_name, datastore, host_name, host))
+            return datastore
+
+        # Rename a VMFS datastore
+        if vmfs_datastores:
+            current_name, datastore_mo = vmfs_datastores[0]
+            print("Renaming VMFS Volume '{}' ({}) on Host '{}' ({}) to '{}'".
+                  format(current_name, datastore_mo._moId,
+                         host_name, host, datastore_name))
+            task = datastore_mo.Rename(datastore_name)
+            pyVim.task.WaitForTask(task)
+            return datastore_mo._moId
+
+        disk_name = disks.get(host_name)
+        if not disk_name:
+            print("VMFS Volume '{}' missing on Host '{}' ({}) and no disk "
+                  "configured for it".format(datastore_name, host_name, host))
+            return None
+        host_mo = vim.HostSystem(host, context.soap_stub)
+        datastore_mo = create_vmfs_datastore(host_mo, datastore_name,
+                                             disk_name)
+        if datastore_mo is None:
+            print("Disk '{}' not available for VMFS Volume '{}' on Host '{}' "
+                  "({})".format(disk_name, datastore_name, host_name, host))
+            return None
+        print("Created VMFS Volume '{}' ({}) on Host '{}' ({})".
+              format(datastore_name, datastore_mo._moId, host_name, host))
+        return datastore_mo._moId
 
-    names = set([host_name])
+    results = _run_on_hosts(setup_vmfs,
+                            [(host_name, (datastore_name,))
+                             for host_name, datastore_name in volumes.items()],
+                            max_workers)
+    for host_name, datastore in results.items():
+        if datastore:
+            context.testbed.entities['HOST_VMFS_DATASTORE_IDS'][host_name] \
+                = datastore
+    return results
 
-    # Use vAPI find the Host managed identities
-    host_summaries = context.client.vcenter.Host.list(
-        Host.FilterSpec(names=names))
 
-    host_summary = host_summaries[0]
-    # Convert the host identifier into a ManagedObject
-    host = host_summary.host
-    host_mo = vim.HostSystem(host, context.soap_stub)
-
-    vmfs_datastores = dict([(datastore_mo.name, datastore_mo)
-                            for datastore_mo in host_mo.datastore
-                            if datastore_mo.summary.type == 'VMFS'])
-
-    # The VMFS volume exists.  No need to do anything
-    if datastore_name in vmfs_datastores:
-        datastore = vmfs_datastores[datastore_name]._moId
-        print("Detected VMFS Volume '{}' as {} on Host '{}' ({})".
-              format(datastore_name, datastore, host_name, host))
-        context.testbed.entities['HOST_VMFS_DATASTORE_IDS'][host_name] \
-            = datastore
-        return True
-
-    # Rename a VMFS datastore
-    if len(vmfs_datastores) > 0:
-        datastore_mo = list(vmfs_datastores.values())[0]
-        datastore = datastore_mo._moId
-        print("Renaming VMFS Volume '{}' ({}) on Host '{}' ({}) to '{}'".
-              format(datastore_mo.name, datastore,
-                     host_name, host, datastore_name))
-        task = datastore_mo.Rename(datastore_name)
-        pyVim.task.WaitForTask(task)
-        return True
-
-    return False
+def setup_vmfs_datastore(context, host_name, datastore_name):
+    """Find VMFS datastore given host and datastore names"""
+    context.testbed.entities.setdefault('HOST_VMFS_DATASTORE_IDS', {})
+    results = setup_vmfs_datastores_on_hosts(context,
+                                             {host_name: datastore_name})
+    return results[host_name] is not None
 
 
 def setup_vmfs_datastores(context):
     """Setup VMFS datastore used to run vcenter samples"""
+    context.testbed.entities['HOST_VMFS_DATASTORE_IDS'] = {}
+
     host1_name = context.testbed.config['ESX_HOST1']
     host1_vmfs_volume = context.testbed.config['ESX_HOST1_VMFS_DATASTORE']
 
@@ -242,8 +348,11 @@ def setup_vmfs_datastores(context):
     host2_vmfs_volume = context.testbed.config['ESX_HOST2_VMFS_DATASTORE']
 
     # From each host, look for the VMFS Volume
-    setup_vmfs_datastore(context, host1_name, host1_vmfs_volume)
-    setup_vmfs_datastore(context, host2_name, host2_vmfs_volume)
+    setup_vmfs_datastores_on_hosts(
+        context, {host1_name: host1_vmfs_volume,
+                  host2_name: host2_vmfs_volume},
+        disks={host1_name: context.testbed.config.get('ESX_HOST1_VMFS_DISK'),
+               host2_name: context.testbed.config.get('ESX_HOST2_VMFS_DISK')})
 
 
 def setup(context):
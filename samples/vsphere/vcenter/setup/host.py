@@ -14,10 +14,18 @@
 __author__ = 'VMware, Inc.'
 
 
-import pyVim.task
+import hashlib
+import ssl
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
 from com.vmware.vcenter_client import (Folder, Host)
 from pyVmomi import vim
 
+from samples.vsphere.common.vim.helpers.vim_utils import TaskWatcher
+
 
 def detect_host(context, host_name):
     """Find host based on host name"""
@@ -88,82 +96,265 @@ def create_host_vapi(context, host_name, datacenter_name):
     return host
 
 
-def create_host_vim(context, host_name, datacenter_name):
+# Seconds the hosts get to enter or exit maintenance mode
+MAINTENANCE_TIMEOUT = 30
+
+# host name -> SHA-1 thumbprint of its SSL certificate
+_thumbprints = {}
+_thumbprints_lock = threading.Lock()
+
+
+def get_host_thumbprint(host_name, port=443):
     """
-    Adds a single Host to the vCenter inventory under the named Datacenter
-    using the VIM API.
+    Return the SHA-1 thumbprint of the host's SSL certificate in the format
+    vim.host.ConnectSpec expects.  Thumbprints are cached per host name, so
+    repeated setups do not fetch the certificate again.
+    """
+    with _thumbprints_lock:
+        if host_name in _thumbprints:
+            return _thumbprints[host_name]
+    pem = ssl.get_server_certificate((host_name, port))
+    digest = hashlib.sha1(ssl.PEM_cert_to_DER_cert(pem)).hexdigest().upper()
+    thumbprint = ':'.join(digest[i:i + 2] for i in range(0, len(digest), 2))
+    with _thumbprints_lock:
+        _thumbprints[host_name] = thumbprint
+    return thumbprint
+
+
+def _prefetch_thumbprints(host_names, max_workers=16):
+    def fetch(host_name):
+        try:
+            get_host_thumbprint(host_name)
+        except Exception as e:
+            # AddStandaloneHost reports the thumbprint in an SSLVerifyFault
+            print("Could not read the certificate of Host '{}': {}".
+                  format(host_name, e))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        list(executor.map(fetch, host_names))
+
+
+class HostOnboardResult(object):
+    """
+    Outcome of one host in onboard_hosts_vim or move_hosts_into_cluster_vim.
+    timings lists (step name, seconds) for every task the host ran.
     """
-    user = context.testbed.config['ESX_USER']
-    pwd = context.testbed.config['ESX_PASS']
 
-    # Get the host folder for the Datacenter1 using the folder query
-    datacenter = context.testbed.entities['DATACENTER_IDS'][datacenter_name]
+    def __init__(self, host_name, host=None):
+        self.host_name = host_name
+        self.host = host
+        self.error = None
+        self.timings = []
+        self.ssl_retried = False
 
-    for entity in context.service_instance.content.rootFolder.childEntity:
-        if isinstance(entity, vim.Datacenter) and\
-                        entity.name == datacenter_name:
-            datacenter_mo = entity
+    @property
+    def elapsed(self):
+        return sum(seconds for _, seconds in self.timings)
 
-    folder_mo = datacenter_mo.hostFolder
-    connect_spec = vim.host.ConnectSpec(hostName=host_name,
-                                        userName=user,
-                                        password=pwd,
-                                        force=False)
-    print("Creating Host ({})".format(host_name))
-    task = folder_mo.AddStandaloneHost(connect_spec,
-                                       vim.ComputeResource.ConfigSpec(),
-                                       True)
-    pyVim.task.WaitForTask(task)
+    def __repr__(self):
+        return "Host '{}' ({}) in {:.1f}s ({}) error={}".format(
+            self.host_name, self.host, self.elapsed,
+            ', '.join('{} {:.1f}s'.format(step, seconds)
+                      for step, seconds in self.timings),
+            self.error)
 
-    # Get host from task result
-    host_mo = task.info.result.host[0]
-    print("Created Host '{}' ({})".format(host_mo._moId, host_name))
 
-    return host_mo._moId
+def _run_host_steps(context, results, plans):
+    """
+    Run the steps of every host in order, all hosts at the same time.
+    plans maps a host name to a list of (step name, submit, complete):
+    submit(result) starts the step and returns its task, or None when there
+    is nothing to do; complete(result, task_result) is called on success and
+    may be None.  Every task is waited on through one TaskWatcher.
+    """
+    content = context.service_instance.RetrieveContent()
+    queues = dict((host_name, deque(steps))
+                  for host_name, steps in plans.items())
+    running = {}
+    watcher = TaskWatcher(content)
+
+    def submit_next(host_name):
+        result = results[host_name]
+        queue = queues[host_name]
+        while queue:
+            step, submit, complete = queue[0]
+            try:
+                task = submit(result)
+            except Exception as e:
+                result.error = e
+                print("Host '{}' failed to start {}: {}".
+                      format(host_name, step, e))
+                return
+            if task is None:
+                queue.popleft()
+                continue
+            watcher.add(task)
+            running[str(task)] = (host_name, time.time())
+            return
+        print(result)
+
+    try:
+        for host_name in plans:
+            submit_next(host_name)
+        while watcher.pending:
+            for info in watcher.wait():
+                host_name, start = running.pop(str(info.task))
+                result = results[host_name]
+                step, submit, complete = queues[host_name][0]
+                result.timings.append((step, time.time() - start))
+                if info.state != vim.TaskInfo.State.success:
+                    if (isinstance(info.error, vim.fault.SSLVerifyFault) and
+                            not result.ssl_retried):
+                        # Trust the reported certificate and submit again
+                        result.ssl_retried = True
+                        with _thumbprints_lock:
+                            _thumbprints[host_name] = info.error.thumbprint
+                        submit_next(host_name)
+                        continue
+                    result.error = info.error
+                    print("Host '{}' failed in {}: {}".
+                          format(host_name, step, info.error))
+                    continue
+                queues[host_name].popleft()
+                if complete:
+                    complete(result, info.result)
+                submit_next(host_name)
+    finally:
+        watcher.close()
+    return results
+
+
+def _move_into_cluster_steps(context, cluster_mo):
+    def host_mo(result):
+        return vim.HostSystem(result.host, context.soap_stub)
+
+    def enter_maintenance(result):
+        if host_mo(result).runtime.inMaintenanceMode:
+            return None
+        return host_mo(result).EnterMaintenanceMode(MAINTENANCE_TIMEOUT)
+
+    return [
+        ('enter_maintenance', enter_maintenance, None),
+        ('move_into_cluster',
+         lambda result: cluster_mo.MoveInto([host_mo(result)]), None),
+        ('exit_maintenance',
+         lambda result: host_mo(result).ExitMaintenanceMode(
+             MAINTENANCE_TIMEOUT), None),
+    ]
+
+
+def onboard_hosts_vim(context, hosts):
+    """
+    Add many hosts to the vCenter inventory using the VIM API.  hosts is a
+    list of (host name, datacenter name, cluster name or None); hosts with a
+    cluster are moved into it after being added.
+
+    The AddStandaloneHost tasks of all hosts are submitted together and each
+    host moves on to its next task as soon as the previous one completes.
+    Certificate thumbprints are read up front, so the hosts are not added
+    twice to learn them from an SSLVerifyFault.  Returns a dict of host name
+    to HostOnboardResult.
+    """
+    user = context.testbed.config['ESX_USER']
+    pwd = context.testbed.config['ESX_PASS']
 
+    datacenter_mos = dict(
+        (entity.name, entity)
+        for entity in context.service_instance.content.rootFolder.childEntity
+        if isinstance(entity, vim.Datacenter))
+
+    _prefetch_thumbprints([host_name for host_name, _, _ in hosts])
+
+    results = {}
+    plans = {}
+    for host_name, datacenter_name, cluster_name in hosts:
+        folder_mo = datacenter_mos[datacenter_name].hostFolder
+
+        def add_host(result, folder_mo=folder_mo):
+            with _thumbprints_lock:
+                thumbprint = _thumbprints.get(result.host_name)
+            connect_spec = vim.host.ConnectSpec(hostName=result.host_name,
+                                                userName=user,
+                                                password=pwd,
+                                                sslThumbprint=thumbprint,
+                                                force=False)
+            print("Creating Host ({})".format(result.host_name))
+            return folder_mo.AddStandaloneHost(
+                connect_spec, vim.ComputeResource.ConfigSpec(), True)
+
+        def host_added(result, compute_resource):
+            result.host = compute_resource.host[0]._moId
+            print("Created Host '{}' ({})".format(result.host,
+                                                  result.host_name))
+
+        results[host_name] = HostOnboardResult(host_name)
+        plans[host_name] = [('add', add_host, host_added)]
+        if cluster_name:
+            cluster = context.testbed.entities['CLUSTER_IDS'][cluster_name]
+            cluster_mo = vim.ClusterComputeResource(cluster,
+                                                    context.soap_stub)
+            plans[host_name] += _move_into_cluster_steps(context, cluster_mo)
+
+    return _run_host_steps(context, results, plans)
+
+
+def move_hosts_into_cluster_vim(context, host_names, cluster_name):
+    """
+    Use vim api to move hosts into a cluster.  Every host goes through
+    maintenance mode independently, with all tasks waited on together.
+    """
+    cluster = context.testbed.entities['CLUSTER_IDS'][cluster_name]
+    cluster_mo = vim.ClusterComputeResource(cluster, context.soap_stub)
 
-def move_host_into_cluster_vim(context, host_name, cluster_name):
-    """Use vim api to move host to another cluster"""
-    TIMEOUT = 30  # sec
+    results = dict((host_name, HostOnboardResult(
+        host_name, context.testbed.entities['HOST_IDS'][host_name]))
+        for host_name in host_names)
+    plans = dict((host_name, _move_into_cluster_steps(context, cluster_mo))
+                 for host_name in host_names)
+    return _run_host_steps(context, results, plans)
 
-    host = context.testbed.entities['HOST_IDS'][host_name]
-    host_mo = vim.HostSystem(host, context.soap_stub)
 
-    # Move the host into the cluster
-    if not host_mo.runtime.inMaintenanceMode:
-        task = host_mo.EnterMaintenanceMode(TIMEOUT)
-        pyVim.task.WaitForTask(task)
-    print("Host '{}' ({}) in maintenance mode".format(host, host_name))
+def _raise_on_errors(results):
+    failed = [result for result in results.values() if result.error]
+    if failed:
+        raise Exception('Failed to set up Host(s) {}'.format(
+            ', '.join("'{}'".format(result.host_name) for result in failed)))
 
-    cluster = context.testbed.entities['CLUSTER_IDS'][cluster_name]
-    cluster_mo = vim.ClusterComputeResource(cluster, context.soap_stub)
 
-    task = cluster_mo.MoveInto([host_mo])
-    pyVim.task.WaitForTask(task)
-    print("Host '{}' ({}) moved into Cluster {} ({})".
-          format(host, host_name, cluster, cluster_name))
+def create_host_vim(context, host_name, datacenter_name):
+    """
+    Adds a single Host to the vCenter inventory under the named Datacenter
+    using the VIM API.
+    """
+    results = onboard_hosts_vim(context, [(host_name, datacenter_name, None)])
+    _raise_on_errors(results)
+    return results[host_name].host
 
-    task = host_mo.ExitMaintenanceMode(TIMEOUT)
-    pyVim.task.WaitForTask(task)
-    print("Host '{}' ({}) out of maintenance mode".format(host, host_name))
+
+def move_host_into_cluster_vim(context, host_name, cluster_name):
+    """Use vim api to move host to another cluster"""
+    _raise_on_errors(
+        move_hosts_into_cluster_vim(context, [host_name], cluster_name))
 
 
 def setup_hosts_vapi(context):
     """Use vsphere automation API to setup host for sample run"""
-    # Create Host1 as a standalone host in Datacenter1
+    # Create Host1 as a standalone host in Datacenter1 and Host2 in
+    # Datacenter2 at the same time
     host1_name = context.testbed.config['ESX_HOST1']
     datacenter1_name = context.testbed.config['DATACENTER1_NAME']
-    host1 = create_host_vapi(context, host1_name, datacenter1_name)
-
-    # Create Host2 in a Cluster2
     host2_name = context.testbed.config['ESX_HOST2']
     datacenter2_name = context.testbed.config['DATACENTER2_NAME']
-    host2 = create_host_vapi(context, host2_name, datacenter2_name)
 
-    context.testbed.entities['HOST_IDS'] = {
-        host1_name: host1,
-        host2_name: host2
-    }
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        host1 = executor.submit(create_host_vapi, context, host1_name,
+                                datacenter1_name)
+        host2 = executor.submit(create_host_vapi, context, host2_name,
+                                datacenter2_name)
+        context.testbed.entities['HOST_IDS'] = {
+            host1_name: host1.result(),
+            host2_name: host2.result()
+        }
 
     # Move Host2 into Cluster2
     cluster_name = context.testbed.config['CLUSTER1_NAME']
@@ -172,24 +363,20 @@ def setup_hosts_vapi(context):
 
 def setup_hosts_vim(context):
     """Use vim API to setup host for sample run"""
-    # Create Host1 as a standalone host in Datacenter1
+    # Create Host1 as a standalone host in Datacenter1 and Host2 in Cluster2
+    # of Datacenter2
     host1_name = context.testbed.config['ESX_HOST1']
     datacenter1_name = context.testbed.config['DATACENTER1_NAME']
-    host1 = create_host_vim(context, host1_name, datacenter1_name)
-
-    # Create Host2 in a Cluster2
     host2_name = context.testbed.config['ESX_HOST2']
     datacenter2_name = context.testbed.config['DATACENTER2_NAME']
-    host2 = create_host_vim(context, host2_name, datacenter2_name)
-
-    context.testbed.entities['HOST_IDS'] = {
-        host1_name: host1,
-        host2_name: host2
-    }
-
-    # Move Host2 into Cluster2
     cluster_name = context.testbed.config['CLUSTER1_NAME']
-    move_host_into_cluster_vim(context, host2_name, cluster_name)
+
+    results = onboard_hosts_vim(context,
+                                [(host1_name, datacenter1_name, None),
+                                 (host2_name, datacenter2_name, cluster_name)])
+    _raise_on_errors(results)
+    context.testbed.entities['HOST_IDS'] = dict(
+        (host_name, result.host) for host_name, result in results.items())
 
 
 def setup_hosts(context):
@@ -0,0 +1,272 @@
+"""
+* *******************************************************
+* Copyright (c) VMware, Inc. 2024. All Rights Reserved.
+* SPDX-License-Identifier: MIT
+* *******************************************************
+*
+* DISCLAIMER. THIS PROGRAM IS PROVIDED TO YOU "AS IS" WITHOUT
+* WARRANTIES OR CONDITIONS OF ANY KIND, WHETHER ORAL OR WRITTEN,
+* EXPRESS OR IMPLIED. THE AUTHOR SPECIFICALLY DISCLAIMS ANY IMPLIED
+* WARRANTIES OR CONDITIONS OF MERCHANTABILITY, SATISFACTORY QUALITY,
+* NON-INFRINGEMENT AND FITNESS FOR A PARTICULAR PURPOSE.
+"""
+
+__author__ = 'VMware, Inc.'
+
+from pyVmomi import vim, vmodl
+
+# Properties read for every inventory object type the testbed checks.
+SNAPSHOT_PROPERTIES = [
+    (vim.Datacenter, ['name']),
+    (vim.Folder, ['name', 'parent', 'childType']),
+    (vim.ClusterComputeResource, ['name', 'parent']),
+    (vim.HostSystem, ['name', 'datastore', 'network']),
+    (vim.Datastore, ['name', 'summary.type']),
+    (vim.DistributedVirtualSwitch, ['name', 'parent', 'portgroup']),
+    (vim.Network, ['name']),
+]
+
+
+class InventorySnapshot(object):
+    """
+    Names and relations of the datacenters, folders, clusters, hosts,
+    datastores, switches and networks of a vCenter, read with a single
+    property collector retrieval.
+    """
+
+    def __init__(self, props):
+        # managed object -> {property path: value}
+        self.props = props
+
+    @classmethod
+    def take(cls, service_instance):
+        content = service_instance.RetrieveContent()
+        view = content.viewManager.CreateContainerView(
+            content.rootFolder, [mo_type for mo_type, _ in SNAPSHOT_PROPERTIES],
+            True)
+        try:
+            traversal = vmodl.query.PropertyCollector.TraversalSpec(
+                name='traverseView', path='view', skip=False,
+                type=vim.view.ContainerView)
+            filter_spec = vmodl.query.PropertyCollector.FilterSpec(
+                objectSet=[vmodl.query.PropertyCollector.ObjectSpec(
+                    obj=view, skip=True, selectSet=[traversal])],
+                propSet=[vmodl.query.PropertyCollector.PropertySpec(
+                    type=mo_type, pathSet=path_set)
+                    for mo_type, path_set in SNAPSHOT_PROPERTIES])
+            props = {}
+            for obj in content.propertyCollector.RetrieveContents(
+                    [filter_spec]):
+                props[obj.obj] = dict((prop.name, prop.val)
+                                      for prop in obj.propSet)
+            return cls(props)
+        finally:
+            view.Destroy()
+
+    def get(self, mo, path, default=None):
+        return self.props.get(mo, {}).get(path, default)
+
+    def objects(self, mo_type, name=None):
+        """Objects of exactly mo_type, optionally only those named name"""
+        return [mo for mo in self.props
+                if type(mo) == mo_type and
+                (name is None or self.get(mo, 'name') == name)]
+
+    def datacenter_of(self, mo):
+        """Name of the datacenter containing mo, following parent links"""
+        while mo is not None:
+            if isinstance(mo, vim.Datacenter):
+                return self.get(mo, 'name')
+            mo = self.get(mo, 'parent')
+        return None
+
+    def find(self, mo_type, name, datacenter_name=None):
+        for mo in self.objects(mo_type, name):
+            if (datacenter_name is None or
+                    self.datacenter_of(mo) == datacenter_name):
+                return mo
+        return None
+
+
+def detect_datacenters(context, inventory):
+    context.testbed.entities['DATACENTER_IDS'] = {}
+    found = True
+    for key in ['DATACENTER1_NAME', 'DATACENTER2_NAME']:
+        datacenter_name = context.testbed.config[key]
+        datacenter_mo = inventory.find(vim.Datacenter, datacenter_name)
+        if datacenter_mo:
+            print("Detected Datacenter '{}' as {}".
+                  format(datacenter_name, datacenter_mo._moId))
+            context.testbed.entities['DATACENTER_IDS'][datacenter_name] = \
+                datacenter_mo._moId
+        else:
+            print("Datacenter '{}' missing".format(datacenter_name))
+            found = False
+    return found
+
+
+def detect_vm_folders(context, inventory):
+    context.testbed.entities['VM_FOLDER_IDS'] = {}
+    found = True
+    for folder_key, datacenter_key in [('VM_FOLDER1_NAME', 'DATACENTER1_NAME'),
+                                       ('VM_FOLDER2_NAME', 'DATACENTER2_NAME')]:
+        folder_name = context.testbed.config[folder_key]
+        datacenter_name = context.testbed.config[datacenter_key]
+        folder_mo = None
+        for mo in inventory.objects(vim.Folder, folder_name):
+            if ('VirtualMachine' in inventory.get(mo, 'childType', []) and
+                    inventory.datacenter_of(mo) == datacenter_name):
+                folder_mo = mo
+                break
+        if folder_mo:
+            print("Detected VM Folder '{}' as {}".
+                  format(folder_name, folder_mo._moId))
+            context.testbed.entities['VM_FOLDER_IDS'][folder_name] = \
+                folder_mo._moId
+        else:
+            print("VM Folder '{}' missing in Datacenter {}".
+                  format(folder_name, datacenter_name))
+            found = False
+    return found
+
+
+def detect_cluster(context, inventory):
+    cluster_name = context.testbed.config['CLUSTER1_NAME']
+    datacenter_name = context.testbed.config['VM_DATACENTER_NAME']
+    cluster_mo = inventory.find(vim.ClusterComputeResource, cluster_name,
+                                datacenter_name)
+    if not cluster_mo:
+        print("Cluster '{}' missing in Datacenter {}".
+              format(cluster_name, datacenter_name))
+        return False
+    print("Detected Cluster '{}' as {}".format(cluster_name, cluster_mo._moId))
+    context.testbed.entities['CLUSTER_IDS'] = {cluster_name: cluster_mo._moId}
+    return True
+
+
+def detect_hosts(context, inventory):
+    context.testbed.entities['HOST_IDS'] = {}
+    found = True
+    for key in ['ESX_HOST1', 'ESX_HOST2']:
+        host_name = context.testbed.config[key]
+        host_mo = inventory.find(vim.HostSystem, host_name)
+        if host_mo:
+            print("Detected Host '{}' as {}".format(host_name, host_mo._moId))
+            context.testbed.entities['HOST_IDS'][host_name] = host_mo._moId
+        else:
+            print("Host '{}' missing".format(host_name))
+            found = False
+    return found
+
+
+def _find_host_datastore(inventory, host_name, datastore_name, datastore_type):
+    host_mo = inventory.find(vim.HostSystem, host_name)
+    if host_mo is None:
+        return None, None
+    for datastore_mo in inventory.get(host_mo, 'datastore', []):
+        if (inventory.get(datastore_mo, 'name') == datastore_name and
+                inventory.get(datastore_mo, 'summary.type') == datastore_type):
+            return host_mo, datastore_mo
+    return host_mo, None
+
+
+def detect_datastores(context, inventory):
+    context.testbed.entities['HOST_NFS_DATASTORE_IDS'] = {}
+    context.testbed.entities['HOST_VMFS_DATASTORE_IDS'] = {}
+    checks = [
+        ('NFS', 'HOST_NFS_DATASTORE_IDS', 'ESX_HOST1', 'NFS_DATASTORE_NAME'),
+        ('NFS', 'HOST_NFS_DATASTORE_IDS', 'ESX_HOST2', 'NFS_DATASTORE_NAME'),
+        ('VMFS', 'HOST_VMFS_DATASTORE_IDS', 'ESX_HOST1',
+         'ESX_HOST1_VMFS_DATASTORE'),
+        ('VMFS', 'HOST_VMFS_DATASTORE_IDS', 'ESX_HOST2',
+         'ESX_HOST2_VMFS_DATASTORE'),
+    ]
+    found = True
+    for datastore_type, entity_key, host_key, datastore_key in checks:
+        host_name = context.testbed.config[host_key]
+        datastore_name = context.testbed.config[datastore_key]
+        host_mo, datastore_mo = _find_host_datastore(
+            inventory, host_name, datastore_name, datastore_type)
+        if datastore_mo:
+            print("Detected {} Volume '{}' as {} on Host '{}' ({})".
+                  format(datastore_type, datastore_name, datastore_mo._moId,
+                         host_name, host_mo._moId))
+            context.testbed.entities[entity_key][host_name] = \
+                datastore_mo._moId
+        else:
+            print("{} Volume '{}' missing on Host '{}'".
+                  format(datastore_type, datastore_name, host_name))
+            found = False
+    return found
+
+
+def detect_networks(context, inventory):
+    context.testbed.entities['DISTRIBUTED_SWITCH_IDS'] = {}
+    context.testbed.entities['DISTRIBUTED_PORTGROUP_IDS'] = {}
+    context.testbed.entities['HOST_STANDARD_SWITCH_IDS'] = {}
+
+    datacenter_name = context.testbed.config['DATACENTER2_NAME']
+    vdswitch_name = context.testbed.config['VDSWITCH1_NAME']
+    vdswitch_mo = None
+    for mo in inventory.props:
+        if (isinstance(mo, vim.DistributedVirtualSwitch) and
+                inventory.get(mo, 'name') == vdswitch_name and
+                inventory.datacenter_of(mo) == datacenter_name):
+            vdswitch_mo = mo
+            break
+    if not vdswitch_mo:
+        print("Distributed Switch '{}' missing".format(vdswitch_name))
+        return False
+    print("Detected Distributed Switch '{}' as {}".
+          format(vdswitch_name, vdswitch_mo._moId))
+    context.testbed.entities['DISTRIBUTED_SWITCH_IDS'][vdswitch_name] = \
+        vdswitch_mo._moId
+
+    vdportgroup_name = context.testbed.config['VDPORTGROUP1_NAME']
+    for vdportgroup_mo in inventory.get(vdswitch_mo, 'portgroup', []):
+        if inventory.get(vdportgroup_mo, 'name') == vdportgroup_name:
+            print("Detected Distributed Portgroup '{}' as {}".
+                  format(vdportgroup_name, vdportgroup_mo._moId))
+            context.testbed.entities['DISTRIBUTED_PORTGROUP_IDS'][
+                vdportgroup_name] = vdportgroup_mo._moId
+            break
+    else:
+        print("Distributed Portgroup '{}' missing".format(vdportgroup_name))
+        return False
+
+    network_name = context.testbed.config['STDPORTGROUP_NAME']
+    found = True
+    for key in ['ESX_HOST1', 'ESX_HOST2']:
+        host_name = context.testbed.config[key]
+        host_mo = inventory.find(vim.HostSystem, host_name)
+        networks = [mo for mo in inventory.get(host_mo, 'network', [])
+                    if type(mo) == vim.Network and
+                    inventory.get(mo, 'name') == network_name]
+        if networks:
+            print("Detected Standard Portgroup '{}' as {} on Host '{}' ({})".
+                  format(network_name, networks[0]._moId, host_name,
+                         host_mo._moId))
+            context.testbed.entities['HOST_STANDARD_SWITCH_IDS'][host_name] = \
+                networks[0]._moId
+        else:
+            print("Standard Portgroup '{}' missing on Host '{}'".
+                  format(network_name, host_name))
+            found = False
+    return found
+
+
+def validate(context, inventory=None):
+    """
+    Detect the datacenters, folders, cluster, hosts, datastores and networks
+    of the testbed from one InventorySnapshot and record their identifiers
+    in context.testbed.entities.
+    """
+    if inventory is None:
+        inventory = InventorySnapshot.take(context.service_instance)
+    results = [detect_datacenters(context, inventory),
+               detect_vm_folders(context, inventory),
+               detect_cluster(context, inventory),
+               detect_hosts(context, inventory),
+               detect_datastores(context, inventory),
+               detect_networks(context, inventory)]
+    return all(results)
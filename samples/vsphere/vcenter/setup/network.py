@@ -13,9 +13,18 @@
 
 __author__ = 'VMware, Inc.'
 
+import socket
+
 import pyVim.task
 from com.vmware.vcenter_client import Host
-from pyVmomi import vim
+from pyVmomi import vim, vmodl
+
+# Host member specs sent in one Distributed Switch reconfigure task.
+MAX_HOSTS_PER_RECONFIGURE = 64
+
+# Faults of a reconfigure task that a smaller batch of hosts may avoid.
+SPLIT_BATCH_FAULTS = (vim.fault.Timedout, vmodl.fault.RequestCanceled,
+                      socket.timeout)
 
 
 def detect_vdswitches(context):
@@ -154,31 +163,80 @@ def create_vdportgroup(context, vdswitch_name, vdportgroup_name):
 
 def add_host_to_vdswitch(context, vdswitch_name, host_name, pnic_names=None):
     """Add host to Distributed Switch"""
-    host = context.testbed.entities['HOST_IDS'][host_name]
-    host_mo = vim.HostSystem(host, context.soap_stub)
-
-    vdswitch = context.testbed.entities['DISTRIBUTED_SWITCH_IDS'][vdswitch_name]
-    vdswitch_mo = vim.DistributedVirtualSwitch(vdswitch, context.soap_stub)
+    add_hosts_to_vdswitch(context, vdswitch_name, [host_name], pnic_names)
 
-    pnic_specs = []
-    if pnic_names:
-        for pnic in pnic_names:
-            pnic_specs.append(vim.dvs.HostMember.PnicSpec(pnicDevice=pnic))
 
-    dvs_member_config = vim.dvs.HostMember.ConfigSpec(
-        operation="add",
-        host=host_mo,
-        backing=vim.dvs.HostMember.PnicBacking(pnicSpec=pnic_specs))
+def _reconfigure_host_members(vdswitch_mo, host_mos, pnic_names):
+    member_configs = []
+    for host_mo in host_mos:
+        pnic_specs = [vim.dvs.HostMember.PnicSpec(pnicDevice=pnic)
+                      for pnic in pnic_names or []]
+        member_configs.append(vim.dvs.HostMember.ConfigSpec(
+            operation="add",
+            host=host_mo,
+            backing=vim.dvs.HostMember.PnicBacking(pnicSpec=pnic_specs)))
 
+    # The config version changes with every reconfigure, so read it per batch.
     dvs_config = vim.DistributedVirtualSwitch.ConfigSpec(
         configVersion=vdswitch_mo.config.configVersion,
-        host=[dvs_member_config])
+        host=member_configs)
 
     task = vdswitch_mo.Reconfigure(dvs_config)
     pyVim.task.WaitForTask(task)
 
-    print("Added Host '{}' ({}) to Distributed Switch '{}' ({})".
-          format(host_name, host, vdswitch_name, vdswitch))
+
+def add_hosts_to_vdswitch(context, vdswitch_name, host_names, pnic_names=None,
+                          batch_size=MAX_HOSTS_PER_RECONFIGURE):
+    """
+    Add hosts to Distributed Switch with a single reconfigure task, or one
+    task per batch_size hosts for larger host lists.  Hosts that already are
+    members are skipped.  A batch that times out (SPLIT_BATCH_FAULTS) is
+    retried as two halves until the failing hosts are isolated; those are
+    reported together at the end.  Any other fault is raised right away.
+    """
+    vdswitch = context.testbed.entities['DISTRIBUTED_SWITCH_IDS'][vdswitch_name]
+    vdswitch_mo = vim.DistributedVirtualSwitch(vdswitch, context.soap_stub)
+
+    members = set(member.config.host._moId
+                  for member in vdswitch_mo.config.host)
+    host_mos = []
+    for host_name in host_names:
+        host = context.testbed.entities['HOST_IDS'][host_name]
+        if host in members:
+            print("Host '{}' ({}) already on Distributed Switch '{}' ({})".
+                  format(host_name, host, vdswitch_name, vdswitch))
+            continue
+        host_mos.append((host_name, vim.HostSystem(host, context.soap_stub)))
+
+    batches = [host_mos[i:i + batch_size]
+               for i in range(0, len(host_mos), batch_size)]
+    failures = []
+    while batches:
+        batch = batches.pop(0)
+        try:
+            _reconfigure_host_members(vdswitch_mo,
+                                      [host_mo for _, host_mo in batch],
+                                      pnic_names)
+        except SPLIT_BATCH_FAULTS as e:
+            if len(batch) > 1:
+                print("Adding {} hosts to Distributed Switch '{}' failed, "
+                      "retrying in smaller batches: {}".
+                      format(len(batch), vdswitch_name, e))
+                half = len(batch) // 2
+                batches[:0] = [batch[:half], batch[half:]]
+            else:
+                failures.append((batch[0][0], e))
+            continue
+        for host_name, host_mo in batch:
+            print("Added Host '{}' ({}) to Distributed Switch '{}' ({})".
+                  format(host_name, host_mo._moId, vdswitch_name, vdswitch))
+
+    if failures:
+        for host_name, e in failures:
+            print("Failed to add Host '{}' to Distributed Switch '{}': {}".
+                  format(host_name, vdswitch_name, e))
+        raise Exception("Failed to add {} host(s) to Distributed Switch '{}'".
+                        format(len(failures), vdswitch_name))
 
 
 def remove_host_from_vdswitch(context, vdswitch_mo, host_name):
@@ -31,6 +31,10 @@ config["NFS_DATASTORE_NAME"] = "Shared_NFS_Volume"
 
 config["ESX_HOST1_VMFS_DATASTORE"] = "Local_VMFS_Volume_on_Host1"
 config["ESX_HOST2_VMFS_DATASTORE"] = "Local_VMFS_Volume_on_Host2"
+# Canonical name (e.g. "naa.6000...") of a free disk that may be formatted
+# for the VMFS volume of a host that has none.  Empty: never format a disk.
+config["ESX_HOST1_VMFS_DISK"] = ""
+config["ESX_HOST2_VMFS_DISK"] = ""
 
 config["DATACENTER1_NAME"] = "Sample_DC_1"
 config["DATACENTER2_NAME"] = "Sample_DC_2"
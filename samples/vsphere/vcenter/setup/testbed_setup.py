@@ -14,6 +14,9 @@
 __author__ = 'VMware, Inc.'
 __copyright__ = 'Copyright 2016 VMware, Inc. All rights reserved.'
 
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
 import samples.vsphere.vcenter.setup.backend_directory as backend_directory
 import samples.vsphere.vcenter.setup.cluster as cluster
 import samples.vsphere.vcenter.setup.datacenter as datacenter
@@ -21,6 +24,7 @@ import samples.vsphere.vcenter.setup.datastore as datastore
 import samples.vsphere.vcenter.setup.floppy_image as floppy_image
 import samples.vsphere.vcenter.setup.folder as folder
 import samples.vsphere.vcenter.setup.host as host
+import samples.vsphere.vcenter.setup.inventory as inventory
 import samples.vsphere.vcenter.setup.iso_image as iso_image
 import samples.vsphere.vcenter.setup.network as network
 
@@ -62,47 +66,118 @@ Inputs:
 """
 
 
+# (name, function, names of the steps that must complete first)
+SETUP_STEPS = [
+    ('datacenter', datacenter.setup, []),
+    ('folder', folder.setup, ['datacenter']),
+    ('cluster', cluster.setup, ['datacenter']),
+    ('host', host.setup, ['cluster']),
+    ('nfs_datastore', datastore.setup_nfs_datastore, ['host']),
+    ('vmfs_datastore', datastore.setup_vmfs_datastores, ['host']),
+    ('network', network.setup, ['host']),
+    ('backend_directory', backend_directory.setup, ['nfs_datastore']),
+    ('iso_image', iso_image.setup, ['backend_directory']),
+    ('floppy_image', floppy_image.setup, ['backend_directory']),
+]
+
+
+def _cleanup_iso_image(context):
+    if context.option['DO_TESTBED_ISO_CLEANUP']:
+        iso_image.cleanup(context)
+
+
+CLEANUP_STEPS = [
+    ('floppy_image', floppy_image.cleanup, []),
+    ('iso_image', _cleanup_iso_image, []),
+    ('backend_directory', backend_directory.cleanup,
+     ['floppy_image', 'iso_image']),
+    ('network', network.cleanup, []),
+    ('datastore', datastore.cleanup, ['backend_directory']),
+    ('host', host.cleanup, ['network', 'datastore']),
+    ('cluster', cluster.cleanup, ['host']),
+    ('folder', folder.cleanup, []),
+    ('datacenter', datacenter.cleanup, ['cluster', 'folder', 'network']),
+]
+
+# Checks that cannot be answered from the inventory snapshot.
+DATASTORE_FILE_CHECKS = [
+    ('backend_directory', backend_directory.validate),
+    ('iso_image', iso_image.validate),
+    ('floppy_image', floppy_image.validate),
+]
+
+
+def _timed(func, context):
+    start = time.time()
+    result = func(context)
+    return result, time.time() - start
+
+
+def run_steps(context, steps, max_workers=4):
+    """
+    Run each (name, function, dependencies) step as soon as all of its
+    dependencies completed, at most max_workers at a time, and print how long
+    each one took.  Returns a dict of step name to function result.  After a
+    failure no further steps are started, and the error is raised once the
+    running ones finish.
+    """
+    pending = dict((name, (func, set(deps))) for name, func, deps in steps)
+    results = {}
+    running = {}
+    error = None
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while pending or running:
+            if error is None:
+                ready = [name for name, (_, deps) in pending.items()
+                         if deps.issubset(results)]
+                for name in ready:
+                    func = pending.pop(name)[0]
+                    print("Step '{}' started".format(name))
+                    running[executor.submit(_timed, func, context)] = name
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    results[name], elapsed = future.result()
+                except Exception as e:
+                    print("Step '{}' failed: {}".format(name, e))
+                    error = error or e
+                    continue
+                print("Step '{}' completed in {:.1f}s".format(name, elapsed))
+    if error is not None:
+        raise error
+    if pending:
+        raise Exception('Steps with unmet dependencies: {}'.
+                        format(sorted(pending)))
+    return results
+
+
 def setup(context):
     print('Setup Testbed Start')
-    datacenter.setup(context)
-    folder.setup(context)
-    cluster.setup(context)
-    host.setup(context)
-    datastore.setup(context)
-    network.setup(context)
-    backend_directory.setup(context)
-    iso_image.setup(context)
-    floppy_image.setup(context)
-    print('Setup Testbed Complete\n')
+    start = time.time()
+    run_steps(context, SETUP_STEPS)
+    print('Setup Testbed Complete in {:.1f}s\n'.format(time.time() - start))
 
 
 def cleanup(context):
     print('Cleanup Testbed Start')
-    floppy_image.cleanup(context)
-    if context.option['DO_TESTBED_ISO_CLEANUP']:
-        iso_image.cleanup(context)
-    backend_directory.cleanup(context)
-    network.cleanup(context)
-    datastore.cleanup(context)
-    host.cleanup(context)
-    cluster.cleanup(context)
-    folder.cleanup(context)
-    datacenter.cleanup(context)
-    print('Cleanup Testbed Complete\n')
+    start = time.time()
+    run_steps(context, CLEANUP_STEPS)
+    print('Cleanup Testbed Complete in {:.1f}s\n'.format(time.time() - start))
 
 
 def validate(context):
     print('Validating and Detecting Resources in Testbed')
-    r = (datacenter.validate(context) and
-         folder.validate(context) and
-         cluster.validate(context) and
-         host.validate(context) and
-         datastore.validate(context) and
-         network.validate(context) and
-         backend_directory.validate(context) and
-         iso_image.validate(context) and
-         floppy_image.validate(context)
-         )
+    start = time.time()
+    r = inventory.validate(context)
+    print('Inventory validated in {:.1f}s'.format(time.time() - start))
+    if r:
+        results = run_steps(context,
+                            [(name, func, [])
+                             for name, func in DATASTORE_FILE_CHECKS])
+        r = all(results.values())
     if r:
         print('==> Testbed validated')
         return True
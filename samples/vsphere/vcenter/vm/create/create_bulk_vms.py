@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+
+"""
+* *******************************************************
+* Copyright (c) VMware, Inc. 2024. All Rights Reserved.
+* SPDX-License-Identifier: MIT
+* *******************************************************
+*
+* DISCLAIMER. THIS PROGRAM IS PROVIDED TO YOU "AS IS" WITHOUT
+* WARRANTIES OR CONDITIONS OF ANY KIND, WHETHER ORAL OR WRITTEN,
+* EXPRESS OR IMPLIED. THE AUTHOR SPECIFICALLY DISCLAIMS ANY IMPLIED
+* WARRANTIES OR CONDITIONS OF MERCHANTABILITY, SATISFACTORY QUALITY,
+* NON-INFRINGEMENT AND FITNESS FOR A PARTICULAR PURPOSE.
+"""
+
+__author__ = 'VMware, Inc.'
+__vcenter_version__ = '6.5+'
+
+from com.vmware.vcenter.vm.hardware_client import (
+    Disk, Ethernet)
+from com.vmware.vcenter.vm.hardware_client import ScsiAddressSpec
+from com.vmware.vcenter.vm_client import (Power)
+from com.vmware.vcenter_client import VM, Network
+from vmware.vapi.vsphere.client import create_vsphere_client
+
+from samples.vsphere.common.ssl_helper import get_unverified_session
+from samples.vsphere.common import sample_cli
+from samples.vsphere.common import sample_util
+from samples.vsphere.vcenter.helper.vm_provisioning_helper import \
+    (InventoryCache, create_vms)
+from samples.vsphere.vcenter.setup import testbed
+
+
+class CreateBulkVMs(object):
+    """
+    Demonstrates how to create many VMs from one template spec with a bounded
+    number of concurrent VM.create calls.  Every VM gets the configuration of
+    the basic VM sample: 2 disks, 1 nic.
+
+    Sample Prerequisites:
+        - datacenter
+        - vm folder
+        - datastore
+        - standard switch network
+    """
+
+    def __init__(self, client=None, count=10, max_in_flight=8):
+        self.client = client
+        self.name_prefix = 'Sample_Bulk_VM_'
+        self.count = count
+        self.max_in_flight = max_in_flight
+        self.cleardata = None
+
+        # Execute the sample in standalone mode.
+        if not self.client:
+            parser = sample_cli.build_arg_parser()
+            parser.add_argument('-n', '--name_prefix',
+                                action='store',
+                                help='Prefix of the names of the vms')
+            parser.add_argument('--count',
+                                action='store',
+                                type=int,
+                                default=count,
+                                help='Number of vms to create')
+            parser.add_argument('--max_in_flight',
+                                action='store',
+                                type=int,
+                                default=max_in_flight,
+                                help='Maximum concurrent VM.create calls')
+            args = sample_util.process_cli_args(parser.parse_args())
+            if args.name_prefix:
+                self.name_prefix = args.name_prefix
+            self.count = args.count
+            self.max_in_flight = args.max_in_flight
+            self.cleardata = args.cleardata
+
+            session = get_unverified_session() if args.skipverification else None
+            self.client = create_vsphere_client(server=args.server,
+                                                username=args.username,
+                                                password=args.password,
+                                                session=session)
+        self.vm_names = ['{}{:04d}'.format(self.name_prefix, i)
+                         for i in range(self.count)]
+
+    def run(self):
+        datacenter_name = testbed.config['VM_DATACENTER_NAME']
+        vm_folder_name = testbed.config['VM_FOLDER2_NAME']
+        datastore_name = testbed.config['VM_DATASTORE_NAME']
+        std_portgroup_name = testbed.config['STDPORTGROUP_NAME']
+
+        # Placement and network are resolved once for all the VMs.
+        inventory = InventoryCache(self.client)
+        placement_spec = inventory.get_placement_spec(datacenter_name,
+                                                      vm_folder_name,
+                                                      datastore_name)
+        standard_network = inventory.get_network_backing(
+            std_portgroup_name,
+            datacenter_name,
+            Network.Type.STANDARD_PORTGROUP)
+
+        boot_disk = Disk.CreateSpec(type=Disk.HostBusAdapterType.SCSI,
+                                    scsi=ScsiAddressSpec(bus=0, unit=0),
+                                    new_vmdk=Disk.VmdkCreateSpec())
+        data_disk = Disk.CreateSpec(new_vmdk=Disk.VmdkCreateSpec())
+        nic = Ethernet.CreateSpec(
+            start_connected=True,
+            backing=Ethernet.BackingSpec(
+                type=Ethernet.BackingType.STANDARD_PORTGROUP,
+                network=standard_network))
+
+        template_spec = VM.CreateSpec(guest_os=testbed.config['VM_GUESTOS'],
+                                      placement=placement_spec,
+                                      disks=[boot_disk, data_disk],
+                                      nics=[nic])
+        overrides = [{'name': name} for name in self.vm_names]
+
+        print('\n# Example: create_bulk_vms: Creating {} VMs, at most {} '
+              'at a time'.format(len(overrides), self.max_in_flight))
+        results = create_vms(self.client, template_spec, overrides,
+                             max_in_flight=self.max_in_flight,
+                             inventory=inventory)
+
+        latencies = sorted(r.latency for r in results if not r.error)
+        failures = [r for r in results if r.error]
+        print('create_bulk_vms: {} created, {} failed'.
+              format(len(latencies), len(failures)))
+        if latencies:
+            print('create_bulk_vms: latency min {:.1f}s, median {:.1f}s, '
+                  'max {:.1f}s'.format(latencies[0],
+                                       latencies[len(latencies) // 2],
+                                       latencies[-1]))
+        for r in failures:
+            print("create_bulk_vms: '{}' failed: {}".format(r.name, r.error))
+        return [r.vm for r in results if r.vm]
+
+    def cleanup(self):
+        vms = self.client.vcenter.VM.list(
+            VM.FilterSpec(names=set(self.vm_names)))
+        for summary in vms:
+            vm = summary.vm
+            if summary.power_state == Power.State.POWERED_ON:
+                self.client.vcenter.vm.Power.stop(vm)
+            elif summary.power_state == Power.State.SUSPENDED:
+                self.client.vcenter.vm.Power.start(vm)
+                self.client.vcenter.vm.Power.stop(vm)
+            print("Deleting VM '{}' ({})".format(summary.name, vm))
+            self.client.vcenter.VM.delete(vm)
+
+
+def main():
+    create_bulk_vms = CreateBulkVMs()
+    create_bulk_vms.cleanup()
+    create_bulk_vms.run()
+    if create_bulk_vms.cleardata:
+        create_bulk_vms.cleanup()
+
+
+if __name__ == '__main__':
+    main()
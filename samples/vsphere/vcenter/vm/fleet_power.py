@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+
+"""
+* *******************************************************
+* Copyright (c) VMware, Inc. 2024. All Rights Reserved.
+* SPDX-License-Identifier: MIT
+* *******************************************************
+*
+* DISCLAIMER. THIS PROGRAM IS PROVIDED TO YOU "AS IS" WITHOUT
+* WARRANTIES OR CONDITIONS OF ANY KIND, WHETHER ORAL OR WRITTEN,
+* EXPRESS OR IMPLIED. THE AUTHOR SPECIFICALLY DISCLAIMS ANY IMPLIED
+* WARRANTIES OR CONDITIONS OF MERCHANTABILITY, SATISFACTORY QUALITY,
+* NON-INFRINGEMENT AND FITNESS FOR A PARTICULAR PURPOSE.
+"""
+
+__author__ = 'VMware, Inc.'
+__vcenter_version__ = '6.5+'
+
+import atexit
+
+from pyVim.connect import SmartConnect, Disconnect
+from vmware.vapi.vsphere.client import create_vsphere_client
+
+from samples.vsphere.common import sample_cli
+from samples.vsphere.common import sample_util
+from samples.vsphere.common.ssl_helper import get_unverified_context
+from samples.vsphere.common.ssl_helper import get_unverified_session
+from samples.vsphere.vcenter.helper.fleet_power_helper import \
+    (POWER_OPERATIONS, power_vms, select_vms)
+
+"""
+Demonstrates power operations on many VMs at once.
+
+VMs are selected by name, tag or folder.  Power tasks are submitted
+concurrently with a cap per host and per cluster, and all of them are
+waited on through a single property collector.
+
+Sample Prerequisites:
+    - vCenter
+"""
+
+
+def split(value):
+    return value.split(',') if value else None
+
+
+def main():
+    parser = sample_cli.build_arg_parser()
+    parser.add_argument('--operation',
+                        required=True,
+                        choices=sorted(POWER_OPERATIONS),
+                        help='Power operation to apply')
+    parser.add_argument('--vm_names',
+                        help='Comma separated names of vms')
+    parser.add_argument('--tag_names',
+                        help='Comma separated names of tags on the vms')
+    parser.add_argument('--folder_names',
+                        help='Comma separated names of vm folders')
+    parser.add_argument('--max_per_host',
+                        type=int,
+                        default=4,
+                        help='Maximum concurrent power tasks per host')
+    parser.add_argument('--max_per_cluster',
+                        type=int,
+                        default=32,
+                        help='Maximum concurrent power tasks per cluster')
+    args = sample_util.process_cli_args(parser.parse_args())
+
+    session = get_unverified_session() if args.skipverification else None
+    client = create_vsphere_client(server=args.server,
+                                   username=args.username,
+                                   password=args.password,
+                                   session=session)
+
+    context = None
+    if args.skipverification:
+        context = get_unverified_context()
+    service_instance = SmartConnect(host=args.server,
+                                    user=args.username,
+                                    pwd=args.password,
+                                    sslContext=context)
+    atexit.register(Disconnect, service_instance)
+
+    vms = select_vms(client,
+                     names=split(args.vm_names),
+                     tag_names=split(args.tag_names),
+                     folder_names=split(args.folder_names))
+    print('Selected {} VM(s)'.format(len(vms)))
+
+    results = power_vms(service_instance, vms, args.operation,
+                        max_per_host=args.max_per_host,
+                        max_per_cluster=args.max_per_cluster)
+
+    states = {}
+    for result in results.values():
+        states[result.state] = states.get(result.state, 0) + 1
+        if result.error:
+            print('{} ({}): {}'.format(result.name, result.vm, result.error))
+    print('Outcome: {}'.format(states))
+
+
+if __name__ == '__main__':
+    main()
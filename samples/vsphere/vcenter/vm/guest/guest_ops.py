@@ -17,7 +17,6 @@ __author__ = 'VMware Inc.'
 __vcenter_version__ = 'VCenter 7.0 U2'
 
 import os
-import ssl
 import time
 
 from com.vmware.vcenter.vm.guest.filesystem_client import Transfers
@@ -27,17 +26,11 @@ from com.vmware.vcenter_client import VM
 from samples.vsphere.common import sample_cli
 from samples.vsphere.common import sample_util
 from samples.vsphere.common.ssl_helper import get_unverified_session
+from samples.vsphere.vcenter.helper.guest_process_helper import tail_output
+from samples.vsphere.vcenter.helper.guest_transfer_helper import \
+    GuestFileTransfer
 from vmware.vapi.vsphere.client import create_vsphere_client
 
-try:
-    # Python 3
-    from urllib.parse import urlparse
-    import http.client as httpclient
-except ImportError:
-    # Python 2
-    from urlparse import urlparse
-    import httplib as httpclient
-
 
 class GuestOps(object):
     """
@@ -105,38 +98,10 @@ class GuestOps(object):
     def _download(self,
                   url,
                   expectedLen=None):
-        urloptions = urlparse(url)
-        # Skip server cert verification.
-        # This is not recommended in production code.
-        conn = httpclient.HTTPSConnection(urloptions.netloc,
-                                          context=ssl._create_unverified_context())
-
-        conn.request("GET", urloptions.path + "?" + urloptions.query)
-        res = conn.getresponse()
-        if res.status != 200:
-            print("GET request failed with errorcode : %s" % res.status)
-            raise HTTPError(res.status, res.reason)
-        body = res.read().decode()
-
-        return body
+        return self.transfer.download_bytes(url, expected_len=expectedLen)
 
     def _upload(self, url, body):
-        urloptions = urlparse(url)
-        conn = httpclient.HTTPSConnection(urloptions.netloc,
-                                          context=ssl._create_unverified_context())
-
-        headers = {"Content-Length": len(body)}
-        # Skip server cert verification.
-        # This is not recommended in production code.
-        conn.request("PUT", urloptions.path + "?" + urloptions.query,
-                     body,
-                     headers)
-        res = conn.getresponse()
-        if res.status != 200:
-            print("PUT request failed with errorcode : %s" % res.status)
-            raise HTTPError(res.status, res.reason)
-
-        return res
+        return self.transfer.upload(url, body)
 
     def __init__(self):
         # Create argument parser for standard inputs:
@@ -153,11 +118,16 @@ class GuestOps(object):
         parser.add_argument('--root_passwd',
                             action='store',
                             help='Administrator account password')
+        parser.add_argument('--tail',
+                            action='store_true',
+                            help='Print stdout and stderr while the '
+                                 'process runs')
 
         args = sample_util.process_cli_args(parser.parse_args())
         self.vm_name = args.vm_name
         self.root_user = args.root_user
         self.root_passwd = args.root_passwd
+        self.tail = args.tail
 
         self.cleardata = args.cleardata
 
@@ -171,6 +141,9 @@ class GuestOps(object):
                                             password=args.password,
                                             session=session)
 
+        # Reuses one connection per ESXi host for all guest file transfers.
+        self.transfer = GuestFileTransfer()
+
     def run(self):
         # Using vAPI to find VM.
         filter_spec = VM.FilterSpec(names=set([self.vm_name]))
@@ -255,35 +228,49 @@ class GuestOps(object):
         # Step 6
         # Need a loop to wait for the process to finish to handle longer
         # running processes.
-        while True:
-            time.sleep(1.0)
-            try:
-                # List the single process for pid.
-                result = self.client.vcenter.vm.guest.Processes.get(vm_id,
-                                                                    creds,
-                                                                    pid)
-                if result.exit_code is not None:
-                    print('Command: ' + result.command)
-                    print('Exit code: %s\n' % result.exit_code)
-                    break
-                if result.finished is None:
-                    print('Process with pid %s is still running.' % pid)
-                    continue
-            except Exception as e:
-                raise e
-
-        # Step 7 Copy out the results (stdout).
-        spec = self._create_transfer_spec(path=stdout)
-        # create the download URL
-        fromURL = self.client.vcenter.vm.guest.filesystem.Transfers.create(vm_id,
-                                                                           creds,
-                                                                           spec)
-        body = self._download(fromURL, expectedLen=info.size)
-        print("-----------  stdout  ------------------")
-        print(body)
-        print("---------------------------------------")
-
-        # Optionally the contents of "stderr" could be downloaded.
+        if self.tail:
+            # Print the output as it arrives instead of after the process
+            # exits, including stderr.
+            output = tail_output(self.client, vm_id, creds, pid,
+                                 [stdout, stderr], self.transfer)
+            for path, chunk in output:
+                name = 'stdout' if path == stdout else 'stderr'
+                print("[{}] {}".format(name, chunk.decode(errors='replace')),
+                      end='')
+            result = self.client.vcenter.vm.guest.Processes.get(vm_id,
+                                                                creds,
+                                                                pid)
+            print('\nCommand: ' + result.command)
+            print('Exit code: %s\n' % result.exit_code)
+        else:
+            while True:
+                time.sleep(1.0)
+                try:
+                    # List the single process for pid.
+                    result = self.client.vcenter.vm.guest.Processes.get(vm_id,
+                                                                        creds,
+                                                                        pid)
+                    if result.exit_code is not None:
+                        print('Command: ' + result.command)
+                        print('Exit code: %s\n' % result.exit_code)
+                        break
+                    if result.finished is None:
+                        print('Process with pid %s is still running.' % pid)
+                        continue
+                except Exception as e:
+                    raise e
+
+            # Step 7 Copy out the results (stdout).
+            spec = self._create_transfer_spec(path=stdout)
+            # create the download URL
+            fromURL = self.client.vcenter.vm.guest.filesystem.Transfers.create(
+                vm_id, creds, spec)
+            body = self._download(fromURL)
+            print("-----------  stdout  ------------------")
+            print(body.decode(errors='replace'))
+            print("---------------------------------------")
+
+            # Optionally the contents of "stderr" could be downloaded.
 
         # And finally, clean up the temporary files and directories on the
         # Linux guest.  Deleting the temporary diretory and its contents.
@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+
+"""
+* *******************************************************
+* Copyright (c) VMware, Inc. 2024. All Rights Reserved.
+* SPDX-License-Identifier: MIT
+* *******************************************************
+*
+* DISCLAIMER. THIS PROGRAM IS PROVIDED TO YOU "AS IS" WITHOUT
+* WARRANTIES OR CONDITIONS OF ANY KIND, WHETHER ORAL OR WRITTEN,
+* EXPRESS OR IMPLIED. THE AUTHOR SPECIFICALLY DISCLAIMS ANY IMPLIED
+* WARRANTIES OR CONDITIONS OF MERCHANTABILITY, SATISFACTORY QUALITY,
+* NON-INFRINGEMENT AND FITNESS FOR A PARTICULAR PURPOSE.
+"""
+
+__author__ = 'VMware, Inc.'
+__vcenter_version__ = 'VCenter 7.0 U2'
+
+from com.vmware.vcenter.vm.guest_client import Credentials
+from com.vmware.vcenter_client import VM
+from samples.vsphere.common import sample_cli
+from samples.vsphere.common import sample_util
+from samples.vsphere.common.ssl_helper import get_unverified_session
+from samples.vsphere.vcenter.helper.guest_process_helper import \
+    run_script_on_vms
+from vmware.vapi.vsphere.client import create_vsphere_client
+
+
+class GuestOpsFleet(object):
+    """
+    Demonstrate running one script on many Linux guests at once.
+
+    The steps of the GuestOps sample (temporary files, script upload,
+    process start, wait, output download) are pipelined across the VMs with
+    a bounded worker pool, and the processes of all VMs are polled in one
+    loop.  Exit codes and outputs are printed as a table.
+
+    Prerequisites:
+        - vCenter
+        - powered on Linux guests with open-vm-tools running, all accepting
+          the same guest credentials
+    """
+
+    def __init__(self):
+        parser = sample_cli.build_arg_parser()
+        parser.add_argument('--vm_names',
+                            action='store',
+                            required=True,
+                            help='Comma separated names of the vms')
+        parser.add_argument('--root_user',
+                            action='store',
+                            help='Administrator account user name')
+        parser.add_argument('--root_passwd',
+                            action='store',
+                            help='Administrator account password')
+        parser.add_argument('--script_file',
+                            action='store',
+                            help='Local script to run in every guest')
+        parser.add_argument('--max_workers',
+                            action='store',
+                            type=int,
+                            default=16,
+                            help='Guests prepared or collected concurrently')
+
+        args = sample_util.process_cli_args(parser.parse_args())
+        self.vm_names = set(args.vm_names.split(','))
+        self.root_user = args.root_user
+        self.root_passwd = args.root_passwd
+        self.script_file = args.script_file
+        self.max_workers = args.max_workers
+
+        # Skip server cert verification if needed.
+        # This is not recommended in production code.
+        session = get_unverified_session() if args.skipverification else None
+
+        # Connect to vSphere client
+        self.client = create_vsphere_client(server=args.server,
+                                            username=args.username,
+                                            password=args.password,
+                                            session=session)
+
+    def run(self):
+        vms = self.client.vcenter.VM.list(VM.FilterSpec(
+            names=self.vm_names,
+            power_states=set([VM.PowerState.POWERED_ON])))
+        if len(vms) != len(self.vm_names):
+            found = set(vm.name for vm in vms)
+            print('Skipping missing or powered off vms: {}'.format(
+                ', '.join(sorted(self.vm_names - found))))
+        names = dict((vm.vm, vm.name) for vm in vms)
+
+        if self.script_file:
+            with open(self.script_file, 'rb') as f:
+                script = f.read()
+        else:
+            script = ('#! /bin/bash\n'
+                      'uname -a\n'
+                      'uptime\n')
+
+        creds = Credentials(interactive_session=False,
+                            user_name=self.root_user,
+                            password=self.root_passwd,
+                            type=Credentials.Type.USERNAME_PASSWORD)
+
+        results = run_script_on_vms(self.client, list(names), creds, script,
+                                    max_workers=self.max_workers)
+
+        print('{:<30} {:>9} {:>9}  {}'.format('VM', 'Exit code', 'Seconds',
+                                              'Error'))
+        for vm, result in sorted(results.items(), key=lambda r: names[r[0]]):
+            print('{:<30} {:>9} {:>9.1f}  {}'.format(
+                names[vm], str(result.exit_code), result.elapsed or 0,
+                result.error or ''))
+        for vm, result in sorted(results.items(), key=lambda r: names[r[0]]):
+            if result.stdout:
+                print('-----------  {} stdout  -----------'.format(names[vm]))
+                print(result.stdout.decode(errors='replace'))
+
+
+def main():
+    sample = GuestOpsFleet()
+    sample.run()
+
+
+if __name__ == '__main__':
+    main()
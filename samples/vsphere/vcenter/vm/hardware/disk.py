@@ -25,7 +25,9 @@ from com.vmware.vcenter.vm.hardware_client import (IdeAddressSpec,
                                                    SataAddressSpec,
                                                    ScsiAddressSpec)
 from pyVim.connect import SmartConnect, Disconnect
-from samples.vsphere.common.vim.vmdk import (create_vmdk, delete_vmdk, detect_vmdk)
+from pyVmomi import vim
+from samples.vsphere.common.vim.vmdk import (create_vmdk, delete_vmdk,
+                                             delete_vmdks, detect_vmdk)
 
 from samples.vsphere.common.sample_util import parse_cli_args_vm
 from samples.vsphere.common.sample_util import pp
@@ -344,9 +346,7 @@ def run():
 
 def cleanup():
     # Clean up the saved disk from the update sample
-    vmdk_file = saved_disk_info.backing.vmdk_file
-    print("\n# Cleanup: Delete VMDK '{}'".format(vmdk_file))
-    delete_vmdk(service_instance, datacenter_mo, vmdk_file)
+    vmdk_files = [saved_disk_info.backing.vmdk_file]
 
     # List all Disks for a VM
     disk_summaries = client.vcenter.vm.hardware.Disk.list(vm=vm)
@@ -361,9 +361,15 @@ def cleanup():
 
         client.vcenter.vm.hardware.Disk.delete(vm, disk)
         print('vm.hardware.Disk.delete({}, {})'.format(vm, disk))
+        vmdk_files.append(vmdk_file)
 
-        print("\n# Cleanup: Delete VMDK '{}'".format(vmdk_file))
-        delete_vmdk(service_instance, datacenter_mo, vmdk_file)
+    # The detached VMDKs are independent, so delete them together
+    print("\n# Cleanup: Delete VMDKs {}".format(vmdk_files))
+    infos = delete_vmdks(service_instance,
+                         [(datacenter_mo, vmdk_file)
+                          for vmdk_file in vmdk_files])
+    failed = [vmdk_file for vmdk_file, info in zip(vmdk_files, infos)
+              if info.state != vim.TaskInfo.State.success]
 
     print('\n# Cleanup: Remove SATA controller')
     print('vm.hardware.adapter.Sata.delete({}, {})'.format(vm, sata))
@@ -374,6 +380,8 @@ def cleanup():
     if set(orig_disk_summaries) != set(disk_summaries):
         print(
             'vm.hardware.Disk WARNING: Final Disk info does not match original')
+    if failed:
+        raise Exception('Failed to delete VMDKs {}'.format(failed))
 
 
 def delete_vmdk_if_exist(client, soap_stub, datacenter_name,
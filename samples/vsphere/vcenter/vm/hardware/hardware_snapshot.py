@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+
+"""
+* *******************************************************
+* Copyright (c) VMware, Inc. 2024. All Rights Reserved.
+* SPDX-License-Identifier: MIT
+* *******************************************************
+*
+* DISCLAIMER. THIS PROGRAM IS PROVIDED TO YOU "AS IS" WITHOUT
+* WARRANTIES OR CONDITIONS OF ANY KIND, WHETHER ORAL OR WRITTEN,
+* EXPRESS OR IMPLIED. THE AUTHOR SPECIFICALLY DISCLAIMS ANY IMPLIED
+* WARRANTIES OR CONDITIONS OF MERCHANTABILITY, SATISFACTORY QUALITY,
+* NON-INFRINGEMENT AND FITNESS FOR A PARTICULAR PURPOSE.
+"""
+
+__author__ = 'VMware, Inc.'
+__vcenter_version__ = '6.5+'
+
+import atexit
+import os
+
+from com.vmware.vcenter_client import VM
+from pyVim.connect import SmartConnect, Disconnect
+from vmware.vapi.vsphere.client import create_vsphere_client
+
+from samples.vsphere.common import sample_cli
+from samples.vsphere.common import sample_util
+from samples.vsphere.common.ssl_helper import get_unverified_context
+from samples.vsphere.common.ssl_helper import get_unverified_session
+from samples.vsphere.vcenter.helper.hardware_snapshot_helper import \
+    (HardwareSnapshot, collect_hardware_snapshot)
+
+"""
+Demonstrates how to audit the virtual hardware of many VMs.
+
+The disks, nics, cdroms, serial/parallel ports, floppies and SATA/SCSI
+adapters of every VM are listed and fetched concurrently under a global rate
+limit and saved as one record per VM.  When a previous snapshot file exists,
+only VMs whose config.changeVersion changed are fetched again, and the
+differences are printed.
+
+Sample Prerequisites:
+    - vCenter
+"""
+
+
+class HardwareSnapshotSample(object):
+
+    def __init__(self):
+        parser = sample_cli.build_arg_parser()
+        parser.add_argument('--vm_names',
+                            action='store',
+                            help='Comma separated names of the vms; '
+                                 'all vms when omitted')
+        parser.add_argument('--snapshot_file',
+                            action='store',
+                            default='hardware_snapshot.json',
+                            help='Snapshot to compare with and replace')
+        parser.add_argument('--max_workers',
+                            action='store',
+                            type=int,
+                            default=16,
+                            help='VMs collected concurrently')
+        parser.add_argument('--calls_per_second',
+                            action='store',
+                            type=int,
+                            default=50,
+                            help='Maximum list/get calls per second')
+        args = sample_util.process_cli_args(parser.parse_args())
+        self.vm_names = set(args.vm_names.split(',')) if args.vm_names \
+            else None
+        self.snapshot_file = args.snapshot_file
+        self.max_workers = args.max_workers
+        self.calls_per_second = args.calls_per_second
+
+        session = get_unverified_session() if args.skipverification else None
+        self.client = create_vsphere_client(server=args.server,
+                                            username=args.username,
+                                            password=args.password,
+                                            session=session)
+
+        # The change versions are only available through the VIM API.
+        context = None
+        if args.skipverification:
+            context = get_unverified_context()
+        self.service_instance = SmartConnect(host=args.server,
+                                             user=args.username,
+                                             pwd=args.password,
+                                             sslContext=context)
+        atexit.register(Disconnect, self.service_instance)
+
+    def run(self):
+        vms = [vm.vm for vm in self.client.vcenter.VM.list(
+            VM.FilterSpec(names=self.vm_names))]
+
+        previous = None
+        if os.path.exists(self.snapshot_file):
+            previous = HardwareSnapshot.load(self.snapshot_file)
+
+        snapshot = collect_hardware_snapshot(
+            self.client, vms,
+            service_instance=self.service_instance,
+            previous=previous,
+            max_workers=self.max_workers,
+            calls_per_second=self.calls_per_second)
+
+        for vm, error in snapshot.errors.items():
+            print('Failed to collect {}: {}'.format(vm, error))
+        if previous:
+            added, removed, changed = snapshot.diff(previous)
+            print('Added: {}'.format(sorted(added)))
+            print('Removed: {}'.format(sorted(removed)))
+            print('Changed: {}'.format(sorted(changed)))
+
+        snapshot.save(self.snapshot_file)
+        print("Saved {} VM record(s) to '{}'".format(len(snapshot.records),
+                                                     self.snapshot_file))
+
+
+def main():
+    sample = HardwareSnapshotSample()
+    sample.run()
+
+
+if __name__ == '__main__':
+    main()
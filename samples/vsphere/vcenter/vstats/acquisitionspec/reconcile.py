@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+"""
+* *******************************************************
+* Copyright (c) VMware, Inc. 2024. All Rights Reserved.
+* SPDX-License-Identifier: MIT
+* *******************************************************
+*
+* DISCLAIMER. THIS PROGRAM IS PROVIDED TO YOU "AS IS" WITHOUT
+* WARRANTIES OR CONDITIONS OF ANY KIND, WHETHER ORAL OR WRITTEN,
+* EXPRESS OR IMPLIED. THE AUTHOR SPECIFICALLY DISCLAIMS ANY IMPLIED
+* WARRANTIES OR CONDITIONS OF MERCHANTABILITY, SATISFACTORY QUALITY,
+* NON-INFRINGEMENT AND FITNESS FOR A PARTICULAR PURPOSE.
+"""
+
+__author__ = 'VMware, Inc.'
+__vcenter_version__ = '7.0+'
+
+from concurrent.futures import ThreadPoolExecutor
+
+from com.vmware.vcenter_client import VM
+from com.vmware.vstats_client import AcqSpecs, RsrcId
+from vmware.vapi.vsphere.client import create_vsphere_client
+
+from samples.vsphere.common import sample_cli, sample_util
+from samples.vsphere.common.ssl_helper import get_unverified_session
+from samples.vsphere.vcenter.hcl.utils import get_configuration
+from samples.vsphere.vcenter.vstats.helpers.acq_specs import \
+    AcqSpecReconciler, desired_specs
+from samples.vsphere.vcenter.vstats.helpers.discovery_cache import \
+    get_discovery, get_vcenter_identity
+
+
+class SampleReconcileAcquisitionSpecs(object):
+    """
+    Demonstrates keeping Acquisition Specifications for a set of counters on
+    every VM (or host) of vCenter in place.
+    The specifications that are missing are created, the ones for removed
+    resources are reused or deleted, and the ones close to their expiration
+    are renewed, all concurrently.  Run it periodically, more often than
+    --renew_ahead, to keep the specifications from expiring.
+    Sample Prerequisites:
+    vCenter 7.0x with 7.0x ESXi hosts.
+    """
+
+    def __init__(self):
+        parser = sample_cli.build_arg_parser()
+        parser.add_argument('--cids',
+                            default='disk.throughput.usage.VM',
+                            help='Comma separated counter ids to collect')
+        parser.add_argument('--resource_type',
+                            default='VM',
+                            choices=['VM', 'HOST'],
+                            help='Type of the resources to collect from')
+        parser.add_argument('--interval', type=int, default=10,
+                            help='Sampling interval in seconds')
+        parser.add_argument('--lifetime', type=int, default=3600,
+                            help='Seconds a created or renewed '
+                                 'specification stays valid')
+        parser.add_argument('--renew_ahead', type=int, default=600,
+                            help='Renew specifications expiring within '
+                                 'this many seconds')
+        parser.add_argument('--counter_sets', action='store_true',
+                            help='Use the counter sets of the discovery '
+                                 'cache to reduce the number of '
+                                 'specifications')
+        parser.add_argument('--delete', action='store_true',
+                            help='Delete all specifications managed by '
+                                 'this sample')
+        parser.add_argument('--dry_run', action='store_true',
+                            help='Only print the planned operations')
+        args = sample_util.process_cli_args(parser.parse_args())
+        self.args = args
+
+        self.stub_config = get_configuration(
+                args.server, args.username, args.password,
+                args.skipverification)
+        self.reconciler = AcqSpecReconciler(
+                AcqSpecs(self.stub_config), interval=args.interval,
+                lifetime=args.lifetime, renew_ahead=args.renew_ahead)
+
+        session = get_unverified_session() if args.skipverification else None
+        self.vsphere_client = create_vsphere_client(
+                server=args.server, username=args.username,
+                password=args.password, session=session)
+
+    def list_resource_ids(self):
+        hosts = [host.host for host in self.vsphere_client.vcenter.Host.list()]
+        if self.args.resource_type == 'HOST':
+            return hosts
+        # VM.list returns at most 4000 VMs, list them per host instead.
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            pages = executor.map(
+                lambda host: self.vsphere_client.vcenter.VM.list(
+                    VM.FilterSpec(hosts=set([host]))), hosts)
+            return [vm.vm for page in pages for vm in page]
+
+    def get_counter_sets(self):
+        instance_uuid, build = get_vcenter_identity(
+                self.args.server, self.args.skipverification)
+        discovery = get_discovery(self.stub_config, instance_uuid, build)
+        return dict((counter_set['id'],
+                     [counter['cid'] for counter in counter_set['counters']])
+                    for counter_set in discovery.records['counter_sets'])
+
+    def run(self):
+        if self.args.delete:
+            desired = []
+        else:
+            resources = [[RsrcId(id_value=resource_id,
+                                 type=self.args.resource_type)]
+                         for resource_id in self.list_resource_ids()]
+            counter_sets = (self.get_counter_sets()
+                            if self.args.counter_sets else None)
+            desired = desired_specs(self.args.cids.split(','), resources,
+                                    counter_sets)
+        SampleReconcileAcquisitionSpecs.print_output(
+                "Desired Acquisition Specifications: " + str(len(desired)))
+
+        plan = self.reconciler.plan(desired)
+        SampleReconcileAcquisitionSpecs.print_output(
+                "Planned operations", *['{}: {}'.format(action, len(items))
+                                        for action, items in plan.items()])
+        if self.args.dry_run:
+            return
+
+        result = self.reconciler.apply(plan)
+        SampleReconcileAcquisitionSpecs.print_output(
+                "Acquisition Specifications " + str(result),
+                *['{} {} failed: {}'.format(action, target, error)
+                  for action, target, error in result.failed])
+
+    @staticmethod
+    def print_output(*argv):
+        print("------------------------------------")
+        for arg in argv:
+            print(arg)
+
+
+def main():
+    """
+     Entry point for the sample client.
+    """
+    reconcile_obj = SampleReconcileAcquisitionSpecs()
+    reconcile_obj.run()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+"""
+* *******************************************************
+* Copyright (c) VMware, Inc. 2024. All Rights Reserved.
+* SPDX-License-Identifier: MIT
+* *******************************************************
+*
+* DISCLAIMER. THIS PROGRAM IS PROVIDED TO YOU "AS IS" WITHOUT
+* WARRANTIES OR CONDITIONS OF ANY KIND, WHETHER ORAL OR WRITTEN,
+* EXPRESS OR IMPLIED. THE AUTHOR SPECIFICALLY DISCLAIMS ANY IMPLIED
+* WARRANTIES OR CONDITIONS OF MERCHANTABILITY, SATISFACTORY QUALITY,
+* NON-INFRINGEMENT AND FITNESS FOR A PARTICULAR PURPOSE.
+"""
+
+__author__ = 'VMware, Inc.'
+__vcenter_version__ = '7.0+'
+
+import argparse
+import math
+import random
+import time
+
+from com.vmware.vstats_client import Data
+
+from samples.vsphere.vcenter.vstats.helpers.columnar import DataPointColumns
+
+"""
+Benchmark of per counter, per resource, per time bucket aggregation of
+vStats data points.
+
+Pages of synthetic Data.DataPoint objects are converted to columns with
+DataPointColumns.from_pages and aggregated with DataPointColumns.aggregate,
+and the same aggregation is done with plain Python loops over a smaller
+number of points for comparison.  No server is contacted.
+
+Requires numpy.
+"""
+
+
+def generate_pages(points, counters, resources, page_size, interval=20):
+    rng = random.Random(0)
+    cids = ['counter{}'.format(i) for i in range(counters)]
+    rids = ['type.VM=vm-{}'.format(i) for i in range(resources)]
+    produced = 0
+    while produced < points:
+        size = min(page_size, points - produced)
+        page = []
+        for i in range(produced, produced + size):
+            page.append(Data.DataPoint(cid=cids[i % counters], mid='mid',
+                                       rid=rids[(i // counters) % resources],
+                                       ts=(i // (counters * resources)) *
+                                       interval,
+                                       val=rng.random() * 100))
+        produced += size
+        yield page
+
+
+def aggregate_python(pages, bucket_seconds, percentile=95):
+    groups = {}
+    for page in pages:
+        for dp in page:
+            key = (dp.cid, dp.rid, dp.ts // bucket_seconds * bucket_seconds)
+            groups.setdefault(key, []).append((dp.ts, dp.val))
+    result = {}
+    for key, points in groups.items():
+        points.sort()
+        values = sorted(val for _, val in points)
+        position = (len(values) - 1) * (percentile / 100.0)
+        lower = int(math.floor(position))
+        upper = min(lower + 1, len(values) - 1)
+        elapsed = points[-1][0] - points[0][0]
+        result[key] = {
+            'count': len(values),
+            'mean': sum(values) / len(values),
+            'max': values[-1],
+            'p95': (values[lower] * (1 - (position - lower)) +
+                    values[upper] * (position - lower)),
+            'rate': ((points[-1][1] - points[0][1]) / elapsed
+                     if elapsed else float('nan')),
+        }
+    return result
+
+
+def report(name, points, elapsed):
+    print('{:<32} {:>10} points {:>8.2f} s {:>12.0f} points/s'.format(
+        name, points, elapsed, points / elapsed))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--points', type=int, default=10000000,
+                        help='Data points converted and aggregated with numpy')
+    parser.add_argument('--baseline_points', type=int, default=1000000,
+                        help='Data points aggregated with Python loops')
+    parser.add_argument('--counters', type=int, default=20)
+    parser.add_argument('--resources', type=int, default=5000)
+    parser.add_argument('--page_size', type=int, default=100000)
+    parser.add_argument('--bucket', type=int, default=300,
+                        help='Time bucket in seconds')
+    args = parser.parse_args()
+
+    start = time.time()
+    columns = DataPointColumns.from_pages(generate_pages(
+        args.points, args.counters, args.resources, args.page_size))
+    report('generate + from_pages', args.points, time.time() - start)
+
+    start = time.time()
+    aggregates = columns.aggregate(args.bucket)
+    report('aggregate (numpy)', args.points, time.time() - start)
+    print('{} groups'.format(len(aggregates['start'])))
+
+    pages = list(generate_pages(args.baseline_points, args.counters,
+                                args.resources, args.page_size))
+    start = time.time()
+    aggregate_python(pages, args.bucket)
+    report('aggregate (Python loops)', args.baseline_points,
+           time.time() - start)
+
+    # The same points with numpy, for a comparison at equal size.
+    columns = DataPointColumns.from_pages(pages)
+    start = time.time()
+    columns.aggregate(args.bucket)
+    report('aggregate (numpy)', args.baseline_points, time.time() - start)
+
+
+if __name__ == '__main__':
+    main()
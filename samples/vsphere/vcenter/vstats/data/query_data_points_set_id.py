@@ -24,6 +24,8 @@ from vmware.vapi.vsphere.client import create_vsphere_client
 from samples.vsphere.common import sample_util
 from samples.vsphere.common.ssl_helper import get_unverified_session
 from samples.vsphere.vcenter.hcl.utils import get_configuration
+from samples.vsphere.vcenter.vstats.helpers.data_points import \
+    iter_data_point_pages
 from samples.vsphere.vcenter.vstats.helpers.sample_cli import parser
 
 
@@ -99,9 +101,14 @@ class SampleQueryDataPointsSetID(object):
         # Query for data points filtered by resource.
         resource = "type." + vm_type + "=" + vm_id
         filter_spec = self.data_client.FilterSpec(resources=[resource])
-        data_points = self.data_client.query_data_points(filter=filter_spec)
+        # Follow the next tokens so large result sets are not truncated.
+        total = 0
+        for page in iter_data_point_pages(self.data_client, filter_spec):
+            total += len(page)
+            SampleQueryDataPointsSetID.print_output(
+                    "Data Points collected", page)
         SampleQueryDataPointsSetID.print_output(
-                "Data Points collected", data_points)
+                "Total data points: " + str(total))
 
         # CleanUp.
         # Delete the Acquisition Specification.
@@ -22,6 +22,8 @@ from com.vmware.vstats_client import Providers, AcqSpecs, CidMid, RsrcId, Data
 
 from samples.vsphere.common import sample_util
 from samples.vsphere.vcenter.hcl.utils import get_configuration
+from samples.vsphere.vcenter.vstats.helpers.data_points import \
+    iter_data_point_pages
 from samples.vsphere.vcenter.vstats.helpers.sample_cli import parser
 
 
@@ -91,9 +93,14 @@ class SampleQueryDataPointsPredicate(object):
 
         # Query for data points filtered by cid.
         filter_spec = self.data_client.FilterSpec(cid=cid)
-        data_points = self.data_client.query_data_points(filter=filter_spec)
+        # Follow the next tokens so large result sets are not truncated.
+        total = 0
+        for page in iter_data_point_pages(self.data_client, filter_spec):
+            total += len(page)
+            SampleQueryDataPointsPredicate.print_output(
+                    "Data points collected", page)
         SampleQueryDataPointsPredicate.print_output(
-                "Data points collected", data_points)
+                "Total data points: " + str(total))
 
         # CleanUp.
         # Delete the Acquisition Specification.
@@ -17,36 +17,36 @@ __vcenter_version__ = '7.0+'
 
 import random
 
-from com.vmware.vstats_client import Counters, Providers, ResourceTypes, \
-        CounterMetadata, Metrics, CounterSets, ResourceAddressSchemas
-
 from samples.vsphere.common import sample_cli, sample_util
 from samples.vsphere.vcenter.hcl.utils import get_configuration
+from samples.vsphere.vcenter.vstats.helpers.discovery_cache import \
+    get_discovery, get_vcenter_identity
 
 
 class SampleDiscovery(object):
     """
     Description: Demonstrates all vSphere Stats discovery APIs which
     give current state of the system.
+    The results are cached on disk per vCenter instance and build, use
+    --refresh to fetch them again.
     Sample Prerequisites:
     vCenter 7.0x with 7.0x ESXi hosts.
     """
 
     def __init__(self):
         parser = sample_cli.build_arg_parser()
+        parser.add_argument('--refresh',
+                            action='store_true',
+                            help='Fetch the discovery data again instead of '
+                                 'using the cached copy')
         args = sample_util.process_cli_args(parser.parse_args())
 
-        stub_config = get_configuration(
+        self.stub_config = get_configuration(
                 args.server, args.username, args.password,
                 args.skipverification)
-        self.counters_client = Counters(stub_config)
-        self.providers_client = Providers(stub_config)
-        self.resource_types_client = ResourceTypes(stub_config)
-        self.counter_metadata_client = CounterMetadata(stub_config)
-        self.metrics_client = Metrics(stub_config)
-        self.counter_sets_client = CounterSets(stub_config)
-        self.resource_address_schemas_client = ResourceAddressSchemas(
-                stub_config)
+        self.instance_uuid, self.build = get_vcenter_identity(
+                args.server, args.skipverification)
+        self.refresh = args.refresh
 
     def run(self):
         """
@@ -55,42 +55,42 @@ class SampleDiscovery(object):
                metrics, counter sets.
         Get - resource address schema.
         """
+        discovery = get_discovery(self.stub_config, self.instance_uuid,
+                                  self.build, refresh=self.refresh)
+
         # Counters List.
-        counters = self.counters_client.list()
+        counters = discovery.records['counters']
         SampleDiscovery.print_output("Counters List", counters)
 
-        # Choose a random counter and provide cid as input to
-        # list CounterMetaData.
-        random_cid = random.choice(counters).cid
-        # List of counter metadata associated with that counter.
-        counter_metadata = self.counter_metadata_client.list(random_cid)
+        # Choose a random counter and look up the counter metadata
+        # associated with its cid.
+        random_cid = random.choice(counters)['cid']
+        counter_metadata = discovery.counter_metadata(random_cid)
         SampleDiscovery.print_output("Counter Metadata List", counter_metadata)
 
-        # Choose a random counter and provide resource_address_schema_id as
-        # input to get Resource Address Schema.
-        random_resource_address_schema_id = random.choice(counters).\
-            resource_address_schema
-        # Get resource address schema associated with that counter.
-        resource_address_schema = self.resource_address_schemas_client.get(
+        # Choose a random counter and look up its Resource Address Schema.
+        random_resource_address_schema_id = random.choice(counters)[
+            'resource_address_schema']
+        resource_address_schema = discovery.resource_address_schema(
                 random_resource_address_schema_id)
         SampleDiscovery.print_output("Resource Address Schema",
                                      resource_address_schema)
 
         # List of vSphere Stats providers connected to vCenter Server.
-        providers = self.providers_client.list()
-        SampleDiscovery.print_output("Providers List", providers)
+        SampleDiscovery.print_output("Providers List",
+                                     discovery.records['providers'])
 
         # List of resource types supported by vSphere Stats.
-        resource_types = self.resource_types_client.list()
-        SampleDiscovery.print_output("Resource Types List", resource_types)
+        SampleDiscovery.print_output("Resource Types List",
+                                     discovery.records['resource_types'])
 
         # List of metrics supported by vSphere Stats.
-        metrics = self.metrics_client.list()
-        SampleDiscovery.print_output("Metrics List", metrics)
+        SampleDiscovery.print_output("Metrics List",
+                                     discovery.records['metrics'])
 
         # List of vSphere Stats defined Counter-sets.
-        counter_sets = self.counter_sets_client.list()
-        SampleDiscovery.print_output("Counter Sets List", counter_sets)
+        SampleDiscovery.print_output("Counter Sets List",
+                                     discovery.records['counter_sets'])
 
     @staticmethod
     def print_output(*argv):
@@ -0,0 +1,221 @@
+"""
+ * *******************************************************
+ * Copyright (c) VMware, Inc. 2024. All Rights Reserved.
+ * SPDX-License-Identifier: MIT
+ * *******************************************************
+ *
+ * DISCLAIMER. THIS PROGRAM IS PROVIDED TO YOU "AS IS" WITHOUT
+ * WARRANTIES OR CONDITIONS OF ANY KIND, WHETHER ORAL OR WRITTEN,
+ * EXPRESS OR IMPLIED. THE AUTHOR SPECIFICALLY DISCLAIMS ANY IMPLIED
+ * WARRANTIES OR CONDITIONS OF MERCHANTABILITY, SATISFACTORY QUALITY,
+ * NON-INFRINGEMENT AND FITNESS FOR A PARTICULAR PURPOSE.
+ """
+
+__author__ = 'VMware, Inc.'
+__vcenter_version__ = '7.0+'
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from com.vmware.vstats_client import AcqSpecs, CidMid
+
+# Memo of the acquisition specifications owned by AcqSpecReconciler.  Specs
+# with any other memo are never changed.
+RECONCILER_MEMO = 'managed by vstats acq_specs reconciler'
+
+
+def counter_key(counter_spec):
+    if counter_spec.set_id is not None:
+        return ('set', counter_spec.set_id)
+    return ('cid', counter_spec.cid_mid.cid, counter_spec.cid_mid.mid)
+
+
+def resources_key(resources):
+    return tuple(sorted(
+        (rsrc.key, rsrc.type, rsrc.id_value,
+         str(rsrc.predicate) if rsrc.predicate is not None else None,
+         rsrc.scheme) for rsrc in resources))
+
+
+def spec_key(counters, resources):
+    """Identity of an acquisition spec: its counters and resource address"""
+    return counter_key(counters), resources_key(resources)
+
+
+def pack_counters(cids, counter_sets=None):
+    """
+    Returns the fewest AcqSpecs.CounterSpec that sample the counters cids.
+
+    counter_sets maps counter set ids to the cids of the set.  Sets made only
+    of wanted counters are used largest first, while they add counters not
+    covered yet; the remaining counters get one CounterSpec each.
+    """
+    wanted = set(cids)
+    specs = []
+    covered = set()
+    for set_id, set_cids in sorted((counter_sets or {}).items(),
+                                   key=lambda item: -len(set(item[1]))):
+        set_cids = set(set_cids)
+        if set_cids and set_cids <= wanted and not set_cids <= covered:
+            specs.append(AcqSpecs.CounterSpec(set_id=set_id))
+            covered |= set_cids
+    for cid in sorted(wanted - covered):
+        specs.append(AcqSpecs.CounterSpec(cid_mid=CidMid(cid=cid)))
+    return specs
+
+
+def desired_specs(cids, resources, counter_sets=None):
+    """
+    Returns (counters, resources) pairs sampling the counters cids of every
+    resource.  Each element of resources is the list of RsrcId addressing
+    one resource, the API does not allow more than one resource per spec.
+    """
+    counter_specs = pack_counters(cids, counter_sets)
+    return [(counters, list(rsrc)) for rsrc in resources
+            for counters in counter_specs]
+
+
+class ReconcileResult(object):
+    """
+    Outcome of AcqSpecReconciler.apply.  created, updated, renewed and
+    deleted hold acquisition spec ids; failed holds (action, spec id or key,
+    exception) tuples.
+    """
+
+    def __init__(self):
+        self.created = []
+        self.updated = []
+        self.renewed = []
+        self.deleted = []
+        self.failed = []
+
+    def __str__(self):
+        return ('created {}, updated {}, renewed {}, deleted {}, '
+                'failed {}'.format(len(self.created), len(self.updated),
+                                   len(self.renewed), len(self.deleted),
+                                   len(self.failed)))
+
+
+class AcqSpecReconciler(object):
+    """
+    Keeps the acquisition specifications with RECONCILER_MEMO equal to a
+    desired set of (counters, resources) pairs.
+
+    plan() diffs the desired pairs against AcqSpecs.list: missing specs are
+    created, specs no longer wanted are deleted (or reused for a missing
+    pair with one update instead of a delete and a create), specs with
+    another interval are updated, and specs expiring within renew_ahead
+    seconds get their expiration moved lifetime seconds ahead.  apply() runs
+    the operations on max_workers threads.  Calling reconcile() more often
+    than every renew_ahead seconds keeps the specs from expiring.
+    """
+
+    def __init__(self, acq_specs_client, interval=10, lifetime=3600,
+                 renew_ahead=600, memo=RECONCILER_MEMO, max_workers=8):
+        self.acq_specs_client = acq_specs_client
+        self.interval = interval
+        self.lifetime = lifetime
+        self.renew_ahead = renew_ahead
+        self.memo = memo
+        self.max_workers = max_workers
+
+    def list_managed(self):
+        """
+        Returns the AcqSpecs.Info with the reconciler memo, from every page
+        of AcqSpecs.list.
+        """
+        specs = []
+        page = None
+        while True:
+            result = self.acq_specs_client.list(
+                filter=AcqSpecs.FilterSpec(page=page))
+            specs.extend(info for info in result.acq_specs or []
+                         if info.memo_ == self.memo)
+            page = result.next
+            if not page:
+                return specs
+
+    def plan(self, desired, existing=None, now=None):
+        """
+        Returns the operations bringing existing (by default list_managed())
+        to desired, a list of (counters, resources) pairs, as a dict with
+        'create' [(counters, resources)], 'update' and 'renew'
+        [(id, AcqSpecs.UpdateSpec)] and 'delete' [id] lists.
+        """
+        if existing is None:
+            existing = self.list_managed()
+        now = int(time.time() if now is None else now)
+        expiration = now + self.lifetime
+        wanted = {}
+        for counters, resources in desired:
+            wanted.setdefault(spec_key(counters, resources),
+                              (counters, resources))
+
+        plan = {'create': [], 'update': [], 'renew': [], 'delete': []}
+        stale = []
+        for info in existing:
+            key = spec_key(info.counters, info.resources)
+            if wanted.pop(key, None) is None:
+                stale.append(info.id)
+            elif info.interval != self.interval:
+                plan['update'].append((info.id, AcqSpecs.UpdateSpec(
+                    interval=self.interval, expiration=expiration)))
+            elif (not info.expiration or
+                    info.expiration - now < self.renew_ahead or
+                    info.status == AcqSpecs.Status.EXPIRED):
+                plan['renew'].append((info.id, AcqSpecs.UpdateSpec(
+                    expiration=expiration)))
+
+        missing = list(wanted.values())
+        for spec_id, (counters, resources) in zip(stale, missing):
+            plan['update'].append((spec_id, AcqSpecs.UpdateSpec(
+                counters=counters, resources=resources,
+                interval=self.interval, expiration=expiration)))
+        for counters, resources in missing[len(stale):]:
+            plan['create'].append((counters, resources))
+        plan['delete'] = stale[len(missing):]
+        return plan
+
+    def apply(self, plan, now=None):
+        """
+        Runs the operations of plan concurrently and returns a
+        ReconcileResult.  A failed operation does not stop the others.
+        """
+        now = int(time.time() if now is None else now)
+        client = self.acq_specs_client
+        result = ReconcileResult()
+
+        def create(counters, resources):
+            return client.create(AcqSpecs.CreateSpec(
+                counters=counters, resources=resources,
+                interval=self.interval, expiration=now + self.lifetime,
+                memo_=self.memo))
+
+        operations = []
+        for counters, resources in plan['create']:
+            operations.append(('create', spec_key(counters, resources),
+                               create, (counters, resources)))
+        for action in ('update', 'renew'):
+            for spec_id, update_spec in plan[action]:
+                operations.append((action, spec_id, client.update,
+                                   (spec_id, update_spec)))
+        for spec_id in plan['delete']:
+            operations.append(('delete', spec_id, client.delete, (spec_id,)))
+
+        done = {'create': result.created, 'update': result.updated,
+                'renew': result.renewed, 'delete': result.deleted}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [(action, target, executor.submit(function, *args))
+                       for action, target, function, args in operations]
+            for action, target, future in futures:
+                try:
+                    value = future.result()
+                except Exception as e:
+                    result.failed.append((action, target, e))
+                else:
+                    done[action].append(value if action == 'create'
+                                        else target)
+        return result
+
+    def reconcile(self, desired, now=None):
+        return self.apply(self.plan(desired, now=now), now=now)
@@ -0,0 +1,159 @@
+"""
+ * *******************************************************
+ * Copyright (c) VMware, Inc. 2024. All Rights Reserved.
+ * SPDX-License-Identifier: MIT
+ * *******************************************************
+ *
+ * DISCLAIMER. THIS PROGRAM IS PROVIDED TO YOU "AS IS" WITHOUT
+ * WARRANTIES OR CONDITIONS OF ANY KIND, WHETHER ORAL OR WRITTEN,
+ * EXPRESS OR IMPLIED. THE AUTHOR SPECIFICALLY DISCLAIMS ANY IMPLIED
+ * WARRANTIES OR CONDITIONS OF MERCHANTABILITY, SATISFACTORY QUALITY,
+ * NON-INFRINGEMENT AND FITNESS FOR A PARTICULAR PURPOSE.
+ """
+
+__author__ = 'VMware, Inc.'
+__vcenter_version__ = '7.0+'
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Aggregates computed by DataPointColumns.aggregate, besides the group keys.
+AGGREGATES = ['count', 'mean', 'max', 'p95', 'rate']
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError('numpy is required for columnar vStats data; '
+                          'install it with "pip install numpy"')
+
+
+class DataPointColumns(object):
+    """
+    vStats data points as columns: counter and resource are int32 codes
+    into the counters and resources lists, ts is int64 seconds and val is
+    float64.
+    """
+
+    def __init__(self, cid, rid, ts, val, counters, resources):
+        self.cid = cid
+        self.rid = rid
+        self.ts = ts
+        self.val = val
+        self.counters = counters
+        self.resources = resources
+
+    def __len__(self):
+        return len(self.ts)
+
+    @classmethod
+    def from_pages(cls, pages):
+        """
+        Build the columns from an iterable of pages (lists of
+        Data.DataPoint), such as iter_data_point_pages.  Only one page of
+        binding objects is held at a time.
+        """
+        _require_numpy()
+        counter_codes = {}
+        resource_codes = {}
+        chunks = []
+        for page in pages:
+            if not page:
+                continue
+            count = len(page)
+            chunks.append((
+                np.fromiter((counter_codes.setdefault(dp.cid,
+                                                      len(counter_codes))
+                             for dp in page), np.int32, count),
+                np.fromiter((resource_codes.setdefault(dp.rid,
+                                                       len(resource_codes))
+                             for dp in page), np.int32, count),
+                np.fromiter((dp.ts for dp in page), np.int64, count),
+                np.fromiter((dp.val for dp in page), np.float64, count)))
+        if chunks:
+            cid, rid, ts, val = [np.concatenate(column)
+                                 for column in zip(*chunks)]
+        else:
+            cid = np.empty(0, np.int32)
+            rid = np.empty(0, np.int32)
+            ts = np.empty(0, np.int64)
+            val = np.empty(0, np.float64)
+        counters = sorted(counter_codes, key=counter_codes.get)
+        resources = sorted(resource_codes, key=resource_codes.get)
+        return cls(cid, rid, ts, val, counters, resources)
+
+    def aggregate(self, bucket_seconds=300, percentile=95):
+        """
+        Group the points by counter, resource and time bucket and return a
+        dict of equally long arrays: 'cid' and 'rid' codes, 'start' of the
+        bucket, and the AGGREGATES of the values in each group ('p95' holds
+        the given percentile, linearly interpolated).  'rate' is the change
+        of the value per second between the first and last point of the
+        group, NaN for groups with a single timestamp.
+        """
+        _require_numpy()
+        if not len(self):
+            empty = dict((name, np.empty(0)) for name in AGGREGATES)
+            empty.update(cid=np.empty(0, np.int32), rid=np.empty(0, np.int32),
+                         start=np.empty(0, np.int64))
+            return empty
+        bucket = self.ts // bucket_seconds
+        bucket -= bucket.min()
+        # One int64 key per (counter, resource, bucket), ordered like them.
+        key = ((self.cid.astype(np.int64) * len(self.resources) + self.rid) *
+               (int(bucket.max()) + 1) + bucket)
+
+        # Order by key, then by time within the bucket.  A single argsort
+        # of a packed int64 is several times faster than np.lexsort.
+        order = np.argsort(key * bucket_seconds + self.ts % bucket_seconds)
+        sorted_key = key[order]
+        new_group = np.r_[True, sorted_key[1:] != sorted_key[:-1]]
+        starts = np.flatnonzero(new_group)
+        ends = np.r_[starts[1:], len(sorted_key)]
+        count = ends - starts
+        ts = self.ts[order]
+        val = self.val[order]
+        first = order[starts]
+
+        result = {
+            'cid': self.cid[first],
+            'rid': self.rid[first],
+            'start': (self.ts[first] // bucket_seconds) * bucket_seconds,
+            'count': count,
+            'mean': np.add.reduceat(val, starts) / count,
+            'max': np.maximum.reduceat(val, starts),
+        }
+        elapsed = (ts[ends - 1] - ts[starts]).astype(np.float64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            result['rate'] = np.where(elapsed > 0,
+                                      (val[ends - 1] - val[starts]) / elapsed,
+                                      np.nan)
+
+        # Values in ascending order within each group, for the percentile:
+        # sort (group, rank of the value) pairs packed into one int64.
+        size = len(val)
+        by_rank = np.argsort(val)
+        rank = np.empty(size, np.int64)
+        rank[by_rank] = np.arange(size)
+        packed = np.sort((np.cumsum(new_group) - 1) * size + rank)
+        by_value = val[by_rank[packed % size]]
+        position = starts + (count - 1) * (percentile / 100.0)
+        lower = np.floor(position).astype(np.int64)
+        upper = np.minimum(lower + 1, ends - 1)
+        fraction = position - lower
+        result['p95'] = (by_value[lower] * (1 - fraction) +
+                         by_value[upper] * fraction)
+        return result
+
+    def iter_rows(self, aggregates):
+        """
+        Yield the groups of aggregate() as dicts with counter and resource
+        names.
+        """
+        for i in range(len(aggregates['start'])):
+            row = dict((name, aggregates[name][i].item())
+                       for name in ['start'] + AGGREGATES)
+            row['cid'] = self.counters[aggregates['cid'][i]]
+            row['rid'] = self.resources[aggregates['rid'][i]]
+            yield row
@@ -0,0 +1,103 @@
+"""
+ * *******************************************************
+ * Copyright (c) VMware, Inc. 2024. All Rights Reserved.
+ * SPDX-License-Identifier: MIT
+ * *******************************************************
+ *
+ * DISCLAIMER. THIS PROGRAM IS PROVIDED TO YOU "AS IS" WITHOUT
+ * WARRANTIES OR CONDITIONS OF ANY KIND, WHETHER ORAL OR WRITTEN,
+ * EXPRESS OR IMPLIED. THE AUTHOR SPECIFICALLY DISCLAIMS ANY IMPLIED
+ * WARRANTIES OR CONDITIONS OF MERCHANTABILITY, SATISFACTORY QUALITY,
+ * NON-INFRINGEMENT AND FITNESS FOR A PARTICULAR PURPOSE.
+ """
+
+__author__ = 'VMware, Inc.'
+__vcenter_version__ = '7.0+'
+
+import copy
+from concurrent.futures import ThreadPoolExecutor
+
+
+def _with_page(filter_spec, page):
+    filter_spec = copy.copy(filter_spec)
+    filter_spec.page = page
+    return filter_spec
+
+
+def iter_data_point_pages(data_client, filter_spec=None, prefetch=True):
+    """
+    Query data points and yield them one page (a list of Data.DataPoint) at
+    a time, following the next token of each Data.DataPointsResult until the
+    result set is complete.
+
+    With prefetch the next page is requested on a background thread while
+    the caller processes the current one, so at most two pages are held in
+    memory at any time.
+    """
+    if filter_spec is None:
+        filter_spec = data_client.FilterSpec()
+
+    def query(page):
+        spec = filter_spec if page is None else _with_page(filter_spec, page)
+        return data_client.query_data_points(filter=spec)
+
+    if not prefetch:
+        result = query(filter_spec.page)
+        while True:
+            yield result.data_points or []
+            if not result.next:
+                return
+            result = query(result.next)
+
+    executor = ThreadPoolExecutor(max_workers=1)
+    try:
+        future = executor.submit(query, filter_spec.page)
+        while future is not None:
+            result = future.result()
+            future = None
+            if result.next:
+                future = executor.submit(query, result.next)
+            yield result.data_points or []
+    finally:
+        executor.shutdown(wait=False)
+
+
+def iter_data_points(data_client, filter_spec=None, prefetch=True):
+    """
+    Query data points and yield every Data.DataPoint of every page.  See
+    iter_data_point_pages.
+    """
+    for page in iter_data_point_pages(data_client, filter_spec, prefetch):
+        for data_point in page:
+            yield data_point
+
+
+def store_data_points(store, data_client, filter_spec=None, prefetch=True):
+    """
+    Fetch the data points matching filter_spec that are newer than what
+    store (a TimeSeriesStore) already holds, and append them to the store
+    as one series per cid and rid.  Returns the number of points stored.
+
+    The query starts after the oldest watermark of the series of the
+    filter's counter, so a window that overlaps the previous fetch is only
+    transferred from that point on; points at or before the watermark of
+    their own series are dropped by the store.  Pages are not ordered by
+    time, so the points of every series are collected from all pages and
+    appended once the query is complete.
+    """
+    if filter_spec is None:
+        filter_spec = data_client.FilterSpec()
+    watermark = store.min_watermark(filter_spec.cid)
+    if watermark is not None and (filter_spec.start is None or
+                                  filter_spec.start <= watermark):
+        filter_spec = copy.copy(filter_spec)
+        filter_spec.start = watermark + 1
+    series = {}
+    for page in iter_data_point_pages(data_client, filter_spec, prefetch):
+        for data_point in page:
+            series.setdefault((data_point.cid, data_point.rid), []).append(
+                (data_point.ts, data_point.val))
+    stored = 0
+    for (cid, rid), points in series.items():
+        stored += store.append(cid, rid, points)
+    return stored
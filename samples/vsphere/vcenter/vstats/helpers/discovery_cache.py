@@ -0,0 +1,165 @@
+"""
+ * *******************************************************
+ * Copyright (c) VMware, Inc. 2024. All Rights Reserved.
+ * SPDX-License-Identifier: MIT
+ * *******************************************************
+ *
+ * DISCLAIMER. THIS PROGRAM IS PROVIDED TO YOU "AS IS" WITHOUT
+ * WARRANTIES OR CONDITIONS OF ANY KIND, WHETHER ORAL OR WRITTEN,
+ * EXPRESS OR IMPLIED. THE AUTHOR SPECIFICALLY DISCLAIMS ANY IMPLIED
+ * WARRANTIES OR CONDITIONS OF MERCHANTABILITY, SATISFACTORY QUALITY,
+ * NON-INFRINGEMENT AND FITNESS FOR A PARTICULAR PURPOSE.
+ """
+
+__author__ = 'VMware, Inc.'
+__vcenter_version__ = '7.0+'
+
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from com.vmware.vstats_client import Counters, Providers, ResourceTypes, \
+        CounterMetadata, Metrics, CounterSets, ResourceAddressSchemas
+from pyVmomi import SoapStubAdapter, vim
+
+from samples.vsphere.common.cache_util import private_dir, user_cache_dir
+from samples.vsphere.common.ssl_helper import get_unverified_context
+
+DISCOVERY_CACHE_DIR = user_cache_dir('vstats-discovery')
+
+# Discovery lists that take no arguments: record key -> service.
+DISCOVERY_LISTS = [
+    ('counters', Counters),
+    ('providers', Providers),
+    ('resource_types', ResourceTypes),
+    ('metrics', Metrics),
+    ('counter_sets', CounterSets),
+]
+
+
+def get_vcenter_identity(server, skip_verification=False):
+    """
+    Returns the instance UUID and build of vCenter, read from the service
+    content which does not require a login.
+    """
+    context = get_unverified_context() if skip_verification else None
+    stub = SoapStubAdapter(host=server, sslContext=context)
+    about = vim.ServiceInstance('ServiceInstance', stub).RetrieveContent().about
+    return about.instanceUuid, about.build
+
+
+def _normalize(value):
+    # Keep plain dicts and lists so the records can be stored as JSON.
+    if isinstance(value, list):
+        return [_normalize(item) for item in value]
+    return json.loads(value.to_json())
+
+
+class VstatsDiscovery(object):
+    """
+    Result of every vSphere Stats discovery API of one vCenter, as plain
+    dicts, indexed by counter id, metric and resource type.
+
+    records holds 'counters', 'providers', 'resource_types', 'metrics' and
+    'counter_sets' lists, 'counter_metadata' (cid -> list) and
+    'resource_address_schemas' (schema id -> schema).
+    """
+
+    def __init__(self, records):
+        self.records = records
+        self.counters_by_cid = dict((counter['cid'], counter)
+                                    for counter in records['counters'])
+        self.counters_by_metric = {}
+        self.counters_by_resource_type = {}
+        for counter in records['counters']:
+            self.counters_by_metric.setdefault(counter['metric'],
+                                               []).append(counter)
+            schema = records['resource_address_schemas'].get(
+                counter['resource_address_schema'], {})
+            for resource_type in set(definition['type'] for definition in
+                                     schema.get('schema', [])):
+                self.counters_by_resource_type.setdefault(
+                    resource_type, []).append(counter)
+        self.counter_sets_by_id = dict(
+            (counter_set['id'], counter_set)
+            for counter_set in records['counter_sets'])
+
+    def counter(self, cid):
+        return self.counters_by_cid.get(cid)
+
+    def counters_for_metric(self, metric):
+        return self.counters_by_metric.get(metric, [])
+
+    def counters_for_resource_type(self, resource_type):
+        return self.counters_by_resource_type.get(resource_type, [])
+
+    def counter_metadata(self, cid):
+        return self.records['counter_metadata'].get(cid, [])
+
+    def resource_address_schema(self, schema_id):
+        return self.records['resource_address_schemas'].get(schema_id)
+
+    def counter_set(self, counter_set_id):
+        return self.counter_sets_by_id.get(counter_set_id)
+
+    @classmethod
+    def fetch(cls, stub_config, max_workers=8):
+        """
+        Call every discovery API, the independent lists concurrently, then
+        the counter metadata of every counter and every resource address
+        schema the counters use.
+        """
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = dict((key, executor.submit(service(stub_config).list))
+                           for key, service in DISCOVERY_LISTS)
+            records = dict((key, _normalize(future.result()))
+                           for key, future in futures.items())
+
+            metadata_client = CounterMetadata(stub_config)
+            schemas_client = ResourceAddressSchemas(stub_config)
+            cids = [counter['cid'] for counter in records['counters']]
+            schema_ids = sorted(set(
+                counter['resource_address_schema']
+                for counter in records['counters']))
+            records['counter_metadata'] = dict(zip(cids, [
+                _normalize(metadata) for metadata in
+                executor.map(metadata_client.list, cids)]))
+            records['resource_address_schemas'] = dict(zip(schema_ids, [
+                _normalize(schema) for schema in
+                executor.map(schemas_client.get, schema_ids)]))
+        return cls(records)
+
+    def save(self, path):
+        tmp = path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self.records, f)
+        os.rename(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls(json.load(f))
+
+
+def get_discovery(stub_config, instance_uuid, build,
+                  directory=DISCOVERY_CACHE_DIR, refresh=False,
+                  max_workers=8):
+    """
+    Returns the VstatsDiscovery of a vCenter from the cache file for its
+    instance UUID and build, fetching and saving it if there is none yet or
+    refresh is set.  An upgrade changes the build and so starts a new cache.
+    directory is created accessible only by the current user, and a cache
+    file that cannot be read is fetched again.
+    """
+    path = os.path.join(private_dir(directory),
+                        '{}-{}.json'.format(instance_uuid, build))
+    if not refresh and os.path.exists(path):
+        try:
+            return VstatsDiscovery.load(path)
+        except (ValueError, KeyError, TypeError) as e:
+            logging.warning('Ignoring unreadable discovery cache %s: %s',
+                            path, e)
+    discovery = VstatsDiscovery.fetch(stub_config, max_workers)
+    discovery.save(path)
+    return discovery
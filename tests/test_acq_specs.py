@@ -0,0 +1,164 @@
+#!/usr/bin/env python
+"""
+* *******************************************************
+* Copyright (c) VMware, Inc. 2024. All Rights Reserved.
+* SPDX-License-Identifier: MIT
+* *******************************************************
+*
+* DISCLAIMER. THIS PROGRAM IS PROVIDED TO YOU "AS IS" WITHOUT
+* WARRANTIES OR CONDITIONS OF ANY KIND, WHETHER ORAL OR WRITTEN,
+* EXPRESS OR IMPLIED. THE AUTHOR SPECIFICALLY DISCLAIMS ANY IMPLIED
+* WARRANTIES OR CONDITIONS OF MERCHANTABILITY, SATISFACTORY QUALITY,
+* NON-INFRINGEMENT AND FITNESS FOR A PARTICULAR PURPOSE.
+"""
+
+__author__ = 'VMware, Inc.'
+
+import itertools
+
+from com.vmware.vstats_client import AcqSpecs, CidMid, RsrcId
+
+from samples.vsphere.vcenter.vstats.helpers.acq_specs import \
+    AcqSpecReconciler, RECONCILER_MEMO, desired_specs, pack_counters, \
+    spec_key
+
+NOW = 1000000
+
+
+class FakeAcqSpecs(object):
+    """In-memory AcqSpecs service with paged list results."""
+
+    def __init__(self, page_size=3):
+        self.specs = {}
+        self.page_size = page_size
+        self.ids = itertools.count()
+        self.calls = []
+        self.failing = set()
+
+    def list(self, filter=None):
+        ids = sorted(self.specs)
+        start = int(filter.page or 0)
+        end = start + self.page_size
+        return AcqSpecs.ListResult(
+            acq_specs=[self.specs[i] for i in ids[start:end]],
+            next=str(end) if end < len(ids) else None)
+
+    def create(self, spec):
+        self.calls.append('create')
+        spec_id = 'acq-{}'.format(next(self.ids))
+        self.specs[spec_id] = AcqSpecs.Info(
+            id=spec_id, counters=spec.counters, resources=spec.resources,
+            interval=spec.interval, expiration=spec.expiration,
+            memo_=spec.memo_, status=AcqSpecs.Status.ENABLED)
+        return spec_id
+
+    def update(self, spec_id, spec):
+        self.calls.append('update')
+        if spec_id in self.failing:
+            raise Exception('busy')
+        info = self.specs[spec_id]
+        for name in ('counters', 'resources', 'interval', 'expiration'):
+            if getattr(spec, name) is not None:
+                setattr(info, name, getattr(spec, name))
+
+    def delete(self, spec_id):
+        self.calls.append('delete')
+        del self.specs[spec_id]
+
+
+def _vms(*numbers):
+    return [[RsrcId(id_value='vm-{}'.format(n), type='VM')] for n in numbers]
+
+
+def test_pack_counters_uses_counter_sets_of_wanted_counters():
+    counter_sets = {'small': ['a'], 'ab': ['a', 'b'], 'cz': ['c', 'z']}
+    specs = pack_counters(['a', 'b', 'c'], counter_sets)
+    assert [spec.set_id for spec in specs] == ['ab', None]
+    assert specs[1].cid_mid.cid == 'c'
+
+    specs = pack_counters(['b', 'a'])
+    assert [spec.cid_mid.cid for spec in specs] == ['a', 'b']
+
+
+def test_desired_specs_has_one_spec_per_resource_and_counter_spec():
+    desired = desired_specs(['a', 'b'], _vms(1, 2), {'ab': ['a', 'b']})
+    assert len(desired) == 2
+    assert [resources[0].id_value for _, resources in desired] == \
+        ['vm-1', 'vm-2']
+
+
+def test_spec_key_ignores_resource_order():
+    counters = AcqSpecs.CounterSpec(cid_mid=CidMid(cid='a'))
+    host = RsrcId(id_value='host-1', type='HOST')
+    vm = RsrcId(id_value='vm-1', type='VM')
+    assert spec_key(counters, [host, vm]) == spec_key(counters, [vm, host])
+
+
+def test_plan_creates_missing_specs_on_first_run():
+    client = FakeAcqSpecs()
+    reconciler = AcqSpecReconciler(client)
+    plan = reconciler.plan(desired_specs(['a'], _vms(1, 2, 3)), now=NOW)
+    assert len(plan['create']) == 3
+    assert plan['update'] == plan['renew'] == plan['delete'] == []
+
+
+def test_reconcile_is_idempotent_and_ignores_foreign_specs():
+    client = FakeAcqSpecs(page_size=2)
+    client.specs['other'] = AcqSpecs.Info(
+        id='other', counters=AcqSpecs.CounterSpec(cid_mid=CidMid(cid='a')),
+        resources=[], interval=10, expiration=1, memo_='user',
+        status=AcqSpecs.Status.ENABLED)
+    reconciler = AcqSpecReconciler(client, lifetime=3600, renew_ahead=600)
+    desired = desired_specs(['a', 'b'], _vms(1, 2, 3))
+
+    result = reconciler.reconcile(desired, now=NOW)
+    assert len(result.created) == 6 and not result.failed
+    assert all(info.expiration == NOW + 3600 for info in client.specs.values()
+               if info.memo_ == RECONCILER_MEMO)
+
+    client.calls = []
+    result = reconciler.reconcile(desired, now=NOW + 60)
+    assert client.calls == []
+    assert 'other' in client.specs
+
+
+def test_reconcile_renews_specs_close_to_expiration():
+    client = FakeAcqSpecs()
+    reconciler = AcqSpecReconciler(client, lifetime=3600, renew_ahead=600)
+    desired = desired_specs(['a'], _vms(1, 2))
+    reconciler.reconcile(desired, now=NOW)
+
+    later = NOW + 3600 - 599
+    result = reconciler.reconcile(desired, now=later)
+    assert len(result.renewed) == 2
+    assert all(info.expiration == later + 3600
+               for info in client.specs.values())
+
+
+def test_reconcile_reuses_stale_specs_and_deletes_the_rest():
+    client = FakeAcqSpecs()
+    reconciler = AcqSpecReconciler(client)
+    reconciler.reconcile(desired_specs(['a'], _vms(1, 2, 3)), now=NOW)
+
+    # vm-1 and vm-2 are gone, vm-4 is new.
+    result = reconciler.reconcile(desired_specs(['a'], _vms(3, 4)), now=NOW)
+    assert len(result.updated) == 1
+    assert len(result.deleted) == 1
+    assert result.created == []
+    assert sorted(info.resources[0].id_value
+                  for info in client.specs.values()) == ['vm-3', 'vm-4']
+
+
+def test_reconcile_updates_interval_and_reports_failures():
+    client = FakeAcqSpecs()
+    desired = desired_specs(['a'], _vms(1, 2))
+    AcqSpecReconciler(client, interval=10).reconcile(desired, now=NOW)
+
+    client.failing.add('acq-0')
+    result = AcqSpecReconciler(client, interval=30).reconcile(desired,
+                                                              now=NOW)
+    assert len(result.updated) == 1
+    assert len(result.failed) == 1
+    assert result.failed[0][:2] == ('update', 'acq-0')
+    assert str(result.failed[0][2]) == 'busy'
+    assert client.specs['acq-1'].interval == 30
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+"""
+* *******************************************************
+* Copyright (c) VMware, Inc. 2024. All Rights Reserved.
+* SPDX-License-Identifier: MIT
+* *******************************************************
+*
+* DISCLAIMER. THIS PROGRAM IS PROVIDED TO YOU "AS IS" WITHOUT
+* WARRANTIES OR CONDITIONS OF ANY KIND, WHETHER ORAL OR WRITTEN,
+* EXPRESS OR IMPLIED. THE AUTHOR SPECIFICALLY DISCLAIMS ANY IMPLIED
+* WARRANTIES OR CONDITIONS OF MERCHANTABILITY, SATISFACTORY QUALITY,
+* NON-INFRINGEMENT AND FITNESS FOR A PARTICULAR PURPOSE.
+"""
+
+__author__ = 'VMware, Inc.'
+
+import pytest
+from unittest import mock
+
+from pyVmomi import vim
+
+from samples.vsphere.vcenter.setup import network
+
+HostSystem = vim.HostSystem
+
+
+class FakeSwitch(object):
+    """
+    Distributed Switch whose reconfigures time out when they include a bad
+    host, and raise fault when they include a forbidden one.
+    """
+
+    def __init__(self, members=(), bad_hosts=(), forbidden_hosts=(),
+                 fault=vim.fault.NoPermission):
+        self.config = mock.Mock(configVersion='1', host=[
+            mock.Mock(config=mock.Mock(host=HostSystem(host)))
+            for host in members])
+        self.bad_hosts = set(bad_hosts)
+        self.forbidden_hosts = set(forbidden_hosts)
+        self.fault = fault
+        self.batches = []
+
+    def Reconfigure(self, spec):
+        hosts = [member.host._moId for member in spec.host]
+        self.batches.append(hosts)
+        if self.forbidden_hosts.intersection(hosts):
+            raise self.fault()
+        if self.bad_hosts.intersection(hosts):
+            raise vim.fault.Timedout()
+        self.config.configVersion = str(int(self.config.configVersion) + 1)
+        return 'task'
+
+
+def _add_hosts(switch, host_count, **kwargs):
+    context = mock.Mock()
+    context.testbed.entities = {
+        'DISTRIBUTED_SWITCH_IDS': {'vds': 'dvs-1'},
+        'HOST_IDS': dict(('esx{}'.format(i), 'host-{}'.format(i))
+                         for i in range(host_count))}
+    host_names = ['esx{}'.format(i) for i in range(host_count)]
+    with mock.patch.object(network.vim, 'DistributedVirtualSwitch',
+                           mock.Mock(return_value=switch,
+                                     ConfigSpec=vim.DistributedVirtualSwitch
+                                     .ConfigSpec)), \
+            mock.patch.object(network.vim, 'HostSystem',
+                              lambda host, stub: HostSystem(host)), \
+            mock.patch.object(network.pyVim.task, 'WaitForTask'):
+        network.add_hosts_to_vdswitch(context, 'vds', host_names, **kwargs)
+
+
+def test_hosts_are_added_in_batches():
+    switch = FakeSwitch()
+    _add_hosts(switch, 5, batch_size=2, pnic_names=['vmnic1'])
+    assert switch.batches == [['host-0', 'host-1'], ['host-2', 'host-3'],
+                              ['host-4']]
+    assert switch.config.configVersion == '4'
+
+
+def test_existing_members_are_skipped():
+    switch = FakeSwitch(members=['host-1'])
+    _add_hosts(switch, 3)
+    assert switch.batches == [['host-0', 'host-2']]
+
+
+def test_failing_batch_is_halved_until_bad_hosts_are_isolated():
+    switch = FakeSwitch(bad_hosts=['host-2', 'host-5'])
+    with pytest.raises(Exception) as e:
+        _add_hosts(switch, 8, batch_size=4)
+    assert '2 host(s)' in str(e.value)
+    assert switch.batches == [
+        ['host-0', 'host-1', 'host-2', 'host-3'],
+        ['host-0', 'host-1'],
+        ['host-2', 'host-3'],
+        ['host-2'],
+        ['host-3'],
+        ['host-4', 'host-5', 'host-6', 'host-7'],
+        ['host-4', 'host-5'],
+        ['host-4'],
+        ['host-5'],
+        ['host-6', 'host-7'],
+    ]
+
+
+def test_other_faults_are_raised_without_retrying():
+    switch = FakeSwitch(forbidden_hosts=['host-2'])
+    with pytest.raises(vim.fault.NoPermission):
+        _add_hosts(switch, 8, batch_size=4)
+    assert switch.batches == [['host-0', 'host-1', 'host-2', 'host-3']]
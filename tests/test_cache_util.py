@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+"""
+* *******************************************************
+* Copyright (c) VMware, Inc. 2024. All Rights Reserved.
+* SPDX-License-Identifier: MIT
+* *******************************************************
+*
+* DISCLAIMER. THIS PROGRAM IS PROVIDED TO YOU "AS IS" WITHOUT
+* WARRANTIES OR CONDITIONS OF ANY KIND, WHETHER ORAL OR WRITTEN,
+* EXPRESS OR IMPLIED. THE AUTHOR SPECIFICALLY DISCLAIMS ANY IMPLIED
+* WARRANTIES OR CONDITIONS OF MERCHANTABILITY, SATISFACTORY QUALITY,
+* NON-INFRINGEMENT AND FITNESS FOR A PARTICULAR PURPOSE.
+"""
+
+__author__ = 'VMware, Inc.'
+
+import os
+import stat
+
+import pytest
+from unittest import mock
+
+from samples.vsphere.common import cache_util
+from samples.vsphere.common.cache_util import private_dir, user_cache_dir
+
+posix_only = pytest.mark.skipif(not hasattr(os, 'getuid'),
+                                reason='POSIX ownership and permissions')
+
+
+def test_user_cache_dir_uses_xdg_cache_home(tmp_path):
+    with mock.patch.dict(os.environ, {'XDG_CACHE_HOME': str(tmp_path)}):
+        assert user_cache_dir('wsdl') == os.path.join(
+            str(tmp_path), cache_util.CACHE_APP_NAME, 'wsdl')
+
+
+@posix_only
+def test_private_dir_is_created_for_the_current_user_only(tmp_path):
+    path = str(tmp_path / 'a' / 'b')
+    assert private_dir(path) == path
+    assert stat.S_IMODE(os.stat(path).st_mode) & 0o077 == 0
+
+
+@posix_only
+def test_private_dir_removes_group_and_other_permissions(tmp_path):
+    path = str(tmp_path / 'shared')
+    os.mkdir(path)
+    os.chmod(path, 0o777)
+    private_dir(path)
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o700
+
+
+@posix_only
+def test_private_dir_rejects_directories_of_other_users(tmp_path):
+    with mock.patch.object(cache_util.os, 'getuid',
+                           return_value=os.getuid() + 1):
+        with pytest.raises(OSError):
+            private_dir(str(tmp_path))
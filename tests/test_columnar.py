@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+"""
+* *******************************************************
+* Copyright (c) VMware, Inc. 2024. All Rights Reserved.
+* SPDX-License-Identifier: MIT
+* *******************************************************
+*
+* DISCLAIMER. THIS PROGRAM IS PROVIDED TO YOU "AS IS" WITHOUT
+* WARRANTIES OR CONDITIONS OF ANY KIND, WHETHER ORAL OR WRITTEN,
+* EXPRESS OR IMPLIED. THE AUTHOR SPECIFICALLY DISCLAIMS ANY IMPLIED
+* WARRANTIES OR CONDITIONS OF MERCHANTABILITY, SATISFACTORY QUALITY,
+* NON-INFRINGEMENT AND FITNESS FOR A PARTICULAR PURPOSE.
+"""
+
+__author__ = 'VMware, Inc.'
+
+import math
+import random
+
+import pytest
+
+from com.vmware.vstats_client import Data
+
+np = pytest.importorskip('numpy')
+
+from samples.vsphere.vcenter.vstats.helpers.columnar import \
+    AGGREGATES, DataPointColumns  # noqa: E402
+
+
+def _points(count, seed=1):
+    # Unique timestamps, so the first and last point of a group are defined.
+    rnd = random.Random(seed)
+    return [Data.DataPoint(cid=rnd.choice(['cpu', 'mem']),
+                           rid='vm-{}'.format(rnd.randint(1, 3)),
+                           ts=ts, val=float(rnd.randint(0, 50)))
+            for ts in rnd.sample(range(1000, 4000), count)]
+
+
+def _reference(points, bucket_seconds, percentile):
+    groups = {}
+    for dp in points:
+        start = dp.ts // bucket_seconds * bucket_seconds
+        groups.setdefault((dp.cid, dp.rid, start), []).append((dp.ts, dp.val))
+    rows = {}
+    for key, group in groups.items():
+        group.sort(key=lambda point: point[0])
+        values = [val for _, val in group]
+        elapsed = group[-1][0] - group[0][0]
+        rows[key] = {
+            'count': len(values),
+            'mean': sum(values) / len(values),
+            'max': max(values),
+            'p95': float(np.percentile(values, percentile)),
+            'rate': ((group[-1][1] - group[0][1]) / elapsed
+                     if elapsed else float('nan')),
+        }
+    return rows
+
+
+def test_from_pages_encodes_counters_and_resources():
+    columns = DataPointColumns.from_pages([
+        [Data.DataPoint(cid='cpu', rid='vm-1', ts=10, val=1.0)],
+        [],
+        [Data.DataPoint(cid='mem', rid='vm-1', ts=20, val=2.0),
+         Data.DataPoint(cid='cpu', rid='vm-2', ts=30, val=3.0)]])
+    assert len(columns) == 3
+    assert columns.counters == ['cpu', 'mem']
+    assert columns.resources == ['vm-1', 'vm-2']
+    assert columns.cid.tolist() == [0, 1, 0]
+    assert columns.rid.tolist() == [0, 0, 1]
+    assert columns.ts.dtype == np.int64
+
+
+def test_aggregate_matches_group_by_reference():
+    points = _points(500)
+    # Split into pages like iter_data_point_pages would.
+    columns = DataPointColumns.from_pages([points[i:i + 64]
+                                           for i in range(0, 500, 64)])
+    expected = _reference(points, 300, 90)
+
+    rows = list(columns.iter_rows(columns.aggregate(300, percentile=90)))
+    assert len(rows) == len(expected)
+    for row in rows:
+        reference = expected[(row['cid'], row['rid'], row['start'])]
+        for name in AGGREGATES:
+            if math.isnan(reference[name]):
+                assert math.isnan(row[name])
+            else:
+                assert row[name] == pytest.approx(reference[name])
+
+
+def test_aggregate_of_no_points():
+    columns = DataPointColumns.from_pages([])
+    aggregates = columns.aggregate()
+    assert all(len(aggregates[name]) == 0
+               for name in ['cid', 'rid', 'start'] + AGGREGATES)
+    assert list(columns.iter_rows(aggregates)) == []
@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+"""
+* *******************************************************
+* Copyright (c) VMware, Inc. 2024. All Rights Reserved.
+* SPDX-License-Identifier: MIT
+* *******************************************************
+*
+* DISCLAIMER. THIS PROGRAM IS PROVIDED TO YOU "AS IS" WITHOUT
+* WARRANTIES OR CONDITIONS OF ANY KIND, WHETHER ORAL OR WRITTEN,
+* EXPRESS OR IMPLIED. THE AUTHOR SPECIFICALLY DISCLAIMS ANY IMPLIED
+* WARRANTIES OR CONDITIONS OF MERCHANTABILITY, SATISFACTORY QUALITY,
+* NON-INFRINGEMENT AND FITNESS FOR A PARTICULAR PURPOSE.
+"""
+
+__author__ = 'VMware, Inc.'
+
+import datetime
+import os
+import threading
+
+from pyVmomi import vim
+
+from samples.vsphere.common.vim.datastore_file import File, _scan_local_dir
+
+FileInfo = vim.host.DatastoreBrowser.FileInfo
+FolderInfo = vim.host.DatastoreBrowser.FolderInfo
+
+
+class FakeDatastoreFile(File):
+    """File whose datastore folder is kept in memory."""
+
+    def __init__(self, remote=None, failing=()):
+        self._path = ''
+        self.remote = remote
+        self.failing = set(failing)
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def search(self, path=None):
+        if self.remote is None:
+            raise vim.fault.FileNotFound()
+        return dict(self.remote)
+
+    def mkdir(self, path=None, parent=False):
+        self.calls.append(('mkdir', path))
+
+    def put(self, path=None, src_url=None, src_file=None, src_path=None,
+            size=None):
+        with self._lock:
+            self.calls.append(('put', path))
+        if path in self.failing:
+            raise Exception('upload failed')
+
+    def delete(self, path=None):
+        self.calls.append(('delete', path))
+
+    def delete2(self, path=None):
+        self.calls.append(('delete2', path))
+
+
+def _write(local_dir, rel_path, data, mtime=1000000):
+    path = os.path.join(local_dir, *rel_path.split('/'))
+    if not os.path.isdir(os.path.dirname(path)):
+        os.makedirs(os.path.dirname(path))
+    with open(path, 'wb') as f:
+        f.write(data)
+    os.utime(path, (mtime, mtime))
+
+
+def _file_info(rel_path, size, mtime=1000000):
+    return FileInfo(path=rel_path.split('/')[-1], fileSize=size,
+                    modification=datetime.datetime.fromtimestamp(
+                        mtime, datetime.timezone.utc))
+
+
+def test_scan_local_dir(tmp_path):
+    _write(str(tmp_path), 'a.txt', b'a')
+    _write(str(tmp_path), 'sub/b.txt', b'bb')
+    entries = _scan_local_dir(str(tmp_path))
+    assert sorted(entries) == ['a.txt', 'sub', 'sub/b.txt']
+    assert entries['sub'] is None
+    assert entries['sub/b.txt'].st_size == 2
+
+
+def test_sync_to_missing_folder_uploads_everything(tmp_path):
+    _write(str(tmp_path), 'a.txt', b'a')
+    _write(str(tmp_path), 'sub/b.txt', b'bb')
+    datastore_file = FakeDatastoreFile()
+
+    report = datastore_file.sync(str(tmp_path), 'dest')
+    assert report.created_folders == ['', 'sub']
+    assert sorted(report.uploaded) == ['a.txt', 'sub/b.txt']
+    assert report.planned_bytes == report.transferred_bytes == 3
+    assert ('mkdir', 'dest/sub') in datastore_file.calls
+    assert ('put', 'dest/sub/b.txt') in datastore_file.calls
+
+
+def test_sync_uploads_only_changed_files(tmp_path):
+    _write(str(tmp_path), 'same.txt', b'same')
+    _write(str(tmp_path), 'resized.txt', b'longer')
+    _write(str(tmp_path), 'newer.txt', b'new', mtime=1000100)
+    _write(str(tmp_path), 'missing.txt', b'm')
+    datastore_file = FakeDatastoreFile(remote={
+        'same.txt': _file_info('same.txt', 4),
+        'resized.txt': _file_info('resized.txt', 3),
+        'newer.txt': _file_info('newer.txt', 3),
+    })
+
+    report = datastore_file.sync(str(tmp_path))
+    assert sorted(report.planned_files) == ['missing.txt', 'newer.txt',
+                                            'resized.txt']
+    assert report.planned_bytes == 10
+    assert report.created_folders == []
+    assert not report.failed
+
+
+def test_sync_reports_failures_and_deletes_extra_entries(tmp_path):
+    _write(str(tmp_path), 'a.txt', b'a')
+    _write(str(tmp_path), 'b.txt', b'b')
+    _write(str(tmp_path), 'clash', b'c')
+    datastore_file = FakeDatastoreFile(remote={
+        'clash': FolderInfo(path='clash'),
+        'old': FolderInfo(path='old'),
+        'old/x.txt': _file_info('old/x.txt', 1),
+        'stale.txt': _file_info('stale.txt', 1),
+    }, failing=['b.txt'])
+
+    report = datastore_file.sync(str(tmp_path), delete=True)
+    assert report.uploaded == ['a.txt']
+    assert report.transferred_bytes == 1
+    assert sorted(report.failed) == ['b.txt', 'clash']
+    assert report.deleted == ['old', 'stale.txt']
+    assert ('delete2', 'old') in datastore_file.calls
+    assert ('delete', 'stale.txt') in datastore_file.calls
+    assert ('delete', 'old/x.txt') not in datastore_file.calls
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+"""
+* *******************************************************
+* Copyright (c) VMware, Inc. 2024. All Rights Reserved.
+* SPDX-License-Identifier: MIT
+* *******************************************************
+*
+* DISCLAIMER. THIS PROGRAM IS PROVIDED TO YOU "AS IS" WITHOUT
+* WARRANTIES OR CONDITIONS OF ANY KIND, WHETHER ORAL OR WRITTEN,
+* EXPRESS OR IMPLIED. THE AUTHOR SPECIFICALLY DISCLAIMS ANY IMPLIED
+* WARRANTIES OR CONDITIONS OF MERCHANTABILITY, SATISFACTORY QUALITY,
+* NON-INFRINGEMENT AND FITNESS FOR A PARTICULAR PURPOSE.
+"""
+
+__author__ = 'VMware, Inc.'
+
+import pytest
+from unittest import mock
+
+from samples.vsphere.vcenter.setup import datastore
+
+
+def _context():
+    context = mock.Mock()
+    context.testbed.entities = {
+        'HOST_IDS': {'esx1': 'host-1', 'esx2': 'host-2'},
+        'HOST_VMFS_DATASTORE_IDS': {}}
+    return context
+
+
+def test_unknown_hosts_are_an_error():
+    with pytest.raises(Exception) as e:
+        datastore.get_host_datastores(_context(), ['esx1', 'esx9'])
+    assert 'esx9' in str(e.value)
+
+
+def _setup_vmfs(disks):
+    host_mo = mock.Mock()
+    datastore_system = host_mo.configManager.datastoreSystem
+    datastore_system.QueryAvailableDisksForVmfs.return_value = [
+        mock.Mock(canonicalName='naa.1', devicePath='/dev/disks/naa.1'),
+        mock.Mock(canonicalName='naa.2', devicePath='/dev/disks/naa.2')]
+    datastore_system.QueryVmfsDatastoreCreateOptions.return_value = [
+        mock.Mock()]
+    datastore_system.CreateVmfsDatastore.return_value = \
+        mock.Mock(_moId='datastore-9')
+    context = _context()
+    with mock.patch.object(datastore, 'get_host_datastores',
+                           return_value={'esx1': []}), \
+            mock.patch.object(datastore.vim, 'HostSystem',
+                              return_value=host_mo):
+        results = datastore.setup_vmfs_datastores_on_hosts(
+            context, {'esx1': 'Local_VMFS'}, disks=disks)
+    return results, context, datastore_system
+
+
+def test_no_disk_is_formatted_unless_configured():
+    results, context, datastore_system = _setup_vmfs(None)
+    assert results == {'esx1': None}
+    assert not datastore_system.QueryAvailableDisksForVmfs.called
+    assert not datastore_system.CreateVmfsDatastore.called
+    assert context.testbed.entities['HOST_VMFS_DATASTORE_IDS'] == {}
+
+
+def test_only_the_configured_disk_is_formatted():
+    results, context, datastore_system = _setup_vmfs({'esx1': 'naa.2'})
+    assert results == {'esx1': 'datastore-9'}
+    datastore_system.QueryVmfsDatastoreCreateOptions.assert_called_once_with(
+        '/dev/disks/naa.2')
+    assert context.testbed.entities['HOST_VMFS_DATASTORE_IDS'] == \
+        {'esx1': 'datastore-9'}
+
+
+def test_unavailable_configured_disk_is_not_replaced():
+    results, _, datastore_system = _setup_vmfs({'esx1': 'naa.7'})
+    assert results == {'esx1': None}
+    assert not datastore_system.CreateVmfsDatastore.called
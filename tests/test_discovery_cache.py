@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+"""
+* *******************************************************
+* Copyright (c) VMware, Inc. 2024. All Rights Reserved.
+* SPDX-License-Identifier: MIT
+* *******************************************************
+*
+* DISCLAIMER. THIS PROGRAM IS PROVIDED TO YOU "AS IS" WITHOUT
+* WARRANTIES OR CONDITIONS OF ANY KIND, WHETHER ORAL OR WRITTEN,
+* EXPRESS OR IMPLIED. THE AUTHOR SPECIFICALLY DISCLAIMS ANY IMPLIED
+* WARRANTIES OR CONDITIONS OF MERCHANTABILITY, SATISFACTORY QUALITY,
+* NON-INFRINGEMENT AND FITNESS FOR A PARTICULAR PURPOSE.
+"""
+
+__author__ = 'VMware, Inc.'
+
+import os
+
+from unittest import mock
+
+from samples.vsphere.vcenter.vstats.helpers import discovery_cache
+from samples.vsphere.vcenter.vstats.helpers.discovery_cache import \
+    VstatsDiscovery, get_discovery
+
+
+def _records():
+    return {
+        'counters': [{'cid': 'cpu.usage.VM', 'metric': 'cpu.usage',
+                      'resource_address_schema': 'vm-schema'}],
+        'providers': [],
+        'resource_types': [],
+        'metrics': [],
+        'counter_sets': [{'id': 'cpu', 'counters': [{'cid': 'cpu.usage.VM'}]}],
+        'counter_metadata': {'cpu.usage.VM': []},
+        'resource_address_schemas': {
+            'vm-schema': {'schema': [{'type': 'VM'}]}},
+    }
+
+
+def _get(directory, **kwargs):
+    with mock.patch.object(discovery_cache.VstatsDiscovery, 'fetch',
+                           return_value=VstatsDiscovery(_records())) as fetch:
+        discovery = get_discovery(None, 'uuid-1', '100', str(directory),
+                                  **kwargs)
+    return discovery, fetch.call_count
+
+
+def test_indexes():
+    discovery = VstatsDiscovery(_records())
+    assert discovery.counter('cpu.usage.VM')['metric'] == 'cpu.usage'
+    assert len(discovery.counters_for_metric('cpu.usage')) == 1
+    assert len(discovery.counters_for_resource_type('VM')) == 1
+    assert discovery.counter_set('cpu')['counters'][0]['cid'] == \
+        'cpu.usage.VM'
+
+
+def test_discovery_is_cached_per_vcenter_build(tmp_path):
+    _, fetched = _get(tmp_path)
+    assert fetched == 1
+    assert os.listdir(str(tmp_path)) == ['uuid-1-100.json']
+
+    discovery, fetched = _get(tmp_path)
+    assert fetched == 0
+    assert discovery.records == _records()
+
+    _, fetched = _get(tmp_path, refresh=True)
+    assert fetched == 1
+
+
+def test_unreadable_cache_file_is_fetched_again(tmp_path):
+    for content in ['{"counters": [', '{}', '[]']:
+        with open(str(tmp_path / 'uuid-1-100.json'), 'w') as f:
+            f.write(content)
+        discovery, fetched = _get(tmp_path)
+        assert fetched == 1
+        assert discovery.records == _records()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python
+"""
+* *******************************************************
+* Copyright (c) VMware, Inc. 2024. All Rights Reserved.
+* SPDX-License-Identifier: MIT
+* *******************************************************
+*
+* DISCLAIMER. THIS PROGRAM IS PROVIDED TO YOU "AS IS" WITHOUT
+* WARRANTIES OR CONDITIONS OF ANY KIND, WHETHER ORAL OR WRITTEN,
+* EXPRESS OR IMPLIED. THE AUTHOR SPECIFICALLY DISCLAIMS ANY IMPLIED
+* WARRANTIES OR CONDITIONS OF MERCHANTABILITY, SATISFACTORY QUALITY,
+* NON-INFRINGEMENT AND FITNESS FOR A PARTICULAR PURPOSE.
+"""
+
+__author__ = 'VMware, Inc.'
+
+import itertools
+
+import pytest
+from unittest import mock
+
+from pyVmomi import vim, vmodl
+
+from samples.vsphere.common.vim.helpers.vim_utils import get_properties
+from samples.vsphere.vcenter.helper import fleet_power_helper
+from samples.vsphere.vcenter.helper.fleet_power_helper import power_vms
+
+POWERED_OFF = vim.VirtualMachine.PowerState.poweredOff
+POWERED_ON = vim.VirtualMachine.PowerState.poweredOn
+
+
+class FakeVCenter(object):
+    """
+    Power tasks complete one per TaskWatcher.wait call, oldest first, while
+    the number of tasks running per host and cluster is tracked.
+    """
+
+    def __init__(self, vms, failing=()):
+        # vms: {vm id: (host, cluster or None, power state)}
+        self.vms = vms
+        self.failing = set(failing)
+        self.task_ids = itertools.count()
+        self.running = []
+        self.max_per_host = {}
+        self.max_per_cluster = {}
+        self.stub = mock.Mock()
+        self.stub.InvokeMethod.side_effect = self._invoke
+
+    def _invoke(self, mo, info, args):
+        if mo._moId in self.failing:
+            raise vim.fault.InvalidState()
+        task = vim.Task('task-{}'.format(next(self.task_ids)))
+        self.running.append((task, mo._moId))
+        self._track()
+        return task
+
+    def _track(self):
+        for index, limits in ((0, self.max_per_host),
+                              (1, self.max_per_cluster)):
+            counts = {}
+            for _, vm in self.running:
+                key = self.vms[vm][index]
+                counts[key] = counts.get(key, 0) + 1
+            for key, count in counts.items():
+                limits[key] = max(limits.get(key, 0), count)
+
+    def get_properties(self, content, mo_type, mos, props):
+        if mo_type is vim.VirtualMachine:
+            return dict((mo, {'name': mo._moId,
+                              'runtime.host': vim.HostSystem(
+                                  self.vms[mo._moId][0]),
+                              'runtime.powerState': self.vms[mo._moId][2]})
+                        for mo in mos if mo._moId in self.vms)
+        clusters = dict((host, cluster) for host, cluster, _
+                        in self.vms.values())
+        return dict((mo, {'parent': vim.ClusterComputeResource(
+                        clusters[mo._moId])} if clusters[mo._moId] else {})
+                    for mo in mos)
+
+    def watcher(self, content):
+        fake = self
+
+        class Watcher(object):
+            @property
+            def pending(self):
+                return len(fake.running)
+
+            def add(self, task):
+                pass
+
+            def wait(self):
+                task, _ = fake.running.pop(0)
+                return [mock.Mock(task=task,
+                                  state=vim.TaskInfo.State.success)]
+
+            def close(self):
+                pass
+
+        return Watcher()
+
+    def power_vms(self, vms, operation, **kwargs):
+        service_instance = mock.Mock(_stub=self.stub)
+        with mock.patch.object(fleet_power_helper, 'get_properties',
+                               self.get_properties), \
+                mock.patch.object(fleet_power_helper, 'TaskWatcher',
+                                  self.watcher):
+            return power_vms(service_instance, vms, operation, **kwargs)
+
+
+def test_limits_must_be_positive():
+    with pytest.raises(ValueError):
+        power_vms(mock.Mock(), ['vm-1'], 'on', max_per_host=0)
+    with pytest.raises(ValueError):
+        power_vms(mock.Mock(), ['vm-1'], 'on', max_per_cluster=0)
+
+
+def test_power_on_respects_host_and_cluster_limits():
+    vms = dict(('vm-{}'.format(i),
+                ('host-{}'.format(i % 3), 'c-1' if i % 3 else None,
+                 POWERED_OFF))
+               for i in range(12))
+    vcenter = FakeVCenter(vms)
+    results = vcenter.power_vms(list(vms), 'on', max_per_host=2,
+                                max_per_cluster=3)
+    assert all(result.state == 'success' for result in results.values())
+    assert max(vcenter.max_per_host.values()) == 2
+    assert vcenter.max_per_cluster['c-1'] == 3
+
+
+def test_skipped_missing_and_failing_vms():
+    vcenter = FakeVCenter({
+        'vm-1': ('host-1', None, POWERED_ON),
+        'vm-2': ('host-1', None, POWERED_OFF),
+        'vm-3': ('host-1', None, POWERED_OFF),
+    }, failing=['vm-3'])
+    results = vcenter.power_vms(['vm-1', 'vm-2', 'vm-3', 'vm-9'], 'on')
+    assert results['vm-1'].state == 'skipped'
+    assert results['vm-2'].state == 'success'
+    assert results['vm-3'].state == 'error'
+    assert results['vm-9'].state == 'error'
+    assert str(results['vm-9'].error) == 'VM not found'
+
+
+def test_get_properties_leaves_out_deleted_objects():
+    deleted = set(['vm-2', 'vm-4'])
+
+    def retrieve_contents(filter_specs):
+        objs = [spec.obj for spec in filter_specs[0].objectSet]
+        for obj in objs:
+            if obj._moId in deleted:
+                raise vmodl.fault.ManagedObjectNotFound(obj=obj)
+        return [mock.Mock(obj=obj, propSet=[mock.Mock(val=obj._moId)])
+                for obj in objs]
+
+    content = mock.Mock()
+    content.propertyCollector.RetrieveContents.side_effect = \
+        retrieve_contents
+    vms = [vim.VirtualMachine('vm-{}'.format(i)) for i in range(1, 5)]
+    result = get_properties(content, vim.VirtualMachine, vms, ['name'])
+    assert sorted(obj._moId for obj in result) == ['vm-1', 'vm-3']
+    assert get_properties(content, vim.VirtualMachine, vms[1:2],
+                          ['name']) == {}
@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+"""
+* *******************************************************
+* Copyright (c) VMware, Inc. 2024. All Rights Reserved.
+* SPDX-License-Identifier: MIT
+* *******************************************************
+*
+* DISCLAIMER. THIS PROGRAM IS PROVIDED TO YOU "AS IS" WITHOUT
+* WARRANTIES OR CONDITIONS OF ANY KIND, WHETHER ORAL OR WRITTEN,
+* EXPRESS OR IMPLIED. THE AUTHOR SPECIFICALLY DISCLAIMS ANY IMPLIED
+* WARRANTIES OR CONDITIONS OF MERCHANTABILITY, SATISFACTORY QUALITY,
+* NON-INFRINGEMENT AND FITNESS FOR A PARTICULAR PURPOSE.
+"""
+
+__author__ = 'VMware, Inc.'
+
+import io
+
+import pytest
+from unittest import mock
+
+from samples.vsphere.vcenter.helper import guest_process_helper
+from samples.vsphere.vcenter.helper.guest_transfer_helper import \
+    GuestFileTransfer
+
+URL = 'https://esx-1:443/guestFile?id=1'
+
+
+class FakeResponse(object):
+    def __init__(self, status, body=b'', reset_after=None):
+        self.status = status
+        self.reason = 'OK' if status < 300 else 'Error'
+        self.will_close = False
+        self._body = io.BytesIO(body)
+        self._reset_after = reset_after
+
+    def read(self, size=-1):
+        if (self._reset_after is not None and
+                self._body.tell() >= self._reset_after):
+            raise ConnectionResetError()
+        return self._body.read(size)
+
+
+class FakeConnection(object):
+    """Connection that answers with the next queued response."""
+
+    def __init__(self, responses):
+        self.responses = responses
+        self.requests = []
+        self.closed = False
+
+    def request(self, method, path, body=None, headers=None):
+        self.requests.append((method, path, headers or {}))
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        self._response = response
+
+    def getresponse(self):
+        return self._response
+
+    def close(self):
+        self.closed = True
+
+
+def _transfer(*connections):
+    transfer = GuestFileTransfer(ssl_context=object(), chunk_size=4)
+    pending = list(connections)
+    transfer._connect = lambda netloc: pending.pop(0)
+    return transfer
+
+
+def test_download_reuses_the_connection():
+    conn = FakeConnection([FakeResponse(200, b'hello world'),
+                           FakeResponse(200, b'again')])
+    transfer = _transfer(conn)
+    assert transfer.download_bytes(URL, expected_len=11) == b'hello world'
+    assert transfer.download_bytes(URL) == b'again'
+    assert [request[1] for request in conn.requests] == ['/guestFile?id=1'] * 2
+
+
+def test_download_is_retried_when_an_idle_connection_was_closed():
+    stale = FakeConnection([FakeResponse(200, b'first'),
+                            ConnectionResetError()])
+    fresh = FakeConnection([FakeResponse(200, b'second')])
+    transfer = _transfer(stale, fresh)
+    transfer.download_bytes(URL)
+    assert transfer.download_bytes(URL) == b'second'
+    assert stale.closed
+
+
+def test_download_is_not_retried_after_data_was_written():
+    stale = FakeConnection([FakeResponse(200, b'first'),
+                            FakeResponse(200, b'partial body',
+                                         reset_after=8)])
+    fresh = FakeConnection([FakeResponse(200, b'partial body')])
+    transfer = _transfer(stale, fresh)
+    transfer.download_bytes(URL)
+
+    dst = io.BytesIO()
+    with pytest.raises(ConnectionResetError):
+        transfer.download(URL, dst)
+    assert dst.getvalue() == b'partial '
+    assert fresh.requests == []
+
+
+def test_upload_is_retried_on_a_fresh_connection():
+    stale = FakeConnection([FakeResponse(200, b'x'), BrokenPipeError()])
+    fresh = FakeConnection([FakeResponse(200)])
+    transfer = _transfer(stale, fresh)
+    transfer.download_bytes(URL)
+    assert transfer.upload(URL, b'data') == 4
+    assert fresh.requests[0][2] == {'Content-Length': '4'}
+
+
+def test_download_requests_the_bytes_past_offset():
+    conn = FakeConnection([FakeResponse(206, b'world')])
+    transfer = _transfer(conn)
+    dst = io.BytesIO()
+    assert transfer.download(URL, dst, offset=6) == 5
+    assert dst.getvalue() == b'world'
+    assert conn.requests[0][2] == {'Range': 'bytes=6-'}
+    assert transfer.supports_range(URL)
+
+
+def test_ignored_range_is_skipped_and_not_sent_again():
+    conn = FakeConnection([FakeResponse(200, b'hello world'),
+                           FakeResponse(200, b'hello world!')])
+    transfer = _transfer(conn)
+    dst = io.BytesIO()
+    assert transfer.download(URL, dst, offset=6) == 5
+    assert dst.getvalue() == b'world'
+    assert not transfer.supports_range(URL)
+
+    dst = io.BytesIO()
+    transfer.download(URL, dst, offset=11)
+    assert dst.getvalue() == b'!'
+    assert conn.requests[1][2] == {}
+
+
+def test_tail_output_polls_slowly_when_ranges_are_ignored():
+    client = mock.Mock()
+    client.vcenter.vm.guest.Processes.get.side_effect = [
+        mock.Mock(exit_code=None), mock.Mock(exit_code=None),
+        mock.Mock(exit_code=0)]
+    client.vcenter.vm.guest.filesystem.Files.get.side_effect = [
+        mock.Mock(size=3), mock.Mock(size=6), mock.Mock(size=6)]
+    client.vcenter.vm.guest.filesystem.Transfers.create.return_value = URL
+    conn = FakeConnection([FakeResponse(200, b'abc'),
+                           FakeResponse(200, b'abcdef')])
+    transfer = _transfer(conn)
+
+    with mock.patch.object(guest_process_helper.time, 'sleep') as sleep:
+        chunks = list(guest_process_helper.tail_output(
+            client, 'vm-1', None, 1, ['out'], transfer, min_interval=0.5,
+            max_interval=10.0))
+    assert chunks == [('out', b'abc'), ('out', b'def')]
+    assert [call[0][0] for call in sleep.call_args_list] == [0.5, 10.0]
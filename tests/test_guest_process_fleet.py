@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+"""
+* *******************************************************
+* Copyright (c) VMware, Inc. 2024. All Rights Reserved.
+* SPDX-License-Identifier: MIT
+* *******************************************************
+*
+* DISCLAIMER. THIS PROGRAM IS PROVIDED TO YOU "AS IS" WITHOUT
+* WARRANTIES OR CONDITIONS OF ANY KIND, WHETHER ORAL OR WRITTEN,
+* EXPRESS OR IMPLIED. THE AUTHOR SPECIFICALLY DISCLAIMS ANY IMPLIED
+* WARRANTIES OR CONDITIONS OF MERCHANTABILITY, SATISFACTORY QUALITY,
+* NON-INFRINGEMENT AND FITNESS FOR A PARTICULAR PURPOSE.
+"""
+
+__author__ = 'VMware, Inc.'
+
+import time
+
+from unittest import mock
+
+from samples.vsphere.vcenter.helper import guest_process_helper
+from samples.vsphere.vcenter.helper.guest_process_helper import \
+    run_script_on_vms
+
+
+class FakeGuestProcess(object):
+    """
+    Guest process that takes start_seconds to start and exits after
+    run_seconds; run_seconds None never exits.
+    """
+
+    start_seconds = 0.05
+    run_seconds = 0.02
+    fail_start = ()
+    instances = {}
+
+    def __init__(self, client, vm, creds, transfer):
+        self.vm = vm
+        self.stdout_path = 'out'
+        self.stderr_path = 'err'
+        self.started = None
+        self.terminated = False
+        self.cleaned_up = False
+        FakeGuestProcess.instances[vm] = self
+
+    def start(self, script):
+        time.sleep(self.start_seconds)
+        if self.vm in self.fail_start:
+            raise Exception('no guest operations')
+        self.started = time.time()
+        return 100
+
+    def get(self):
+        running = time.time() - self.started
+        exited = self.run_seconds is not None and running > self.run_seconds
+        return mock.Mock(exit_code=0 if exited else None)
+
+    def read_bytes(self, path):
+        return path.encode()
+
+    def terminate(self):
+        self.terminated = True
+
+    def cleanup(self):
+        self.cleaned_up = True
+
+
+def _run(vms, **kwargs):
+    FakeGuestProcess.instances = {}
+    with mock.patch.object(guest_process_helper, 'GuestProcess',
+                           FakeGuestProcess):
+        return run_script_on_vms(None, vms, None, 'true',
+                                 poll_interval=0.005,
+                                 transfer=mock.Mock(), **kwargs)
+
+
+def test_waiting_for_a_worker_does_not_count_against_the_timeout():
+    # The last VM waits 0.25s for the single worker, its process runs
+    # for 0.02s.
+    vms = ['vm-{}'.format(i) for i in range(6)]
+    results = _run(vms, max_workers=1, timeout=0.2)
+    assert all(result.error is None for result in results.values())
+    assert all(result.exit_code == 0 for result in results.values())
+    assert all(result.stdout == b'out' for result in results.values())
+
+
+def test_process_is_terminated_after_the_timeout():
+    with mock.patch.object(FakeGuestProcess, 'run_seconds', None):
+        results = _run(['vm-1'], timeout=0.05)
+    assert 'Timed out' in str(results['vm-1'].error)
+    assert FakeGuestProcess.instances['vm-1'].terminated
+    assert FakeGuestProcess.instances['vm-1'].cleaned_up
+
+
+def test_failed_start_is_reported_and_cleaned_up():
+    with mock.patch.object(FakeGuestProcess, 'fail_start', ['vm-2']):
+        results = _run(['vm-1', 'vm-2'])
+    assert results['vm-1'].exit_code == 0
+    assert str(results['vm-2'].error) == 'no guest operations'
+    assert results['vm-2'].started is None
+    assert results['vm-2'].elapsed is None
+    assert FakeGuestProcess.instances['vm-2'].cleaned_up
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+"""
+* *******************************************************
+* Copyright (c) VMware, Inc. 2024. All Rights Reserved.
+* SPDX-License-Identifier: MIT
+* *******************************************************
+*
+* DISCLAIMER. THIS PROGRAM IS PROVIDED TO YOU "AS IS" WITHOUT
+* WARRANTIES OR CONDITIONS OF ANY KIND, WHETHER ORAL OR WRITTEN,
+* EXPRESS OR IMPLIED. THE AUTHOR SPECIFICALLY DISCLAIMS ANY IMPLIED
+* WARRANTIES OR CONDITIONS OF MERCHANTABILITY, SATISFACTORY QUALITY,
+* NON-INFRINGEMENT AND FITNESS FOR A PARTICULAR PURPOSE.
+"""
+
+__author__ = 'VMware, Inc.'
+
+from datetime import datetime
+
+from unittest import mock
+
+from com.vmware.appliance_client import Monitoring
+
+from samples.vsphere.appliances.monitoring_helper import MonitoringClient, \
+    store_monitoring_data
+from samples.vsphere.common.timeseries_store import TimeSeriesStore
+
+END = datetime(2024, 1, 1, 12, 2)
+
+
+def _monitoring():
+    monitoring = mock.Mock()
+    monitoring.MonitoredItemDataRequest = Monitoring.MonitoredItemDataRequest
+    monitoring.list.return_value = [
+        Monitoring.MonitoredItem(id='cpu.util', name='cpu', units='%',
+                                 category='cpu', instance='',
+                                 description=''),
+        Monitoring.MonitoredItem(id='mem.util', name='mem', units='%',
+                                 category='memory', instance='',
+                                 description='')]
+
+    def query(request):
+        return [Monitoring.MonitoredItemData(
+            name=name, interval=request.interval, function=request.function,
+            start_time=datetime(2024, 1, 1, 11, 45), end_time=END,
+            data=['1', '', '3', '4', '5'])
+            for name in request.names]
+    monitoring.query.side_effect = query
+    return monitoring
+
+
+def test_store_monitoring_data_keeps_only_complete_new_intervals(tmp_path):
+    store = TimeSeriesStore(str(tmp_path))
+    monitoring = _monitoring()
+    # 11:45 to 12:05 in 5 minute steps; 12:00 and 12:05 are not complete
+    # at 12:02, the empty 11:50 value is skipped.
+    assert store_monitoring_data(store, monitoring, ['cpu.util'], 'vc',
+                                 end=END) == 2
+    assert [ts % 3600 for ts, _ in store.query('cpu.util/MINUTES5/AVG',
+                                               'vc')] == [2700, 3300]
+
+    # Nothing new is complete yet.
+    assert store_monitoring_data(store, monitoring, ['cpu.util'], 'vc',
+                                 end=END) == 0
+    assert monitoring.query.call_count == 1
+
+    # Later queries start after the watermark.
+    store_monitoring_data(store, monitoring, ['cpu.util'], 'vc',
+                          end=datetime(2024, 1, 1, 12, 12))
+    request = monitoring.query.call_args[0][0]
+    assert request.start_time == datetime(2024, 1, 1, 12, 0)
+
+
+def test_catalog_is_cached_and_unreadable_files_are_listed_again(tmp_path):
+    monitoring = _monitoring()
+    client = MonitoringClient(monitoring, None, 'vc',
+                              catalog_dir=str(tmp_path / 'catalog'))
+    assert client.counters() == ['cpu.util', 'mem.util']
+    assert client.counters(['memory']) == ['mem.util']
+
+    client = MonitoringClient(monitoring, None, 'vc',
+                              catalog_dir=str(tmp_path / 'catalog'))
+    assert client.counters() == ['cpu.util', 'mem.util']
+    assert monitoring.list.call_count == 1
+
+    for content in ['[{"id": ', '[{"id": "cpu.util"}]', '{}']:
+        with open(client.catalog_path, 'w') as f:
+            f.write(content)
+        client = MonitoringClient(monitoring, None, 'vc',
+                                  catalog_dir=str(tmp_path / 'catalog'))
+        assert client.counters() == ['cpu.util', 'mem.util']
+    assert monitoring.list.call_count == 4
+
+
+def test_fetch_batches_counters_by_watermark(tmp_path):
+    store = TimeSeriesStore(str(tmp_path))
+    monitoring = _monitoring()
+    client = MonitoringClient(monitoring, store, 'vc',
+                              catalog_dir=str(tmp_path / 'catalog'),
+                              batch_size=1)
+    assert client.fetch(['cpu.util', 'mem.util'], end=END) == 4
+    assert sorted(call[0][0].names[0]
+                  for call in monitoring.query.call_args_list) == \
+        ['cpu.util', 'mem.util']
@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+"""
+* *******************************************************
+* Copyright (c) VMware, Inc. 2024. All Rights Reserved.
+* SPDX-License-Identifier: MIT
+* *******************************************************
+*
+* DISCLAIMER. THIS PROGRAM IS PROVIDED TO YOU "AS IS" WITHOUT
+* WARRANTIES OR CONDITIONS OF ANY KIND, WHETHER ORAL OR WRITTEN,
+* EXPRESS OR IMPLIED. THE AUTHOR SPECIFICALLY DISCLAIMS ANY IMPLIED
+* WARRANTIES OR CONDITIONS OF MERCHANTABILITY, SATISFACTORY QUALITY,
+* NON-INFRINGEMENT AND FITNESS FOR A PARTICULAR PURPOSE.
+"""
+
+__author__ = 'VMware, Inc.'
+
+import pytest
+from unittest import mock
+
+from samples.vsphere.oauth.grant_types import oauth_utility
+from samples.vsphere.oauth.grant_types.oauth_utility import \
+    OAuthTokenManager, get_token_manager
+
+
+class FakeIdentityProvider(object):
+    """Token endpoint that accepts refresh tokens listed in valid."""
+
+    def __init__(self):
+        self.requests = []
+        self.valid = set()
+        self.serial = 0
+
+    def post(self, url, headers=None, data=None):
+        self.requests.append(dict(data))
+        if (data['grant_type'] == oauth_utility.REFRESH_TOKEN and
+                data['refresh_token'] not in self.valid):
+            body = {'error': 'invalid_grant'}
+        else:
+            self.serial += 1
+            refresh_token = 'refresh-{}'.format(self.serial)
+            self.valid.add(refresh_token)
+            body = {'access_token': 'access-{}'.format(self.serial),
+                    'refresh_token': refresh_token, 'expires_in': 3600}
+        return mock.Mock(json=mock.Mock(return_value=body))
+
+
+@pytest.fixture
+def provider():
+    with mock.patch.object(oauth_utility, 'get_cached_endpoints',
+                           return_value=['auth', 'token', {}]):
+        yield FakeIdentityProvider()
+
+
+def _expire(manager):
+    manager.expires = manager.issued = 0
+
+
+def test_rejected_refresh_token_falls_back_to_the_original_grant(provider):
+    manager = OAuthTokenManager('vc', provider, 'client', 'secret')
+    assert manager.get_access_token() == 'access-1'
+
+    # The refresh token is revoked.
+    provider.valid.clear()
+    _expire(manager)
+    assert manager.get_access_token() == 'access-2'
+    assert [request['grant_type'] for request in provider.requests] == \
+        ['client_credentials', 'refresh_token', 'client_credentials']
+
+    _expire(manager)
+    assert manager.get_access_token() == 'access-3'
+    assert provider.requests[-1] == {'grant_type': 'refresh_token',
+                                     'refresh_token': 'refresh-2'}
+
+
+def test_rejected_refresh_grant_is_not_repeated_with_a_used_code(provider):
+    manager = OAuthTokenManager('vc', provider, 'client', 'secret',
+                                grant_type=oauth_utility.AUTHORIZATION_CODE,
+                                grant_params={'code': 'once'})
+    manager.get_access_token()
+    provider.valid.clear()
+    _expire(manager)
+    with pytest.raises(Exception):
+        manager.get_access_token()
+    assert len(provider.requests) == 2
+
+
+def test_saml_assertion_is_exchanged_again_for_another_id_token(provider):
+    def exchange_token(server, session, access_token, id_token):
+        return (access_token, id_token), None
+
+    manager = OAuthTokenManager('vc', provider, 'client', 'secret')
+    with mock.patch.object(oauth_utility, '_exchange_token',
+                           side_effect=exchange_token) as exchange:
+        assert manager.get_saml_assertion() == ('access-1', None)
+        assert manager.get_saml_assertion() == ('access-1', None)
+        assert manager.get_saml_assertion('id-1') == ('access-1', 'id-1')
+        assert exchange.call_count == 2
+
+
+def test_token_managers_are_not_keyed_on_plain_secrets():
+    with mock.patch.dict(oauth_utility._token_managers, clear=True):
+        manager = get_token_manager('vc', None, 'user', 'pw',
+                                    grant_type=oauth_utility.PASSWORD,
+                                    grant_params={'username': 'user',
+                                                  'password': 'pw'})
+        assert get_token_manager('vc', None, 'user', 'pw',
+                                 grant_type=oauth_utility.PASSWORD,
+                                 grant_params={'username': 'user',
+                                               'password': 'pw'}) is manager
+        assert get_token_manager('vc', None, 'user', 'other') is not manager
+        assert all('pw' not in key for key in oauth_utility._token_managers)
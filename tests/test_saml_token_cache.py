@@ -0,0 +1,195 @@
+#!/usr/bin/env python
+"""
+* *******************************************************
+* Copyright (c) VMware, Inc. 2024. All Rights Reserved.
+* SPDX-License-Identifier: MIT
+* *******************************************************
+*
+* DISCLAIMER. THIS PROGRAM IS PROVIDED TO YOU "AS IS" WITHOUT
+* WARRANTIES OR CONDITIONS OF ANY KIND, WHETHER ORAL OR WRITTEN,
+* EXPRESS OR IMPLIED. THE AUTHOR SPECIFICALLY DISCLAIMS ANY IMPLIED
+* WARRANTIES OR CONDITIONS OF MERCHANTABILITY, SATISFACTORY QUALITY,
+* NON-INFRINGEMENT AND FITNESS FOR A PARTICULAR PURPOSE.
+"""
+
+__author__ = 'VMware, Inc.'
+
+import ssl
+import threading
+import time
+
+import pytest
+from unittest import mock
+
+from samples.vsphere.common import sso
+from samples.vsphere.common.ssl_helper import get_unverified_context
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 1000000.0
+
+    def time(self):
+        return self.now
+
+
+class FakeAuthenticator(object):
+    """Issues tokens named after the user and a serial number."""
+
+    def __init__(self):
+        self.issued = []
+        self._lock = threading.Lock()
+
+    def get_bearer_saml_assertion(self, username, password, **kwargs):
+        with self._lock:
+            self.issued.append((username, kwargs))
+            return '{}-{}'.format(username, len(self.issued))
+
+
+class ManualTimer(object):
+    """threading.Timer replacement that only fires when told to."""
+
+    instances = []
+
+    def __init__(self, delay, function, args):
+        self.delay = delay
+        self.function = function
+        self.args = args
+        self.cancelled = False
+        ManualTimer.instances.append(self)
+
+    def start(self):
+        pass
+
+    def cancel(self):
+        self.cancelled = True
+
+    def fire(self):
+        self.function(*self.args)
+
+
+@pytest.fixture
+def cache():
+    clock = FakeClock()
+    ManualTimer.instances = []
+    lifetime = 600
+    with mock.patch.object(sso.time, 'time', clock.time), \
+            mock.patch.object(sso.threading, 'Timer', ManualTimer), \
+            mock.patch.object(sso, 'get_saml_token_expiry',
+                              lambda token: clock.now + lifetime):
+        authenticator = FakeAuthenticator()
+        token_cache = sso.SamlTokenCache(authenticator, min_validity=30,
+                                         refresh_ahead=120)
+        yield token_cache, authenticator, clock
+
+
+def _active_timers():
+    return [timer for timer in ManualTimer.instances if not timer.cancelled]
+
+
+def test_valid_token_is_returned_from_cache(cache):
+    token_cache, authenticator, clock = cache
+    token = token_cache.get_bearer_saml_assertion('alice', 'pw')
+    clock.now += 100
+    assert token_cache.get_bearer_saml_assertion('alice', 'pw') == token
+    assert len(authenticator.issued) == 1
+    # Renewal is scheduled refresh_ahead seconds before expiry.
+    assert _active_timers()[0].delay == 600 - 120
+
+
+def test_expired_token_is_issued_again(cache):
+    token_cache, authenticator, clock = cache
+    first = token_cache.get_bearer_saml_assertion('alice', 'pw')
+    clock.now += 600 - 29
+    second = token_cache.get_bearer_saml_assertion('alice', 'pw')
+    assert first != second
+    assert len(authenticator.issued) == 2
+
+
+def test_token_options_and_credentials_are_part_of_the_key(cache):
+    token_cache, authenticator, _ = cache
+    token_cache.get_bearer_saml_assertion('alice', 'pw')
+    token_cache.get_bearer_saml_assertion('alice', 'other')
+    token_cache.get_bearer_saml_assertion('alice', 'pw', token_duration=60)
+    token_cache.get_bearer_saml_assertion(
+        'alice', 'pw', ssl_context=get_unverified_context())
+    token_cache.get_bearer_saml_assertion('alice', 'pw')
+    assert len(authenticator.issued) == 4
+
+
+def test_equally_configured_ssl_contexts_share_tokens(cache):
+    token_cache, authenticator, _ = cache
+    for _ in range(3):
+        token_cache.get_bearer_saml_assertion(
+            'alice', 'pw', ssl_context=get_unverified_context())
+    assert len(authenticator.issued) == 1
+    assert len(_active_timers()) == 1
+
+    token_cache.get_bearer_saml_assertion(
+        'alice', 'pw', ssl_context=ssl.create_default_context())
+    assert len(authenticator.issued) == 2
+
+
+def test_used_token_is_renewed_in_background(cache):
+    token_cache, authenticator, clock = cache
+    token_cache.get_bearer_saml_assertion('alice', 'pw')
+    clock.now += 100
+    token_cache.get_bearer_saml_assertion('alice', 'pw')
+
+    clock.now += 380
+    _active_timers()[0].fire()
+    assert len(authenticator.issued) == 2
+    assert token_cache.get_bearer_saml_assertion('alice', 'pw') == 'alice-2'
+    assert len(_active_timers()) == 1
+
+
+def test_unused_token_is_dropped_instead_of_renewed(cache):
+    token_cache, authenticator, clock = cache
+    token_cache.get_bearer_saml_assertion('alice', 'pw')
+
+    clock.now += 480
+    _active_timers()[0].fire()
+    assert len(authenticator.issued) == 1
+    assert token_cache._entries == {}
+    assert token_cache._timers == {}
+
+    # The next request issues a new token.
+    assert token_cache.get_bearer_saml_assertion('alice', 'pw') == 'alice-2'
+
+
+def test_clear_cancels_renewals(cache):
+    token_cache, authenticator, _ = cache
+    token_cache.get_bearer_saml_assertion('alice', 'pw')
+    token_cache.clear()
+    assert _active_timers() == []
+    token_cache.get_bearer_saml_assertion('alice', 'pw')
+    assert len(authenticator.issued) == 2
+
+
+def test_platform_service_controller_logins_share_one_sts_request():
+    psc = pytest.importorskip(
+        'samples.vsphere.common.platform_service_controller')
+    expiry = time.strftime('%Y-%m-%dT%H:%M:%S.000Z',
+                           time.gmtime(time.time() + 3600))
+    response = (
+        '<Envelope><saml2:Assertion '
+        'xmlns:saml2="urn:oasis:names:tc:SAML:2.0:assertion" ID="_1">'
+        '<saml2:Conditions NotOnOrAfter="{}"/>'
+        '</saml2:Assertion></Envelope>').format(expiry).encode()
+    with mock.patch.object(psc, 'LookupServiceHelper') as lookup, \
+            mock.patch.object(psc, 'create_saml_bearer_security_context'), \
+            mock.patch.dict(sso._token_caches, clear=True), \
+            mock.patch.object(sso.SsoAuthenticator, 'perform_request',
+                              return_value=response) as perform_request:
+        lookup.return_value.find_sso_url.return_value = \
+            'https://vc/sts/STSService/vsphere.local'
+        tokens = []
+        for _ in range(2):
+            controller = psc.PlatformServiceController(
+                'wsdl', 'soap', 'alice', 'pw', skip_verification=True)
+            controller.login()
+            tokens.append(controller.bearer_token)
+        for token_cache in sso._token_caches.values():
+            token_cache.clear()
+    assert perform_request.call_count == 1
+    assert tokens[0] == tokens[1]
@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+"""
+* *******************************************************
+* Copyright (c) VMware, Inc. 2024. All Rights Reserved.
+* SPDX-License-Identifier: MIT
+* *******************************************************
+*
+* DISCLAIMER. THIS PROGRAM IS PROVIDED TO YOU "AS IS" WITHOUT
+* WARRANTIES OR CONDITIONS OF ANY KIND, WHETHER ORAL OR WRITTEN,
+* EXPRESS OR IMPLIED. THE AUTHOR SPECIFICALLY DISCLAIMS ANY IMPLIED
+* WARRANTIES OR CONDITIONS OF MERCHANTABILITY, SATISFACTORY QUALITY,
+* NON-INFRINGEMENT AND FITNESS FOR A PARTICULAR PURPOSE.
+"""
+
+__author__ = 'VMware, Inc.'
+
+from unittest import mock
+
+from samples.vsphere.common import sso
+from samples.vsphere.common.ssl_helper import get_unverified_context
+
+
+class FakeConnection(object):
+    def __init__(self):
+        self.sock = object()
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def _authenticator(**kwargs):
+    authenticator = sso.SsoAuthenticator('https://vc/sts/STSService',
+                                         **kwargs)
+    connections = []
+
+    def connect(host, public_key, private_key, ssl_context):
+        connections.append(FakeConnection())
+        return connections[-1]
+
+    response = mock.Mock(status=200, will_close=False)
+    authenticator._connect = connect
+    authenticator._post = mock.Mock(return_value=(response, b'<ok/>'))
+    return authenticator, connections
+
+
+def test_requests_with_new_equal_ssl_contexts_reuse_the_connection():
+    authenticator, connections = _authenticator()
+    with mock.patch.object(sso, '_is_stale', return_value=False):
+        for _ in range(3):
+            authenticator.perform_request(
+                '<request/>', ssl_context=get_unverified_context())
+    assert len(connections) == 1
+    assert len(authenticator._idle_connections) == 1
+
+
+def test_idle_connections_of_least_recently_used_keys_are_closed():
+    authenticator, connections = _authenticator(max_connection_keys=2)
+    with mock.patch.object(sso, '_is_stale', return_value=False):
+        for key in ['a', 'b', 'a', 'c']:
+            authenticator.perform_request('<request/>', public_key=key,
+                                          private_key=key)
+    assert len(connections) == 3
+    # 'b' was used least recently when 'c' was added.
+    assert [connection.closed for connection in connections] == \
+        [False, True, False]
+    assert [key[1] for key in authenticator._idle_connections] == ['a', 'c']
+
+    authenticator.close()
+    assert all(connection.closed for connection in connections)
+    assert len(authenticator._idle_connections) == 0
@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+"""
+* *******************************************************
+* Copyright (c) VMware, Inc. 2024. All Rights Reserved.
+* SPDX-License-Identifier: MIT
+* *******************************************************
+*
+* DISCLAIMER. THIS PROGRAM IS PROVIDED TO YOU "AS IS" WITHOUT
+* WARRANTIES OR CONDITIONS OF ANY KIND, WHETHER ORAL OR WRITTEN,
+* EXPRESS OR IMPLIED. THE AUTHOR SPECIFICALLY DISCLAIMS ANY IMPLIED
+* WARRANTIES OR CONDITIONS OF MERCHANTABILITY, SATISFACTORY QUALITY,
+* NON-INFRINGEMENT AND FITNESS FOR A PARTICULAR PURPOSE.
+"""
+
+__author__ = 'VMware, Inc.'
+
+import os
+
+import pytest
+from unittest import mock
+
+from com.vmware.vstats_client import Data
+
+from samples.vsphere.common import timeseries_store
+from samples.vsphere.common.timeseries_store import TimeSeriesStore, \
+    downsample
+from samples.vsphere.vcenter.vstats.helpers.data_points import \
+    store_data_points
+
+
+def _chunk_files(store, counter='c', resource='r'):
+    path = os.path.join(store.directory, store._series_dir(counter, resource))
+    return sorted(name for name in os.listdir(path)
+                  if name.endswith(timeseries_store.CHUNK_SUFFIX))
+
+
+def test_chunk_encoding_round_trip(tmp_path):
+    points = [(1000, 1.5), (1020, -2.0), (1021, 0.0), (5000, 1e300)]
+    path = str(tmp_path / 'test.chunk')
+    with open(path, 'wb') as f:
+        f.write(timeseries_store._encode_chunk(points))
+    assert timeseries_store._read_chunk(path) == points
+    assert timeseries_store._chunk_count(path) == len(points)
+
+
+def test_append_drops_points_at_or_before_watermark(tmp_path):
+    store = TimeSeriesStore(str(tmp_path))
+    assert store.append('c', 'r', [(20, 2.0), (10, 1.0)]) == 2
+    assert store.watermark('c', 'r') == 20
+    # Overlapping window: only the point after the watermark is new.
+    assert store.append('c', 'r', [(10, 9.0), (20, 9.0), (30, 3.0)]) == 1
+    assert store.query('c', 'r') == [(10, 1.0), (20, 2.0), (30, 3.0)]
+    assert store.query('c', 'r', start=15, end=30) == [(20, 2.0)]
+
+
+def test_reload_restores_series_and_watermarks(tmp_path):
+    store = TimeSeriesStore(str(tmp_path), chunk_points=2)
+    store.append('c', 'r1', [(i, float(i)) for i in range(5)])
+    store.append('c', 'r2', [(7, 7.0)])
+    store.append('d', 'r1', [(3, 3.0)])
+
+    reopened = TimeSeriesStore(str(tmp_path), chunk_points=2)
+    assert reopened.series() == [('c', 'r1'), ('c', 'r2'), ('d', 'r1')]
+    assert reopened.watermark('c', 'r1') == 4
+    assert reopened.min_watermark('c') == 4
+    assert reopened.min_watermark() == 3
+    assert reopened.query('c', 'r1') == [(i, float(i)) for i in range(5)]
+
+
+def test_compact_merges_runs_of_small_chunks(tmp_path):
+    store = TimeSeriesStore(str(tmp_path), chunk_points=4)
+    for i in range(3):
+        store.append('c', 'r', [(3 * i + j, float(3 * i + j))
+                                for j in range(3)])
+    store.compact()
+    assert _chunk_files(store) == ['000000000000-000000000005.chunk',
+                                   '000000000006-000000000008.chunk']
+    assert store.query('c', 'r') == [(i, float(i)) for i in range(9)]
+    assert TimeSeriesStore(str(tmp_path)).query('c', 'r') == \
+        [(i, float(i)) for i in range(9)]
+
+
+def test_interrupted_compact_leaves_no_duplicates(tmp_path):
+    store = TimeSeriesStore(str(tmp_path), chunk_points=4)
+    for i in range(3):
+        store.append('c', 'r', [(3 * i + j, float(3 * i + j))
+                                for j in range(3)])
+    # Crash after the merged chunk is written, before the originals are
+    # removed.
+    with mock.patch.object(timeseries_store.os, 'remove',
+                           side_effect=KeyboardInterrupt):
+        with pytest.raises(KeyboardInterrupt):
+            store.compact()
+    assert len(_chunk_files(store)) == 4
+
+    reopened = TimeSeriesStore(str(tmp_path), chunk_points=4)
+    assert reopened.query('c', 'r') == [(i, float(i)) for i in range(9)]
+    assert _chunk_files(reopened) == ['000000000000-000000000005.chunk',
+                                      '000000000006-000000000008.chunk']
+
+
+def test_downsample_and_store_rollup(tmp_path):
+    points = [(0, 1.0), (100, 3.0), (300, 5.0), (650, 7.0)]
+    assert downsample(points, 300) == [(0, 2.0), (300, 5.0), (600, 7.0)]
+    assert downsample(points, 300, 'max') == [(0, 3.0), (300, 5.0),
+                                              (600, 7.0)]
+
+    store = TimeSeriesStore(str(tmp_path))
+    store.append('c', 'r', points)
+    rollup = store.store_rollup('c', 'r', 300)
+    assert rollup == 'c@avg:300'
+    # The bucket of the newest point may still grow, so it is left out.
+    assert store.query(rollup, 'r') == [(0, 2.0), (300, 5.0)]
+    store.append('c', 'r', [(910, 9.0)])
+    store.store_rollup('c', 'r', 300)
+    assert store.query(rollup, 'r') == [(0, 2.0), (300, 5.0), (600, 7.0)]
+
+
+def test_store_data_points_keeps_older_points_of_later_pages(tmp_path):
+    pages = [
+        Data.DataPointsResult(data_points=[
+            Data.DataPoint(cid='c', rid='vm-1', ts=200, val=2.0)],
+            next='page2'),
+        Data.DataPointsResult(data_points=[
+            Data.DataPoint(cid='c', rid='vm-1', ts=100, val=1.0),
+            Data.DataPoint(cid='c', rid='vm-2', ts=100, val=5.0)],
+            next=None),
+    ]
+    data_client = mock.Mock()
+    data_client.FilterSpec = Data.FilterSpec
+    data_client.query_data_points.side_effect = pages
+    store = TimeSeriesStore(str(tmp_path))
+
+    stored = store_data_points(store, data_client, Data.FilterSpec(cid='c'),
+                               prefetch=False)
+    assert stored == 3
+    assert store.query('c', 'vm-1') == [(100, 1.0), (200, 2.0)]
+    assert store.query('c', 'vm-2') == [(100, 5.0)]
+
+
+def test_store_data_points_starts_after_the_watermark(tmp_path):
+    store = TimeSeriesStore(str(tmp_path))
+    store.append('c', 'vm-1', [(100, 1.0)])
+    data_client = mock.Mock()
+    data_client.query_data_points.return_value = Data.DataPointsResult(
+        data_points=[], next=None)
+
+    store_data_points(store, data_client, Data.FilterSpec(cid='c', start=50),
+                      prefetch=False)
+    spec = data_client.query_data_points.call_args[1]['filter']
+    assert spec.start == 101
@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+"""
+* *******************************************************
+* Copyright (c) VMware, Inc. 2024. All Rights Reserved.
+* SPDX-License-Identifier: MIT
+* *******************************************************
+*
+* DISCLAIMER. THIS PROGRAM IS PROVIDED TO YOU "AS IS" WITHOUT
+* WARRANTIES OR CONDITIONS OF ANY KIND, WHETHER ORAL OR WRITTEN,
+* EXPRESS OR IMPLIED. THE AUTHOR SPECIFICALLY DISCLAIMS ANY IMPLIED
+* WARRANTIES OR CONDITIONS OF MERCHANTABILITY, SATISFACTORY QUALITY,
+* NON-INFRINGEMENT AND FITNESS FOR A PARTICULAR PURPOSE.
+"""
+
+__author__ = 'VMware, Inc.'
+
+from unittest import mock
+
+from com.vmware.vcenter_client import VM
+
+from samples.vsphere.vcenter.helper import vm_provisioning_helper
+from samples.vsphere.vcenter.helper.vm_provisioning_helper import create_vms
+
+PLACEMENT = {'datacenter_name': 'dc', 'vm_folder_name': 'vms',
+             'datastore_name': 'ds'}
+
+
+def _lookup(client, datacenter_name, vm_folder_name, datastore_name):
+    if datastore_name == 'missing':
+        raise Exception('Datastore missing not found')
+    return VM.PlacementSpec(folder=vm_folder_name, datastore=datastore_name)
+
+
+def _create_vms(overrides):
+    client = mock.Mock()
+    client.vcenter.VM.create.side_effect = lambda spec: 'vm-' + spec.name
+    with mock.patch.object(vm_provisioning_helper.vm_placement_helper,
+                           'get_placement_spec_for_resource_pool',
+                           side_effect=_lookup) as lookup:
+        results = create_vms(client, VM.CreateSpec(guest_os='OTHER'),
+                             overrides, max_in_flight=2)
+    return results, client, lookup
+
+
+def test_vms_are_created_with_shared_placement_lookups():
+    results, client, lookup = _create_vms(
+        [dict(PLACEMENT, name='a'), dict(PLACEMENT, name='b'),
+         {'name': 'c'}])
+    assert [result.vm for result in results] == ['vm-a', 'vm-b', 'vm-c']
+    assert all(result.latency is not None for result in results)
+    assert lookup.call_count == 1
+    specs = [call[0][0] for call in client.vcenter.VM.create.call_args_list]
+    assert sorted((spec.name, spec.placement and spec.placement.datastore)
+                  for spec in specs) == [('a', 'ds'), ('b', 'ds'),
+                                         ('c', None)]
+
+
+def test_placement_errors_are_reported_per_vm():
+    results, client, _ = _create_vms(
+        [{'name': 'partial', 'datacenter_name': 'dc'},
+         dict(PLACEMENT, name='bad', datastore_name='missing'),
+         dict(PLACEMENT, name='good')])
+    assert isinstance(results[0].error, ValueError)
+    assert str(results[1].error) == 'Datastore missing not found'
+    assert results[2].vm == 'vm-good' and results[2].error is None
+    assert client.vcenter.VM.create.call_count == 1